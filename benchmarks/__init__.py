@@ -0,0 +1 @@
+"""Performance benchmarks for the calculator. These are run by hand and are not part of the test suite."""
@@ -0,0 +1,255 @@
+"""Benchmark suite for the calculator's hot paths, with results written as JSON.
+
+Measures Calculator per-operation latency, CommandHandler parse and dispatch, REPL plugin
+loading and startup, history save/load at several sizes, and memory per history entry.
+Every metric is a time or a size, so lower is better; --compare reports the change from an
+earlier results file and exits with status 1 if any metric got worse by more than the
+threshold.
+
+Run with: python -m benchmarks [--output results.json] [--compare baseline.json]
+                               [--rows 1000 100000 1000000] [--threshold 0.10] [--quick]
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from benchmarks import bench_startup as process_startup
+from calculator import Calculator
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations
+from calculator.command_stats import CommandStats
+from calculator.commands import Command, CommandHandler
+from calculator.history_store import HistoryStore
+from calculator.operations import add
+
+DEFAULT_OUTPUT = 'benchmark-results.json'
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000]
+QUICK_ROWS = [1_000, 10_000]
+DEFAULT_CALLS = 20_000
+DEFAULT_THRESHOLD = 0.10
+MEMORY_ENTRIES = 100_000
+
+
+class NoOpCommand(Command):
+    """A command that does nothing, so timing it measures only parsing and dispatch."""
+    def execute(self, *args):
+        return args
+
+
+def _percentiles(samples_ns) -> dict:
+    """Return the mean, median and 99th percentile of per-call timings, in nanoseconds."""
+    ordered = sorted(samples_ns)
+    return {'mean_ns': statistics.fmean(ordered), 'p50_ns': ordered[len(ordered) // 2],
+            'p99_ns': ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)]}
+
+
+def _time_calls(func, calls: int) -> dict:
+    """Time calls to func one at a time, with the garbage collector off so it does not skew the tail."""
+    samples = []
+    clock = time.perf_counter_ns
+    gc.disable()
+    try:
+        for _ in range(calls):
+            start = clock()
+            func()
+            samples.append(clock() - start)
+    finally:
+        gc.enable()
+    return _percentiles(samples)
+
+
+def bench_operations(calls: int) -> dict:
+    """Latency of Calculator.add/subtract/multiply/divide, including recording the history entry."""
+    a, b = Decimal('12.5'), Decimal('3.75')
+    results = {}
+    with Calculations.session(Calculations.new_session()):
+        for name in ('add', 'subtract', 'multiply', 'divide'):
+            operation = getattr(Calculator, name)
+            results[name] = _time_calls(lambda operation=operation: operation(a, b), calls)
+    return results
+
+
+def bench_dispatch(calls: int) -> dict:
+    """Cost of CommandHandler.execute_command: a no-op command (untimed and with CommandStats), and a real Add."""
+    from calculator.repl import CalculatorREPL  # pylint: disable=import-outside-toplevel
+    handler = CommandHandler()
+    handler.register_command('Noop', NoOpCommand())
+    results = {'noop': _time_calls(lambda: handler.execute_command('Noop 12.5 3.75'), calls)}
+    handler.stats = CommandStats()
+    results['noop_timed'] = _time_calls(lambda: handler.execute_command('Noop 12.5 3.75'), calls)
+    repl_handler = CalculatorREPL().command_handler
+    with Calculations.session(Calculations.new_session()), \
+            open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        results['add'] = _time_calls(lambda: repl_handler.execute_command('Add 12.5 3.75'), calls)
+    return results
+
+
+def bench_startup(samples: int) -> dict:
+    """REPL construction in this process, loading every plugin, and startup in fresh interpreters."""
+    from calculator.repl import CalculatorREPL  # pylint: disable=import-outside-toplevel
+    construct, load_all = [], []
+    for _ in range(samples):
+        start = time.perf_counter()
+        repl = CalculatorREPL()
+        constructed = time.perf_counter()
+        for command in list(repl.command_handler.commands.values()):
+            command.load()
+        construct.append(constructed - start)
+        load_all.append(time.perf_counter() - constructed)
+    results = {'construct_seconds': statistics.median(construct),
+               'load_plugins_seconds': statistics.median(load_all)}
+    results.update({f'process_{scenario}_seconds': seconds
+                    for scenario, seconds in process_startup.run(samples).items()})
+    return results
+
+
+def _fill_history(rows: int):
+    """Add rows entries to the current history in one bulk append."""
+    values = [Decimal(i) / 4 for i in range(rows)]
+    ones = [Decimal(1)] * rows
+    Calculations.add_calculations(add, values, ones, [value + 1 for value in values])
+
+
+def _save_and_load(path: str, rows: int) -> tuple:
+    """Save rows entries to a new file at path and load them back; returns both durations."""
+    Calculations.file_path = path
+    with Calculations.session(Calculations.new_session()):
+        _fill_history(rows)
+        start = time.perf_counter()
+        Calculations.save_history(append=False, deduplicate=False)
+        saved = time.perf_counter()
+        Calculations.load_history()
+        loaded = time.perf_counter()
+        assert len(Calculations.history) == rows
+    return saved - start, loaded - saved
+
+
+def bench_history(row_counts, extension: str = '.csv') -> dict:
+    """Time a full save of rows entries to a new file, and loading it back."""
+    results = {}
+    original_path = Calculations.file_path
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            _save_and_load(os.path.join(tmp, f'warmup{extension}'), 10)  # Imports the storage modules untimed
+            for rows in row_counts:
+                path = os.path.join(tmp, f'history-{rows}{extension}')
+                save, load = _save_and_load(path, rows)
+                results[str(rows)] = {'save_seconds': save, 'load_seconds': load,
+                                      'file_bytes': os.path.getsize(path)}
+        finally:
+            Calculations.file_path = original_path
+    return results
+
+
+def _traced_bytes(build) -> float:
+    """Return the memory still allocated by the object that build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return current
+
+
+def bench_memory(entries: int = MEMORY_ENTRIES) -> dict:
+    """Bytes per history entry in the columnar store, against a list of Calculation objects."""
+    a_values = [Decimal(i) / 4 for i in range(entries)]
+    b_values = [Decimal(i % 97 + 1) for i in range(entries)]
+    results = [a + b for a, b in zip(a_values, b_values)]
+
+    def build_store():
+        history = HistoryStore()
+        history.extend_operation(add, a_values, b_values, results)
+        return history
+
+    def build_objects():
+        return [Calculation(a, b, add, result) for a, b, result in zip(a_values, b_values, results)]
+
+    return {'history_store_bytes_per_entry': _traced_bytes(build_store) / entries,
+            'calculation_list_bytes_per_entry': _traced_bytes(build_objects) / entries}
+
+
+def run(row_counts=None, calls: int = DEFAULT_CALLS, startup_samples: int = 5) -> dict:
+    """Run every benchmark and return the results with details of the environment."""
+    return {
+        'meta': {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'calls': calls, 'rows': list(row_counts or DEFAULT_ROWS)},
+        'operations': bench_operations(calls),
+        'dispatch': bench_dispatch(calls),
+        'startup': bench_startup(startup_samples),
+        'history_csv': bench_history(row_counts or DEFAULT_ROWS),
+        'memory': bench_memory(),
+    }
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """Return the numeric metrics of a results dict keyed by dotted path, skipping 'meta'."""
+    metrics = {}
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            metrics[f"{prefix}{key}"] = value
+    return metrics
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Return (metric, baseline, current, change) for every metric in both runs that got worse by more than threshold."""
+    before, after = flatten(baseline), flatten(current)
+    regressions = []
+    for metric in sorted(before.keys() & after.keys()):
+        if before[metric] > 0:
+            change = after[metric] / before[metric] - 1
+            if change > threshold:
+                regressions.append((metric, before[metric], after[metric], change))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON file to write results to")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown reported as a regression (default 0.10)")
+    parser.add_argument('--rows', type=int, nargs='+', help="history sizes to save and load")
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS, help="timed calls per latency benchmark")
+    parser.add_argument('--quick', action='store_true', help="small sizes, for a fast smoke run")
+    args = parser.parse_args(argv)
+    rows = args.rows or (QUICK_ROWS if args.quick else DEFAULT_ROWS)
+    calls = min(args.calls, 2_000) if args.quick else args.calls
+
+    results = run(rows, calls, startup_samples=2 if args.quick else 5)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    for metric, value in flatten(results).items():
+        print(f"{metric:<55} {value:>14.6g}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for metric, before, after, change in regressions:
+            print(f"REGRESSION {metric}: {before:.6g} -> {after:.6g} ({change:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Benchmark: how long exit takes to save a long session, with and without autosave.
+
+Without autosave every entry of the session is written when it exits. With autosave the
+entries were appended in the background while the session ran, so exit only writes the
+entries added since the last autosave.
+
+Run with: python -m benchmarks.bench_autosave [ENTRIES]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from calculator.calculations import HistorySession
+from calculator.operations import add
+
+DEFAULT_ENTRIES = 200_000
+BATCH = 1_000  # Entries added per simulated burst of commands
+
+
+def sample(autosave: bool, entries: int, directory: str) -> dict:
+    """Run a session adding entries in bursts and time its final save."""
+    session = HistorySession(file_path=os.path.join(directory, f'autosave-{autosave}.csv'))
+    if autosave:
+        session.enable_autosave(interval=0.05, dirty_entries=50_000)
+    start = time.perf_counter()
+    for first in range(0, entries, BATCH):
+        values = [Decimal(i) for i in range(first, first + BATCH)]
+        session.add_calculations(add, values, [Decimal(1)] * BATCH, [value + 1 for value in values])
+        time.sleep(0.001)  # Time between commands, when the autosave thread gets to run
+    session_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    if autosave:
+        session.disable_autosave()
+    else:
+        session.save_history()
+    return {'session_seconds': session_seconds, 'exit_seconds': time.perf_counter() - start,
+            'autosaves': session.autosaves}
+
+
+def run(entries: int = DEFAULT_ENTRIES) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        return {'save_on_exit': sample(False, entries, directory), 'autosave': sample(True, entries, directory)}
+
+
+def main(argv=None):
+    entries = int(argv[0]) if argv else DEFAULT_ENTRIES
+    print(f"{entries} entries:")
+    print(f"{'':>13} {'session s':>10} {'exit s':>8} {'autosaves':>10}")
+    for name, result in run(entries).items():
+        print(f"{name:>13} {result['session_seconds']:>10.3f} {result['exit_seconds']:>8.3f} {result['autosaves']:>10}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
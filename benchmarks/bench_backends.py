@@ -0,0 +1,46 @@
+"""Benchmark: Calculator throughput with each numeric backend.
+
+Each backend runs the same mix of add/subtract/multiply/divide calls through the Calculator
+API, with operands already in the backend's number type, including recording in the history.
+
+Run with: python -m benchmarks.bench_backends [CALLS]
+"""
+import sys
+import time
+from decimal import Decimal
+from calculator import Calculator
+from calculator.backends import get_backend
+from calculator.calculations import Calculations
+
+DEFAULT_CALLS = 200_000
+BACKENDS = ['float', 'decimal', 'decimal:50', 'fraction']
+OPERATIONS = [Calculator.add, Calculator.subtract, Calculator.multiply, Calculator.divide]
+
+
+def run(calls: int = DEFAULT_CALLS, backends=None) -> list:
+    """Return calls per second for each backend."""
+    operands = [(Decimal(i % 1000) / 4, Decimal(i % 97 + 1)) for i in range(calls)]
+    results = []
+    for name in backends or BACKENDS:
+        backend = get_backend(name)
+        native = [(backend.convert(a), backend.convert(b)) for a, b in operands]
+        Calculations.clear_history()
+        start = time.perf_counter()
+        for i, (a, b) in enumerate(native):
+            OPERATIONS[i & 3](a, b, backend)
+        elapsed = time.perf_counter() - start
+        results.append({'backend': name, 'seconds': elapsed, 'calls_per_second': calls / elapsed})
+    Calculations.clear_history()
+    return results
+
+
+def main(argv=None):
+    results = run(int(argv[0]) if argv else DEFAULT_CALLS)
+    baseline = next(result['calls_per_second'] for result in results if result['backend'] == 'decimal')
+    for result in results:
+        print(f"{result['backend']:>11}: {result['calls_per_second']:>10,.0f} calls/s "
+              f"({result['calls_per_second'] / baseline:.2f}x decimal)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+"""Benchmark: batch-mode throughput for arithmetic commands.
+
+Run with: python -m benchmarks.bench_batch [COMMANDS]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from calculator.calculations import Calculations
+from calculator.repl import CalculatorREPL
+
+DEFAULT_COMMANDS = 200_000
+COMMANDS = ['Add', 'Subtract', 'Multiply', 'Divide']
+
+
+def command_lines(count: int):
+    """Return count arithmetic command lines."""
+    return [f"{COMMANDS[i % 4]} {i % 1000}.25 {i % 97 + 1}\n" for i in range(count)]
+
+
+def run(count: int = DEFAULT_COMMANDS) -> dict:
+    """Run count commands through batch mode and return the timing."""
+    lines = command_lines(count)
+    original_path = Calculations.file_path
+    with tempfile.TemporaryDirectory() as tmp:
+        Calculations.file_path = os.path.join(tmp, 'history.csv')
+        try:
+            repl = CalculatorREPL()
+            Calculations.clear_history()
+            Calculations._cleared = False  # pylint: disable=protected-access
+            Calculations.save_history(append=False)  # Import the persistence dependencies up front
+            start = time.perf_counter()
+            executed, failed = repl.run_batch(lines, output=io.StringIO(), errors=io.StringIO())
+            elapsed = time.perf_counter() - start
+            # Time the final flush separately by saving the same entries again
+            Calculations._saved_count = 0  # pylint: disable=protected-access
+            os.remove(Calculations.file_path)
+            start = time.perf_counter()
+            Calculations.save_history()
+            save = time.perf_counter() - start
+        finally:
+            Calculations.file_path = original_path
+            Calculations.clear_history()
+    return {'commands': executed, 'errors': failed, 'seconds': elapsed, 'save_seconds': save,
+            'commands_per_second': executed / elapsed, 'execute_per_second': executed / (elapsed - save)}
+
+
+def main(argv=None):
+    result = run(int(argv[0]) if argv else DEFAULT_COMMANDS)
+    print(f"{result['commands']} commands in {result['seconds']:.2f} s, {result['errors']} errors")
+    print(f"  including the final save: {result['commands_per_second']:>10,.0f} commands/s")
+    print(f"  excluding the final save: {result['execute_per_second']:>10,.0f} commands/s "
+          f"(save took {result['save_seconds']:.2f} s)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
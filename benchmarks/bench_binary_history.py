@@ -0,0 +1,79 @@
+"""Benchmark: opening a large binary history and reading from its end.
+
+Builds a binary history file of ENTRIES records (default 10M, about 320 MB) by repeating a
+block of saved records, then times load_history, get_latest and a 100-entry slice. The CSV
+load time for a smaller file is printed for comparison.
+
+Run with: python -m benchmarks.bench_binary_history [ENTRIES]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from calculator import Calculator
+from calculator.calculations import Calculations
+from calculator.storage.binary_backend import HEADER_SIZE
+
+DEFAULT_ENTRIES = 10_000_000
+BLOCK = 10_000
+CSV_ENTRIES = 100_000
+
+
+def _fill_history(count: int):
+    Calculations.clear_history()
+    for i in range(count):
+        Calculator.divide(Decimal(i) / 4, i % 97 + 1)
+
+
+def write_binary(path: str, entries: int):
+    """Save BLOCK calculations, then repeat their records until the file holds entries records."""
+    _fill_history(BLOCK)
+    Calculations.save_history(append=True)
+    with open(path, 'r+b') as f:
+        f.seek(HEADER_SIZE)
+        block = f.read()
+        f.seek(0, os.SEEK_END)
+        for _ in range(entries // BLOCK - 1):
+            f.write(block)
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(entries: int = DEFAULT_ENTRIES) -> dict:
+    """Return load and access times for the binary file, and the CSV load time for comparison."""
+    original_path = Calculations.file_path
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            Calculations.file_path = os.path.join(tmp, 'history.bin')
+            write_binary(Calculations.file_path, entries)
+            load = _time(Calculations.load_history)
+            count = len(Calculations.history)
+            latest = _time(Calculations.get_latest)
+            tail = _time(lambda: Calculations.history[-100:])
+            Calculations.file_path = os.path.join(tmp, 'history.csv')
+            _fill_history(CSV_ENTRIES)
+            Calculations.save_history(append=True)
+            csv_load = _time(Calculations.load_history)
+        finally:
+            Calculations.file_path = original_path
+            Calculations.clear_history()
+    return {'entries': count, 'load_seconds': load, 'latest_seconds': latest, 'tail_seconds': tail,
+            'csv_entries': CSV_ENTRIES, 'csv_load_seconds': csv_load}
+
+
+def main(argv=None):
+    result = run(int(argv[0]) if argv else DEFAULT_ENTRIES)
+    print(f"binary, {result['entries']:,} entries:")
+    print(f"  load_history: {result['load_seconds'] * 1000:8.2f} ms")
+    print(f"  get_latest:   {result['latest_seconds'] * 1000:8.3f} ms")
+    print(f"  last 100:     {result['tail_seconds'] * 1000:8.3f} ms")
+    print(f"CSV, {result['csv_entries']:,} entries: load_history {result['csv_load_seconds'] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+"""Benchmark: bulk arithmetic against one Calculator call per pair.
+
+Run with: python -m benchmarks.bench_bulk [COUNT]
+"""
+import sys
+import time
+from decimal import Decimal
+import numpy as np
+from calculator import Calculator
+from calculator.calculations import Calculations
+
+DEFAULT_COUNT = 1_000_000
+SCALAR_COUNT = 100_000  # The per-call loop is timed on fewer pairs and scaled
+
+
+def _rate(count: int, call) -> float:
+    Calculations.clear_history()
+    start = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - start
+    Calculations.clear_history()
+    return count / elapsed
+
+
+def run(count: int = DEFAULT_COUNT) -> dict:
+    """Return operations per second for the per-call, bulk float64 and bulk exact paths."""
+    a = np.arange(count, dtype=np.float64) / 4
+    b = np.arange(count, dtype=np.float64) % 97 + 1
+    scalar_count = min(count, SCALAR_COUNT)
+    a_decimal = [Decimal(value) for value in a[:scalar_count].tolist()]
+    b_decimal = [Decimal(value) for value in b[:scalar_count].tolist()]
+
+    def per_call():
+        for x, y in zip(a_decimal, b_decimal):
+            Calculator.divide(x, y)
+    return {'count': count,
+            'per_call': _rate(scalar_count, per_call),
+            'bulk_float': _rate(count, lambda: Calculator.divide_many(a, b)),
+            'bulk_exact': _rate(scalar_count, lambda: Calculator.divide_many(a_decimal, b_decimal, exact=True))}
+
+
+def main(argv=None):
+    result = run(int(argv[0]) if argv else DEFAULT_COUNT)
+    print(f"Divide, recorded in history ({result['count']} pairs for the float64 path):")
+    print(f"  one call per pair: {result['per_call']:>14,.0f} ops/s")
+    print(f"  bulk float64:      {result['bulk_float']:>14,.0f} ops/s")
+    print(f"  bulk exact:        {result['bulk_exact']:>14,.0f} ops/s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
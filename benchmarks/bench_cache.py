@@ -0,0 +1,50 @@
+"""Benchmark: repeated high-precision divisions with and without the result cache.
+
+Run with: python -m benchmarks.bench_cache [CALLS] [DISTINCT_PAIRS]
+"""
+import sys
+import time
+from decimal import Decimal
+from calculator import Calculator
+from calculator.cache import ResultCache
+from calculator.calculations import Calculations
+
+DEFAULT_CALLS = 100_000
+DEFAULT_DISTINCT = 1_000
+BACKEND = 'decimal:200'
+
+
+def _rate(pairs, cache) -> float:
+    Calculator.cache = cache
+    Calculations.clear_history()
+    start = time.perf_counter()
+    for a, b in pairs:
+        Calculator.divide(a, b, BACKEND)
+    elapsed = time.perf_counter() - start
+    Calculations.clear_history()
+    return len(pairs) / elapsed
+
+
+def run(calls: int = DEFAULT_CALLS, distinct: int = DEFAULT_DISTINCT) -> dict:
+    """Return divisions per second uncached and with a cache large enough for every pair."""
+    pairs = [(Decimal(i % distinct + 1), Decimal(i % distinct % 89 + 7)) for i in range(calls)]
+    original = Calculator.cache
+    try:
+        uncached = _rate(pairs, None)
+        cache = ResultCache(distinct)
+        cached = _rate(pairs, cache)
+    finally:
+        Calculator.cache = original
+    return {'calls': calls, 'distinct': distinct, 'uncached': uncached, 'cached': cached,
+            'hit_rate': cache.stats()['hit_rate']}
+
+
+def main(argv=None):
+    result = run(*[int(arg) for arg in argv or []])
+    print(f"{result['calls']} divisions ({BACKEND}) over {result['distinct']} distinct pairs:")
+    print(f"  uncached: {result['uncached']:>10,.0f} calls/s")
+    print(f"  cached:   {result['cached']:>10,.0f} calls/s (hit rate {result['hit_rate']:.1%})")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
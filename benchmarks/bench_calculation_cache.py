@@ -0,0 +1,67 @@
+"""Benchmark: create and save calculations with and without the cached result.
+
+The "uncached" variant reproduces the previous Calculation, which had a __dict__ and
+re-ran the operation on every perform() call.
+
+Run with: python -m benchmarks.bench_calculation_cache [COUNT]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations
+from calculator.operations import add, subtract, multiply, divide
+
+DEFAULT_COUNT = 1_000_000
+
+
+class UncachedCalculation:
+    """The Calculation class as it was before results were cached."""
+    def __init__(self, a, b, operation):
+        self.a = a
+        self.b = b
+        self.operation = operation
+
+    def perform(self):
+        return self.operation(self.a, self.b)
+
+
+def create_and_save(calculation_class, count: int, path: str):
+    """Record count calculations the way Calculator does, then save them; return both timings."""
+    operations = [add, subtract, multiply, divide]
+    operands = [(Decimal(i) / 4, Decimal(i % 97 + 1)) for i in range(1000)]
+    Calculations.clear_history()
+    Calculations._cleared = False  # pylint: disable=protected-access
+    start = time.perf_counter()
+    for i in range(count):
+        a, b = operands[i % 1000]
+        calculation = calculation_class(a, b, operations[i % 4])
+        calculation.perform()  # The command computes the result...
+        Calculations.add_calculation(calculation)  # ...and the history stores it
+    created = time.perf_counter()
+    Calculations.save_history(append=False, deduplicate=False)
+    saved = time.perf_counter()
+    os.remove(path)
+    return created - start, saved - created
+
+
+def main(argv=None):
+    count = int(argv[0]) if argv else DEFAULT_COUNT
+    original_path = Calculations.file_path
+    with tempfile.TemporaryDirectory() as tmp:
+        Calculations.file_path = os.path.join(tmp, 'history.csv')
+        try:
+            print(f"{count} calculations")
+            print(f"{'variant':>10} {'create (s)':>11} {'save (s)':>9}")
+            for name, calculation_class in (('uncached', UncachedCalculation), ('cached', Calculation)):
+                create, save = create_and_save(calculation_class, count, Calculations.file_path)
+                print(f"{name:>10} {create:>11.3f} {save:>9.3f}")
+        finally:
+            Calculations.file_path = original_path
+            Calculations.clear_history()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
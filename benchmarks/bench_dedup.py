@@ -0,0 +1,78 @@
+"""Benchmark: deduplicating saves against a large history file, with and without the row index.
+
+For each file format, ROWS entries are saved, then NEW entries (half of them already stored)
+are saved with rewrite deduplication three ways: the full merge that reads and rewrites the
+whole file, the first save through the row index (which has to build it from the file), and
+a save with the index already built, which only hashes the new entries.
+
+Run with: python -m benchmarks.bench_dedup [ROWS] [NEW]
+"""
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+from unittest.mock import patch
+from calculator.history_store import HistoryStore
+from calculator.operations import OPERATIONS
+from calculator.storage import open_history_backend
+from calculator.storage.row_index import INDEX_SUFFIX
+from benchmarks.bench_storage import build_history
+
+DEFAULT_ROWS = 200_000
+DEFAULT_NEW = 1_000
+FILES = ['history.csv', 'history.bin']
+
+
+def _prefix(history: HistoryStore, count: int) -> HistoryStore:
+    """Return a store with the first count entries of history."""
+    a, b, operations, results, backends = zip(*islice(history.rows(), count))
+    store = HistoryStore()
+    store.extend_columns(a, b, [OPERATIONS[name] for name in operations], results, backends)
+    return store
+
+
+def _timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def sample(name: str, rows: int, new: int, directory: str) -> dict:
+    """Time the three kinds of deduplicating save for one file format."""
+    history = build_history(rows + new)
+    saved = _prefix(history, rows)
+    first_new, second_new = rows - new // 2, rows  # Each save's entries start half inside what is stored
+    full_path, index_path = (os.path.join(directory, f'{kind}-{name}') for kind in ('full', 'indexed'))
+    for path in (full_path, index_path):
+        open_history_backend(path).save(saved, 0, append=True, deduplicate=False)
+    os.remove(index_path + INDEX_SUFFIX)  # The first indexed save finds no index and builds one
+
+    full = open_history_backend(full_path)
+    with patch.object(full, '_has_unique_rows', return_value=False):  # Always take the full merge
+        full_seconds = _timed(full.save, _prefix(history, rows + new // 2), first_new, False, True)
+    indexed = open_history_backend(index_path)
+    build_seconds = _timed(indexed.save, _prefix(history, rows + new // 2), first_new, False, True)
+    indexed_seconds = _timed(indexed.save, history, second_new, False, True)
+    return {'backend': full.name, 'rows': rows, 'new': new, 'full_merge_seconds': full_seconds,
+            'index_build_seconds': build_seconds, 'indexed_seconds': indexed_seconds}
+
+
+def run(rows: int = DEFAULT_ROWS, new: int = DEFAULT_NEW) -> list:
+    with tempfile.TemporaryDirectory() as directory:
+        return [sample(name, rows, new, directory) for name in FILES]
+
+
+def main(argv=None):
+    argv = argv or []
+    rows = int(argv[0]) if argv else DEFAULT_ROWS
+    new = int(argv[1]) if len(argv) > 1 else DEFAULT_NEW
+    print(f"Deduplicating {new} new entries against {rows} saved ones:")
+    print(f"{'backend':>8} {'full merge s':>13} {'first save s':>13} {'indexed ms':>11}")
+    for result in run(rows, new):
+        print(f"{result['backend']:>8} {result['full_merge_seconds']:>13.3f} {result['index_build_seconds']:>13.3f} "
+              f"{result['indexed_seconds'] * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
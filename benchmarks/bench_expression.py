@@ -0,0 +1,40 @@
+"""Benchmark: evaluating one expression template with changing variables, cached and uncached.
+
+Run with: python -m benchmarks.bench_expression [EVALUATIONS]
+"""
+import sys
+import time
+from calculator import Calculator
+from calculator.calculations import Calculations
+from calculator.expression import Program, evaluate, parse
+
+DEFAULT_EVALUATIONS = 20_000
+EXPRESSION = "(x + 2) * (y - 3) / (4 * 5) - x * y + 7"
+
+
+def _rate(evaluate_once, evaluations: int) -> float:
+    start = time.perf_counter()
+    for i in range(evaluations):
+        evaluate_once({'x': i, 'y': i % 13})
+    elapsed = time.perf_counter() - start
+    Calculations.clear_history()
+    return evaluations / elapsed
+
+
+def run(evaluations: int = DEFAULT_EVALUATIONS) -> dict:
+    """Return evaluations per second with the template cache, and when every call parses and compiles."""
+    cached = _rate(lambda bindings: evaluate(EXPRESSION, bindings), evaluations)
+    uncached = _rate(lambda bindings: Program(parse(EXPRESSION), Calculator.backend).evaluate(bindings),
+                     evaluations)
+    return {'evaluations': evaluations, 'cached': cached, 'uncached': uncached}
+
+
+def main(argv=None):
+    result = run(*[int(arg) for arg in argv or []])
+    print(f"{result['evaluations']} evaluations of {EXPRESSION}:")
+    print(f"  compiled once: {result['cached']:>10,.0f} evaluations/s")
+    print(f"  every call:    {result['uncached']:>10,.0f} evaluations/s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
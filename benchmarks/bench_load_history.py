@@ -0,0 +1,73 @@
+"""Benchmark: history load time against row count.
+
+Run with: python -m benchmarks.bench_load_history [ROWS ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+import pandas as pd
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations
+from calculator.operations import OPERATIONS
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000, 1_000_000]
+ITERROWS_LIMIT = 100_000  # The row-by-row baseline is too slow to run beyond this
+
+
+def write_history(path: str, rows: int):
+    """Write a synthetic history CSV with the given number of rows."""
+    names = list(OPERATIONS)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('a,b,operation,result\n')
+        for i in range(rows):
+            f.write(f"{i}.5,{i % 97 + 1},{names[i % len(names)]},0\n")
+
+
+def load_iterrows(path: str):
+    """The original row-by-row loader, kept as a baseline."""
+    df = pd.read_csv(path)
+    return [Calculation(Decimal(row['a']), Decimal(row['b']), OPERATIONS[row['operation']])
+            for _, row in df.iterrows()]
+
+
+def time_call(func) -> float:
+    """Return the wall-clock time of a single call in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(row_counts):
+    """Time both loaders for each row count and return the results."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        original_path = Calculations.file_path
+        Calculations.file_path = path
+        try:
+            for rows in row_counts:
+                write_history(path, rows)
+                bulk = time_call(Calculations.load_history)
+                assert len(Calculations.get_history()) == rows
+                baseline = time_call(lambda: load_iterrows(path)) if rows <= ITERROWS_LIMIT else None
+                results.append({'rows': rows, 'bulk_seconds': bulk, 'iterrows_seconds': baseline})
+        finally:
+            Calculations.file_path = original_path
+            Calculations.clear_history()
+    return results
+
+
+def main(argv=None):
+    row_counts = [int(arg) for arg in (argv or [])] or DEFAULT_ROWS
+    print(f"{'rows':>10} {'bulk (s)':>10} {'iterrows (s)':>13} {'speedup':>8}")
+    for result in run(row_counts):
+        baseline = result['iterrows_seconds']
+        speedup = f"{baseline / result['bulk_seconds']:.1f}x" if baseline else '-'
+        baseline = f"{baseline:.3f}" if baseline else '-'
+        print(f"{result['rows']:>10} {result['bulk_seconds']:>10.3f} {baseline:>13} {speedup:>8}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""Benchmark: per-command latency with file logging done directly or through a background queue.
+
+Both runs log at DEBUG, so every command writes its "Added calculation" line, and errors are
+logged the way the REPL logs them. The file handler is a RotatingFileHandler configured like
+logging.conf (1 MiB files, 5 backups), so rotation happens during the run.
+
+Run with: python -m benchmarks.bench_logging [COMMANDS]
+"""
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from calculator.calculations import Calculations
+from calculator.commands import CommandHandler
+from calculator.log_queue import start_queue_logging, stop_queue_logging
+from calculator.plugins.add import AddCommand
+from calculator.plugins.divide import DivideCommand
+
+DEFAULT_COMMANDS = 20_000
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def _latencies(handler: CommandHandler, commands: int):
+    """Run Add and failing Divide commands and return each one's latency in microseconds."""
+    samples = []
+    clock = time.perf_counter
+    for i in range(commands):
+        user_input = f'Divide {i} 0' if i % 10 == 9 else f'Add {i} 1'  # Errors are logged too
+        start = clock()
+        try:
+            handler.execute_command(user_input)
+        except (ValueError, ZeroDivisionError) as e:
+            logging.error("Error executing command: %s", e)
+        samples.append((clock() - start) * 1e6)
+    return samples
+
+
+def sample(queued: bool, commands: int, directory: str) -> dict:
+    """Return latency percentiles for one configuration, with the root logger writing to directory."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    for existing in saved_handlers:
+        root.removeHandler(existing)
+    file_handler = RotatingFileHandler(os.path.join(directory, f'app-{queued}.log'), 'a', 1048576, 5)
+    file_handler.setFormatter(logging.Formatter(FORMAT))
+    root.addHandler(file_handler)
+    root.setLevel(logging.DEBUG)
+    handler = CommandHandler()
+    handler.register_command('Add', AddCommand())
+    handler.register_command('Divide', DivideCommand())
+    try:
+        if queued:
+            start_queue_logging()
+        with Calculations.session(Calculations.new_session()), \
+                open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            samples = sorted(_latencies(handler, commands))
+        flush_start = time.perf_counter()
+        stop_queue_logging()
+        flush = time.perf_counter() - flush_start
+    finally:
+        stop_queue_logging()
+        root.removeHandler(file_handler)
+        file_handler.close()
+        for existing in saved_handlers:
+            root.addHandler(existing)
+        root.setLevel(saved_level)
+    return {'mean_us': statistics.fmean(samples), 'p50_us': samples[len(samples) // 2],
+            'p99_us': samples[len(samples) * 99 // 100], 'max_us': samples[-1], 'flush_seconds': flush}
+
+
+def run(commands: int = DEFAULT_COMMANDS) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        return {'direct': sample(False, commands, directory), 'queued': sample(True, commands, directory)}
+
+
+def main(argv=None):
+    commands = int(argv[0]) if argv else DEFAULT_COMMANDS
+    print(f"{commands} commands with DEBUG logging to a rotating file:")
+    print(f"{'':>8} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9} {'flush s':>8}")
+    for name, result in run(commands).items():
+        print(f"{name:>8} {result['mean_us']:>9.1f} {result['p50_us']:>9.1f} {result['p99_us']:>9.1f} "
+              f"{result['max_us']:>9.1f} {result['flush_seconds']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
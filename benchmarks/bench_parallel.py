@@ -0,0 +1,57 @@
+"""Benchmark: parallel command-file throughput at 1, 2, 4 and 8 workers.
+
+Speedup is relative to the single-worker run, so it only reflects the cores actually
+available on the machine running it.
+
+Run with: python -m benchmarks.bench_parallel [COMMANDS]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from calculator.calculations import Calculations
+from calculator.parallel import run_parallel
+from benchmarks.bench_batch import command_lines
+
+DEFAULT_COMMANDS = 1_000_000
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def run(count: int = DEFAULT_COMMANDS, worker_counts=None):
+    """Run the same command file at each worker count and return the timings."""
+    results = []
+    original_path = Calculations.file_path
+    with tempfile.TemporaryDirectory() as tmp:
+        commands = os.path.join(tmp, 'commands.txt')
+        with open(commands, 'w', encoding='utf-8') as f:
+            f.writelines(command_lines(count))
+        Calculations.file_path = os.path.join(tmp, 'history.csv')
+        try:
+            for workers in worker_counts or WORKER_COUNTS:
+                Calculations.clear_history()
+                if os.path.exists(Calculations.file_path):
+                    os.remove(Calculations.file_path)
+                start = time.perf_counter()
+                run_parallel(commands, workers=workers, output=io.StringIO(), errors=io.StringIO())
+                results.append({'workers': workers, 'seconds': time.perf_counter() - start})
+        finally:
+            Calculations.file_path = original_path
+            Calculations.clear_history()
+    for result in results:
+        result['speedup'] = results[0]['seconds'] / result['seconds']
+        result['commands_per_second'] = count / result['seconds']
+    return results
+
+
+def main(argv=None):
+    count = int(argv[0]) if argv else DEFAULT_COMMANDS
+    print(f"{count} commands on {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>8} {'commands/s':>12} {'speedup':>8}")
+    for result in run(count):
+        print(f"{result['workers']:>8} {result['seconds']:>8.2f} {result['commands_per_second']:>12,.0f} "
+              f"{result['speedup']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,96 @@
+"""Benchmark: load generator for the network server.
+
+Starts `main.py --serve` in a subprocess, then drives it from several concurrent
+connections, each keeping a window of pipelined requests in flight. Reports requests/s
+and p50/p99 latency (time from sending a request to reading its response).
+
+Run with: python -m benchmarks.bench_server [REQUESTS] [CONNECTIONS] [DEPTH]
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from benchmarks.bench_batch import COMMANDS
+
+DEFAULT_REQUESTS = 100_000
+DEFAULT_CONNECTIONS = 8
+DEFAULT_DEPTH = 32
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_server(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def _client(port: int, requests: int, depth: int, latencies: list):
+    """Send requests in pipelined windows of `depth`, recording each request's latency."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    sent = 0
+    while sent < requests:
+        window = min(depth, requests - sent)
+        lines = ''.join(f"{COMMANDS[(sent + i) % 4]} {(sent + i) % 1000}.25 {i + 1}\n" for i in range(window))
+        start = time.perf_counter()
+        writer.write(lines.encode())
+        for _ in range(window):
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        sent += window
+    writer.write(b"exit\n")
+    await writer.drain()
+    writer.close()
+
+
+async def _load(port: int, requests: int, connections: int, depth: int):
+    await _wait_for_server(port)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, requests // connections, depth, latencies)
+                           for _ in range(connections)))
+    return time.perf_counter() - start, latencies
+
+
+def run(requests: int = DEFAULT_REQUESTS, connections: int = DEFAULT_CONNECTIONS,
+        depth: int = DEFAULT_DEPTH) -> dict:
+    """Drive a server subprocess and return throughput and latency percentiles."""
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, 'main.py', '--serve', f'127.0.0.1:{port}'], cwd=ROOT,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        elapsed, latencies = asyncio.run(_load(port, requests, connections, depth))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    return {'requests': len(latencies), 'seconds': elapsed,
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000}
+
+
+def main(argv=None):
+    args = [int(arg) for arg in argv or []]
+    result = run(*args)
+    print(f"{result['requests']} requests in {result['seconds']:.2f} s: "
+          f"{result['requests_per_second']:,.0f} requests/s, "
+          f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+"""Benchmark: history throughput with one thread and with many threads sharing a session.
+
+Each thread adds to its own buffer, so threads should not contend on the session lock;
+they still share the GIL, so the aim is that throughput with many threads stays close to
+one thread's rather than collapsing. The same number of operations is run either way, and
+every 10,000 operations a thread reads the history, merging every buffer while others write.
+
+Run with: python -m benchmarks.bench_sessions [OPERATIONS] [THREADS]
+"""
+import sys
+import threading
+import time
+from decimal import Decimal
+from calculator import Calculator
+from calculator.calculations import Calculations, HistorySession
+
+DEFAULT_OPERATIONS = 1_000_000
+DEFAULT_THREADS = 16
+READ_EVERY = 10_000
+
+
+def _worker(index: int, operations: int):
+    a = Decimal(index)
+    for i in range(operations):
+        Calculator.add(a, Decimal(i))
+        if i % READ_EVERY == 0:
+            Calculations.count_by_operation('add')
+
+
+def sample(threads: int, operations: int) -> dict:
+    """Run operations split across threads on a fresh shared session; returns operations per second."""
+    per_thread = operations // threads
+    default_session, Calculations.default_session = Calculations.default_session, HistorySession()
+    try:
+        workers = [threading.Thread(target=_worker, args=(index, per_thread)) for index in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        entries = len(Calculations.history)  # Counted after merging what is left in the buffers
+        elapsed = time.perf_counter() - start
+    finally:
+        Calculations.default_session = default_session
+    return {'threads': threads, 'operations': threads * per_thread, 'entries': entries,
+            'ops_per_second': threads * per_thread / elapsed}
+
+
+def run(operations: int = DEFAULT_OPERATIONS, threads: int = DEFAULT_THREADS) -> list:
+    return [sample(1, operations), sample(threads, operations)]
+
+
+def main(argv=None):
+    argv = argv or []
+    operations = int(argv[0]) if argv else DEFAULT_OPERATIONS
+    threads = int(argv[1]) if len(argv) > 1 else DEFAULT_THREADS
+    print(f"{'threads':>8} {'operations':>11} {'entries':>10} {'ops/s':>12}")
+    for result in run(operations, threads):
+        print(f"{result['threads']:>8} {result['operations']:>11} {result['entries']:>10} "
+              f"{result['ops_per_second']:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
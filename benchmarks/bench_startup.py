@@ -0,0 +1,58 @@
+"""Benchmark: REPL startup time with a cold and a warm plugin manifest.
+
+Each sample runs in a fresh interpreter. "cold" deletes the cached manifest first,
+"warm" reuses it, and "eager" is a warm start that then imports every plugin, as the
+REPL did before plugins were loaded on first use.
+
+Run with: python -m benchmarks.bench_startup [SAMPLES]
+"""
+import os
+import statistics
+import subprocess
+import sys
+from calculator.plugin_manifest import MANIFEST_NAME
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGINS_PATH = os.path.join(ROOT, 'calculator', 'plugins')
+DEFAULT_SAMPLES = 10
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+from calculator.repl import CalculatorREPL
+repl = CalculatorREPL()
+imported = time.perf_counter()
+if {eager}:
+    for command in list(repl.command_handler.commands.values()):
+        command.load()
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def sample(eager: bool = False, cold: bool = False):
+    """Run one startup in a new interpreter and return (startup, startup + eager load) seconds."""
+    if cold and os.path.exists(os.path.join(PLUGINS_PATH, MANIFEST_NAME)):
+        os.remove(os.path.join(PLUGINS_PATH, MANIFEST_NAME))
+    output = subprocess.run([sys.executable, '-c', SNIPPET.format(eager=eager)], cwd=ROOT,
+                            check=True, capture_output=True, text=True).stdout
+    startup, total = map(float, output.split())
+    return startup, total
+
+
+def run(samples: int = DEFAULT_SAMPLES):
+    """Return the median startup time in seconds for each scenario."""
+    return {
+        'cold': statistics.median(sample(cold=True)[0] for _ in range(samples)),
+        'warm': statistics.median(sample()[0] for _ in range(samples)),
+        'eager': statistics.median(sample(eager=True)[1] for _ in range(samples)),
+    }
+
+
+def main(argv=None):
+    samples = int(argv[0]) if argv else DEFAULT_SAMPLES
+    for scenario, seconds in run(samples).items():
+        print(f"{scenario:>6}: {seconds * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
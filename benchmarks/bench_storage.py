@@ -0,0 +1,62 @@
+"""Benchmark: CSV against SQLite history storage.
+
+Measures save (insert) throughput and the time for a filtered query (one operation, a
+result range) for each backend.
+
+Run with: python -m benchmarks.bench_storage [ROWS]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from calculator.calculations import Calculations
+from calculator.history_store import HistoryStore
+from calculator.operations import OPERATIONS
+from calculator.storage import open_history_backend
+from benchmarks.bench_batch import command_lines
+
+DEFAULT_ROWS = 200_000
+FILES = ['history.csv', 'history.db']
+
+
+def build_history(rows: int) -> HistoryStore:
+    """Return a history of rows calculations like the ones batch mode produces."""
+    history = HistoryStore()
+    commands = [line.split() for line in command_lines(rows)]
+    operations = [name.lower() for name, _, _ in commands]
+    a = [Decimal(x) for _, x, _ in commands]
+    b = [Decimal(y) for _, _, y in commands]
+    history.extend_columns(a, b, [OPERATIONS[name] for name in operations],
+                           [OPERATIONS[name](x, y) for name, x, y in zip(operations, a, b)])
+    return history
+
+
+def run(rows: int = DEFAULT_ROWS) -> list:
+    """Time a save and a filtered query for each backend."""
+    history = build_history(rows)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in FILES:
+            backend = open_history_backend(os.path.join(tmp, name))
+            start = time.perf_counter()
+            backend.save(history, 0, append=True, deduplicate=False)
+            save = time.perf_counter() - start
+            start = time.perf_counter()
+            matches = backend.query('divide', min_result=100, max_result=101, batch_size=Calculations.load_batch_size)
+            query = time.perf_counter() - start
+            results.append({'backend': backend.name, 'rows': rows, 'save_seconds': save,
+                            'rows_per_second': rows / save, 'query_seconds': query, 'matches': len(matches)})
+    return results
+
+
+def main(argv=None):
+    results = run(int(argv[0]) if argv else DEFAULT_ROWS)
+    print(f"{'backend':>8} {'insert rows/s':>14} {'query (ms)':>11} {'matches':>8}")
+    for result in results:
+        print(f"{result['backend']:>8} {result['rows_per_second']:>14,.0f} "
+              f"{result['query_seconds'] * 1000:>11.1f} {result['matches']:>8}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,57 @@
+"""Benchmark: cost of making each new history entry durable.
+
+Compares adding entries with no durability until an explicit save, with the write-ahead
+log (group commit, fsync batched by size or time), and with an append save after every
+entry, which is what durability per command costs without the log.
+
+Run with: python -m benchmarks.bench_wal [ENTRIES]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from calculator.calculation import Calculation
+from calculator.calculations import HistorySession
+from calculator.operations import add
+
+DEFAULT_ENTRIES = 50_000
+SAVE_EACH_ENTRIES = 500  # Saving after every entry is slow; time fewer entries
+
+
+def sample(mode: str, entries: int, directory: str) -> dict:
+    """Time adding entries to a fresh session in one mode; returns microseconds per entry."""
+    session = HistorySession(file_path=os.path.join(directory, f'{mode}.csv'))
+    if mode == 'wal':
+        session.enable_wal(compact_entries=0)
+    calculations = [Calculation(Decimal(i), Decimal(1), add) for i in range(entries)]
+    start = time.perf_counter()
+    for calculation in calculations:
+        session.add_calculation(calculation)
+        if mode == 'save_each':
+            session.save_history(append=True)
+    elapsed = time.perf_counter() - start
+    result = {'entries': entries, 'us_per_entry': elapsed / entries * 1e6}
+    wal = session.wal
+    if wal is not None:
+        session.disable_wal()
+        result['commits'] = wal.commits
+    return result
+
+
+def run(entries: int = DEFAULT_ENTRIES) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        return {'memory_only': sample('memory_only', entries, directory),
+                'wal': sample('wal', entries, directory),
+                'save_each': sample('save_each', min(entries, SAVE_EACH_ENTRIES), directory)}
+
+
+def main(argv=None):
+    entries = int(argv[0]) if argv else DEFAULT_ENTRIES
+    print(f"{'':>12} {'entries':>8} {'us/entry':>10} {'fsyncs':>7}")
+    for name, result in run(entries).items():
+        print(f"{name:>12} {result['entries']:>8} {result['us_per_entry']:>10.2f} {result.get('commits', ''):>7}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
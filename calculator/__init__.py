@@ -2,37 +2,80 @@
 from calculator.calculations import Calculations
 from calculator.operations import add, subtract, multiply, divide
 from calculator.calculation import Calculation
+from calculator.bulk import BulkResult, compute
+from calculator.backends import NumericBackend, DecimalBackend, get_backend
+from calculator.cache import MISSING, ResultCache
 from decimal import Decimal
-from typing import Callable
+from typing import Callable, Optional, Union
 
 # Definition of the Calculator class
 class Calculator:
+    # Numeric backend used when a call does not name one; the REPL sets it from NUMERIC_BACKEND
+    backend: NumericBackend = DecimalBackend()
+    # Optional LRU cache of results; the REPL creates one when RESULT_CACHE_SIZE is set
+    cache: Optional[ResultCache] = None
+
     @staticmethod
-    def _perform_operation(a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal]) -> Decimal:
+    def _perform_operation(a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal],
+                           backend: Optional[Union[str, NumericBackend]] = None) -> Decimal:
         """Create and perform a calculation, then return the result."""
-        # Create a Calculation object using the static create method, passing in operands and the operation
-        calculation = Calculation.create(a, b, operation)
+        if backend is None:
+            backend = Calculator.backend
+        elif isinstance(backend, str):
+            backend = get_backend(backend)
+        a, b = backend.convert(a), backend.convert(b)
+        # Compute the result first so a failing operation is not recorded
+        cache = Calculator.cache
+        if cache is None:
+            result = backend.compute(operation, a, b)
+        else:
+            # Operands are keyed by text, so e.g. 1.0 and 1 (equal, but with different results) stay apart
+            key = (operation, backend.cache_key(), str(a), str(b))
+            result = cache.get(key)
+            if result is MISSING:
+                result = backend.compute(operation, a, b)
+                cache.put(key, result)
+        # Create a Calculation object using the static create method, keeping the result so it is never recomputed
+        calculation = Calculation.create(a, b, operation, result, backend.name)
         # Add the calculation to the history managed by the Calculations class
         Calculations.add_calculation(calculation)
-        # Perform the calculation and return the result
-        return calculation.perform()
+        return result
 
     @staticmethod
-    def add(a: Decimal, b: Decimal) -> Decimal:
+    def add(a: Decimal, b: Decimal, backend: Optional[Union[str, NumericBackend]] = None) -> Decimal:
         # Perform addition by delegating to the _perform_operation method with the add operation
-        return Calculator._perform_operation(a, b, add)
+        return Calculator._perform_operation(a, b, add, backend)
 
     @staticmethod
-    def subtract(a: Decimal, b: Decimal) -> Decimal:
+    def subtract(a: Decimal, b: Decimal, backend: Optional[Union[str, NumericBackend]] = None) -> Decimal:
         # Perform subtraction by delegating to the _perform_operation method with the subtract operation
-        return Calculator._perform_operation(a, b, subtract)
+        return Calculator._perform_operation(a, b, subtract, backend)
 
     @staticmethod
-    def multiply(a: Decimal, b: Decimal) -> Decimal:
+    def multiply(a: Decimal, b: Decimal, backend: Optional[Union[str, NumericBackend]] = None) -> Decimal:
         # Perform multiplication by delegating to the _perform_operation method with the multiply operation
-        return Calculator._perform_operation(a, b, multiply)
+        return Calculator._perform_operation(a, b, multiply, backend)
 
     @staticmethod
-    def divide(a: Decimal, b: Decimal) -> Decimal:
+    def divide(a: Decimal, b: Decimal, backend: Optional[Union[str, NumericBackend]] = None) -> Decimal:
         # Perform division by delegating to the _perform_operation method with the divide operation
-        return Calculator._perform_operation(a, b, divide)
\ No newline at end of file
+        return Calculator._perform_operation(a, b, divide, backend)
+
+    # Bulk variants: take sequences or NumPy arrays of operands and compute every pair in one pass.
+    # With exact=True the operands are converted to Decimal instead of float64.
+    @staticmethod
+    def add_many(a, b, exact: bool = False) -> BulkResult:
+        return compute(add, a, b, exact)
+
+    @staticmethod
+    def subtract_many(a, b, exact: bool = False) -> BulkResult:
+        return compute(subtract, a, b, exact)
+
+    @staticmethod
+    def multiply_many(a, b, exact: bool = False) -> BulkResult:
+        return compute(multiply, a, b, exact)
+
+    @staticmethod
+    def divide_many(a, b, exact: bool = False) -> BulkResult:
+        # Division by zero does not raise; the failed indexes are listed in the result's errors
+        return compute(divide, a, b, exact)
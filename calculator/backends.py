@@ -0,0 +1,103 @@
+"""Numeric backends: the number type operands are converted to before an operation runs.
+
+* ``float`` - native float64, fastest, for tolerance-based work.
+* ``decimal`` - Decimal in the current context; ``decimal:N`` uses a context with precision N.
+* ``fraction`` - exact rationals with fractions.Fraction.
+
+Backends are looked up by name, and the name is what the history records for each result.
+"""
+from decimal import Context, Decimal, getcontext, localcontext
+from fractions import Fraction
+from functools import lru_cache
+from typing import Callable, Mapping, Optional
+
+DEFAULT_BACKEND = 'decimal'
+
+
+class NumericBackend:
+    """Converts operands to one number type and runs operations on them."""
+    name = ''
+    number_type: type = object
+
+    def convert(self, value):
+        """Return value as this backend's number type."""
+        if type(value) is self.number_type:  # pylint: disable=unidiomatic-typecheck
+            return value
+        if isinstance(value, float):
+            value = repr(value)  # The shortest text for the float, not its binary expansion
+        return self.number_type(value)
+
+    def parse(self, text: str):
+        """Parse a number written to the history by this backend."""
+        return self.number_type(text)
+
+    def compute(self, operation: Callable, a, b):
+        """Run an operation on operands that are already converted."""
+        return operation(a, b)
+
+    def cache_key(self):
+        """Return what, besides the operands, determines this backend's results."""
+        return self.name
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class FloatBackend(NumericBackend):
+    name = 'float'
+    number_type = float
+
+    def convert(self, value):
+        return value if type(value) is float else float(value)  # pylint: disable=unidiomatic-typecheck
+
+
+class DecimalBackend(NumericBackend):
+    """Decimal arithmetic, in the current context or with a fixed precision."""
+    number_type = Decimal
+
+    def __init__(self, precision: Optional[int] = None):
+        self.precision = precision
+        self.context = Context(prec=precision) if precision else None
+        self.name = f'decimal:{precision}' if precision else 'decimal'
+
+    def cache_key(self):
+        if self.context is None:
+            context = getcontext()  # Results depend on whatever context is current
+            return self.name, context.prec, context.rounding
+        return self.name
+
+    def compute(self, operation: Callable, a, b):
+        if self.context is None:
+            return operation(a, b)
+        with localcontext(self.context):
+            return operation(a, b)
+
+
+class FractionBackend(NumericBackend):
+    name = 'fraction'
+    number_type = Fraction
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str) -> NumericBackend:
+    """Return the backend for a name such as 'float', 'fraction', 'decimal' or 'decimal:50'."""
+    kind, _, precision = name.strip().lower().partition(':')
+    if kind == 'float' and not precision:
+        return FloatBackend()
+    if kind == 'fraction' and not precision:
+        return FractionBackend()
+    if kind == 'decimal':
+        if not precision:
+            return DecimalBackend()
+        if precision.isdigit() and int(precision) > 0:
+            return DecimalBackend(int(precision))
+    raise ValueError(f"Unknown numeric backend: {name}")
+
+
+def backend_from_settings(settings: Mapping[str, str]) -> NumericBackend:
+    """Choose the backend from NUMERIC_BACKEND and, for Decimal, DECIMAL_PRECISION."""
+    name = settings.get('NUMERIC_BACKEND', DEFAULT_BACKEND)
+    precision = settings.get('DECIMAL_PRECISION')
+    if precision and name.strip().lower() == 'decimal':
+        name = f'decimal:{precision.strip()}'
+    return get_backend(name)
@@ -0,0 +1,90 @@
+"""Bulk arithmetic over whole sequences or NumPy arrays of operands.
+
+By default operands are converted to float64 and computed with NumPy in one vectorized pass.
+In exact mode they are converted to Decimal and computed with the current decimal context.
+Elements that fail (division by zero) are reported by index rather than raising, and every
+successful element is recorded in the history with a single append.
+"""
+import decimal
+from typing import Callable, Dict, NamedTuple, Sequence
+from calculator.backends import DEFAULT_BACKEND, get_backend
+from calculator.calculations import Calculations
+from calculator.operations import add, subtract, multiply, divide
+
+DIVIDE_BY_ZERO = "Cannot divide by zero"
+
+
+def _numpy():
+    """Import NumPy on first use, so scalar arithmetic never pays for importing it."""
+    import numpy  # pylint: disable=import-outside-toplevel
+    return numpy
+
+
+class BulkResult(NamedTuple):
+    """Results of a bulk operation.
+
+    `results` is a float64 array (NaN where an element failed), or a list of Decimals
+    (None where an element failed) in exact mode. `errors` maps failed indexes to messages.
+    """
+    results: Sequence
+    errors: Dict[int, str]
+
+
+def _check_lengths(a, b):
+    if len(a) != len(b):
+        raise ValueError(f"Operand sequences differ in length: {len(a)} and {len(b)}")
+
+
+def compute_floats(operation: Callable, a, b) -> BulkResult:
+    """Apply an operation element-wise with NumPy float64 arithmetic and record the results."""
+    np = _numpy()
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    _check_lengths(a, b)
+    ufunc = {add: np.add, subtract: np.subtract, multiply: np.multiply, divide: np.divide}[operation]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results = ufunc(a, b)
+    errors = {}
+    recorded = (a, b, results)
+    if operation is divide:
+        failed = b == 0
+        if failed.any():
+            results[failed] = np.nan
+            errors = dict.fromkeys(np.flatnonzero(failed).tolist(), DIVIDE_BY_ZERO)
+            succeeded = ~failed
+            recorded = (a[succeeded], b[succeeded], results[succeeded])
+    Calculations.add_calculations(operation, *recorded, backend='float')
+    return BulkResult(results, errors)
+
+
+def compute_decimals(operation: Callable, a, b) -> BulkResult:
+    """Apply an operation element-wise with exact Decimal arithmetic and record the results."""
+    convert = get_backend(DEFAULT_BACKEND).convert
+    a = [convert(value) for value in (a.tolist() if hasattr(a, 'tolist') else a)]
+    b = [convert(value) for value in (b.tolist() if hasattr(b, 'tolist') else b)]
+    _check_lengths(a, b)
+    # Division by zero gives Infinity/NaN instead of raising, so one bad element cannot stop the pass
+    context = decimal.getcontext().copy()
+    context.traps[decimal.DivisionByZero] = False
+    context.traps[decimal.InvalidOperation] = False
+    method = {add: context.add, subtract: context.subtract,
+              multiply: context.multiply, divide: context.divide}[operation]
+    results = list(map(method, a, b))
+    errors = {}
+    recorded = (a, b, results)
+    if operation is divide:
+        errors = {index: DIVIDE_BY_ZERO for index, divisor in enumerate(b) if not divisor}
+        if errors:
+            for index in errors:
+                results[index] = None
+            succeeded = [index for index in range(len(b)) if index not in errors]
+            recorded = ([a[i] for i in succeeded], [b[i] for i in succeeded], [results[i] for i in succeeded])
+    Calculations.add_calculations(operation, *recorded)
+    return BulkResult(results, errors)
+
+
+def compute(operation: Callable, a, b, exact: bool = False) -> BulkResult:
+    """Apply an operation element-wise, in float64 (default) or exact Decimal arithmetic."""
+    if exact:
+        return compute_decimals(operation, a, b)
+    return compute_floats(operation, a, b)
@@ -0,0 +1,56 @@
+"""Bounded least-recently-used cache of operation results."""
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+MISSING = object()  # Returned by ResultCache.get when the key is not cached
+
+
+class ResultCache:
+    """Maps (operation, backend, a, b) keys to results, evicting the least recently used entry.
+
+    Only successful results are stored, so failing operations (e.g. division by zero) are
+    attempted, and raise, every time. A lock makes lookups and stores safe from several threads.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        """Return the cached result for key, or MISSING."""
+        with self._lock:
+            result = self._entries.get(key, MISSING)
+            if result is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: Hashable, result):
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {'hits': hits, 'misses': misses, 'size': size,
+                'maxsize': self.maxsize, 'hit_rate': hits / lookups if lookups else 0.0}
@@ -1,22 +1,42 @@
 from decimal import Decimal
-from typing import Callable
+from typing import Callable, Optional
 from calculator.operations import add, subtract, multiply, divide
+from calculator.backends import DEFAULT_BACKEND
 
 class Calculation:
-    def __init__(self, a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal]):
+    __slots__ = ('a', 'b', 'operation', '_result', 'backend')
+
+    def __init__(self, a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal],
+                 result: Optional[Decimal] = None, backend: str = DEFAULT_BACKEND):
         self.a = a
         self.b = b
         self.operation = operation
+        # A known result (e.g. read back from history) is kept so it is never recomputed
+        self._result = result
+        # Name of the numeric backend the operands were converted with (see calculator.backends)
+        self.backend = backend
     
     @staticmethod    
-    def create(a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal]):
+    def create(a: Decimal, b: Decimal, operation: Callable[[Decimal, Decimal], Decimal],
+               result: Optional[Decimal] = None, backend: str = DEFAULT_BACKEND):
         # Return a new Calculation object initialized with the provided arguments
-        return Calculation(a, b, operation)
+        return Calculation(a, b, operation, result, backend)
 
     # Method to perform the calculation stored in this object
     def perform(self) -> Decimal:
-        """Perform the stored calculation and return the result."""
-        return self.operation(self.a, self.b)
+        """Perform the stored calculation once and return the cached result."""
+        if self._result is None:
+            self._result = self.operation(self.a, self.b)
+        return self._result
+
+    # Calculations are compared by value so that entries rebuilt from storage match the originals
+    def __eq__(self, other):
+        if not isinstance(other, Calculation):
+            return NotImplemented
+        return (self.a, self.b, self.operation) == (other.a, other.b, other.operation)
+
+    def __hash__(self):
+        return hash((self.a, self.b, self.operation))
 
     # Special method to provide a string representation of the Calculation instance
     def __repr__(self):
@@ -1,114 +1,532 @@
-import pandas as pd
-from decimal import Decimal
-from typing import List
+from typing import Callable, List, Optional, TextIO
 from calculator.calculation import Calculation
-from calculator.operations import add, subtract, multiply, divide
+from calculator.history_store import HistoryStore
+from calculator.backends import DEFAULT_BACKEND
+from calculator.storage import HistoryBackend, extend_from_text, open_history_backend
+from calculator.storage.wal import WriteAheadLog, open_wal
+import atexit
 import os
+import sys
 import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 
-class Calculations:
+
+class _Buffer:
+    """Entries added by one thread since the session's history was last read."""
+    __slots__ = ('store', 'lock', 'thread')
+
+    def __init__(self):
+        self.store = HistoryStore()
+        self.lock = threading.Lock()  # Only contended while a reader takes the entries
+        self.thread = threading.current_thread()
+
+
+class HistorySession:
+    """One history of calculations, with the file it is saved to.
+
+    Threads add entries to buffers of their own, so concurrent calculations do not contend
+    on a shared lock; the buffers are merged into the history whenever it is read. Within
+    one thread entries keep their order. Saving, loading and deleting hold the session lock,
+    so other threads can keep adding entries meanwhile.
+
+    With a write-ahead log enabled, entries are logged as they are merged into the history, so
+    the log is in history order; a background thread merges and commits the log at least
+    every sync interval, and saves the history (emptying the log) when the log grows large.
+
+    With autosave enabled, a background thread appends the entries added since the last save
+    to the history file (deduplicated in rewrite mode), on a timer or as soon as enough
+    entries are unsaved, so each save writes every pending entry at once. Saves hold the
+    session lock, so a clear or delete waits for a save in progress and the next autosave
+    finds nothing left to write.
+    """
+
+    def __init__(self, file_path: Optional[str] = None, save_mode: Optional[str] = None):
+        self.file_path = file_path  # None: use Calculations.file_path
+        self.save_mode = save_mode  # None: use Calculations.save_mode
+        self.cleared = False
+        self.saved_count = 0  # Number of leading history entries already written to the file
+        self._history = HistoryStore()
+        self._storage: Optional[HistoryBackend] = None  # Backend for the file, created on first use
+        self._lock = threading.RLock()  # Guards _history and the list of buffers
+        self._buffers: List[_Buffer] = []
+        self._local = threading.local()
+        self.wal: Optional[WriteAheadLog] = None
+        self.compact_entries = 0  # Log size that triggers a save; 0 saves only when asked
+        self._logged = 0  # Number of leading history entries that are in the log or saved
+        self._wal_wake = threading.Event()
+        self._wal_stop = threading.Event()
+        self._wal_thread: Optional[threading.Thread] = None
+        self.autosave_entries = 0  # Unsaved entries that wake the autosave thread; 0 when autosave is off
+        self.autosave_interval = 0.0
+        self.autosaves = 0  # Saves made by the autosave thread
+        self._autosave_wake = threading.Event()
+        self._autosave_stop = threading.Event()
+        self._autosave_thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> str:
+        return self.file_path or Calculations.file_path
+
+    def _buffer(self) -> _Buffer:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = _Buffer()
+            with self._lock:
+                self._buffers.append(buffer)
+        return buffer
+
+    def _drain(self):
+        """Move every buffered entry into the history (called with the session lock held)."""
+        for buffer in list(self._buffers):
+            alive = buffer.thread.is_alive()  # Checked first: a finished thread adds nothing more
+            if len(buffer.store):
+                with buffer.lock:
+                    store, buffer.store = buffer.store, HistoryStore()
+                self._history.merge(store)
+            if not alive:
+                self._buffers.remove(buffer)
+        if self.wal is not None and len(self._history) > self._logged:
+            self.wal.append(self._history.text_rows(self._logged))
+            self._logged = len(self._history)
+
+    def _discard_buffers(self):
+        for buffer in self._buffers:
+            with buffer.lock:
+                buffer.store = HistoryStore()
+
+    @property
+    def history(self) -> HistoryStore:
+        """The history, including every entry added so far by any thread."""
+        with self._lock:
+            self._drain()
+            return self._history
+
+    @history.setter
+    def history(self, history: HistoryStore):
+        with self._lock:
+            self._discard_buffers()
+            self._history = history
+            self._reset_log()
+
+    @contextmanager
+    def reading(self):
+        """Hold the session lock and yield the history, so no entries are merged into it while it is read."""
+        with self._lock:
+            self._drain()
+            yield self._history
+
+    @property
+    def _deduplicates(self) -> bool:
+        """Whether appends made in the background or on recovery drop rows already saved, as rewrite mode does."""
+        return (self.save_mode or Calculations.save_mode) != 'append'
+
+    def _reset_log(self):
+        """Start the log afresh after the history was replaced; entries already saved are not logged."""
+        self._logged = min(self.saved_count, len(self._history))
+        if self.wal is not None:
+            self.wal.truncate()
+
+    def _wake_workers(self, buffered: int):
+        """Wake the log and autosave threads when the entries waiting for them reach their thresholds."""
+        if self.wal is not None and buffered >= self.wal.sync_entries:
+            self._wal_wake.set()
+        if self.autosave_entries and buffered + len(self._history) - self.saved_count >= self.autosave_entries:
+            self._autosave_wake.set()
+
+    def add_calculation(self, calculation: Calculation):
+        buffer = self._buffer()
+        with buffer.lock:
+            buffer.store.append(calculation)
+        self.cleared = False
+        self._wake_workers(len(buffer.store))
+        logging.debug("Added calculation: %s", calculation)
+
+    def add_calculations(self, operation: Callable, a_values, b_values, results, backend: str = DEFAULT_BACKEND):
+        if len(results):
+            buffer = self._buffer()
+            with buffer.lock:
+                buffer.store.extend_operation(operation, a_values, b_values, results, backend)
+            self.cleared = False
+            self._wake_workers(len(buffer.store))
+            logging.debug("Added %d %s calculations.", len(results), operation.__name__)
+
+    def merge_history(self, history: HistoryStore):
+        if len(history):
+            buffer = self._buffer()
+            with buffer.lock:
+                buffer.store.merge(history)
+            self.cleared = False
+            self._wake_workers(len(buffer.store))
+            logging.debug("Merged %d calculations into the history.", len(history))
+
+    def clear_history(self):
+        with self._lock:
+            self._discard_buffers()
+            self._history = HistoryStore()  # Replaced, not cleared in place, so readers of the old one are unaffected
+            self.cleared = True
+            self.saved_count = 0
+            self._reset_log()
+        logging.info("Cleared the current instance history.")
+
+    def storage(self) -> HistoryBackend:
+        path = self.path
+        backend = self._storage
+        if backend is None or backend.path != path:
+            backend = self._storage = open_history_backend(path)
+        return backend
+
+    def save_history(self, append: Optional[bool] = None, deduplicate: Optional[bool] = None):
+        if append is None:
+            append = (self.save_mode or Calculations.save_mode) == 'append'
+        if deduplicate is None:
+            deduplicate = not append
+
+        with self._lock:
+            if self.cleared:  # Checked under the lock, so a clear cannot slip in before the save
+                logging.warning("History was cleared; not saving current instance history.")
+                return
+            history = self.history
+            try:
+                self.storage().save(history, self.saved_count if append else 0, append, deduplicate,
+                                    self.saved_count)
+                self.saved_count = len(history)
+                if self.wal is not None:
+                    self.wal.truncate()  # Everything logged is now in the history file
+            except Exception as e:
+                logging.error("Failed to save history: %s", e)
+
+    def load_history(self):
+        with self._lock:
+            storage = self.storage()
+            try:
+                if not storage.exists():
+                    self.saved_count = 0
+                    self.history = HistoryStore()
+                    logging.info("No existing history to load from %s file.", storage.name)
+                    return
+                history = storage.load(Calculations.load_batch_size)
+                self.saved_count = len(history)  # Loaded entries are already in the file
+                self.history = history
+            except Exception as e:
+                logging.error("Failed to load history: %s", e)
+                self.saved_count = 0
+                self.history = HistoryStore()
+
+    def delete_history(self):
+        with self._lock:
+            try:
+                if self.storage().delete():
+                    self.clear_history()  # Clear in-memory history as well
+                else:
+                    logging.warning("No history file found to delete.")
+            except Exception as e:
+                logging.error("Failed to delete history: %s", e)
+
+    def enable_wal(self, sync_entries: int = 1000, sync_interval: float = 0.05, compact_entries: int = 100_000) -> bool:
+        """Log entries to <history file>.wal, first recovering any entries a previous run left there.
+
+        Returns False, and runs without a log, if another process has the log open or recovery fails.
+        """
+        with self._lock:
+            if self.wal is not None:
+                return True
+            wal = open_wal(self.path, sync_entries, sync_interval)
+            if wal is None:
+                return False
+            try:
+                self._recover(wal)
+            except Exception as e:
+                logging.error("Could not recover the write-ahead log %s, keeping it and running without a log: %s",
+                              wal.path, e)
+                wal.close()
+                return False
+            self.wal = wal
+            self.compact_entries = compact_entries
+            self._logged = min(self.saved_count, len(self._history))
+            self._wal_stop.clear()
+            self._wal_thread = threading.Thread(target=self._run_wal, name='history-wal', daemon=True)
+            self._wal_thread.start()
+        atexit.register(self.disable_wal)
+        logging.info("Write-ahead log enabled at %s.", wal.path)
+        return True
+
+    def _recover(self, wal: WriteAheadLog):
+        """Append the entries left in the log by a run that did not save them to the history file."""
+        rows = wal.read()
+        if rows:
+            recovered = HistoryStore()
+            extend_from_text(recovered, *map(list, zip(*rows)))
+            self.storage().save(recovered, 0, append=True, deduplicate=self._deduplicates)
+            logging.info("Recovered %d history entries from the write-ahead log.", len(rows))
+        wal.truncate()
+
+    def sync_wal(self):
+        """Log every entry added so far and commit the log."""
+        wal = self.wal
+        if wal is not None:
+            with self._lock:
+                self._drain()
+            wal.commit()
+
+    def _run_wal(self):
+        wal = self.wal
+        while not self._wal_stop.is_set():
+            self._wal_wake.wait(wal.sync_interval)
+            self._wal_wake.clear()
+            try:
+                self.sync_wal()
+                if self.compact_entries and wal.entries >= self.compact_entries:
+                    self.save_history(append=True, deduplicate=self._deduplicates)
+            except Exception as e:
+                logging.error("Write-ahead log commit failed: %s", e)
+
+    def disable_wal(self):
+        """Commit and close the log; called at exit when it is enabled."""
+        thread = self._wal_thread
+        if thread is None:
+            return
+        self._wal_stop.set()
+        self._wal_wake.set()
+        thread.join()
+        self.sync_wal()
+        with self._lock:
+            self.wal.close()
+            self.wal = None
+            self._wal_thread = None
+        atexit.unregister(self.disable_wal)
+
+    def enable_autosave(self, interval: float = 5.0, dirty_entries: int = 10_000):
+        """Append new entries to the history file in the background.
+
+        Saves happen every interval seconds, or sooner once dirty_entries entries are unsaved.
+        """
+        if interval <= 0 or dirty_entries <= 0:
+            raise ValueError("Autosave needs a positive interval and entry threshold.")
+        with self._lock:
+            self.autosave_interval, self.autosave_entries = interval, dirty_entries
+            if self._autosave_thread is not None:
+                return
+            self._autosave_stop.clear()
+            self._autosave_thread = threading.Thread(target=self._run_autosave, name='history-autosave', daemon=True)
+            self._autosave_thread.start()
+        atexit.register(self.disable_autosave)
+        logging.info("Autosave enabled every %s seconds or %d entries.", interval, dirty_entries)
+
+    @property
+    def autosaving(self) -> bool:
+        return self._autosave_thread is not None
+
+    def _autosave(self):
+        """Append every entry added since the last save, in one write, if there are any."""
+        with self._lock:
+            saved = self.saved_count
+            if len(self.history) > saved:
+                self.save_history(append=True, deduplicate=self._deduplicates)
+                if self.saved_count != saved:  # Failed saves are logged and retried on the next wake
+                    self.autosaves += 1
+
+    def _run_autosave(self):
+        while not self._autosave_stop.is_set():
+            self._autosave_wake.wait(self.autosave_interval)
+            self._autosave_wake.clear()
+            self._autosave()
+
+    def disable_autosave(self):
+        """Stop the autosave thread and save what is left; called at exit when autosave is on."""
+        thread = self._autosave_thread
+        if thread is None:
+            return
+        self.autosave_entries = 0
+        self._autosave_stop.set()
+        self._autosave_wake.set()
+        thread.join()
+        self._autosave_thread = None
+        self._autosave()
+        atexit.unregister(self.disable_autosave)
+
+
+_current_session: ContextVar[Optional[HistorySession]] = ContextVar('calculations_session', default=None)
+
+
+class _CalculationsType(type):
+    """Makes the history attributes of Calculations refer to the current session."""
+
+    @property
+    def history(cls) -> HistoryStore:
+        return cls.current().history
+
+    @history.setter
+    def history(cls, history: HistoryStore):
+        cls.current().history = history
+
+    @property
+    def _cleared(cls) -> bool:
+        return cls.current().cleared
+
+    @_cleared.setter
+    def _cleared(cls, cleared: bool):
+        cls.current().cleared = cleared
+
+    @property
+    def _saved_count(cls) -> int:
+        return cls.current().saved_count
+
+    @_saved_count.setter
+    def _saved_count(cls, count: int):
+        cls.current().saved_count = count
+
+
+class Calculations(metaclass=_CalculationsType):
+    """Class-level API over the current HistorySession.
+
+    Unless a block runs inside session(), the current session is default_session, shared by
+    every thread. session() switches the current session for one thread (or asyncio task) only.
+    """
     file_path = os.getenv('HISTORY_FILE_PATH', 'calculation_history.csv')
-    history = []
-    _cleared = False
+    # 'rewrite' merges with the existing file and rewrites it; 'append' only writes new entries
+    save_mode = os.getenv('HISTORY_SAVE_MODE', 'rewrite')
+    default_session = HistorySession()
+    load_batch_size = 100_000  # Rows parsed per chunk when loading history
+    print_chunk_size = 1_000  # Entries formatted per write when printing history
+
+    @classmethod
+    def current(cls) -> HistorySession:
+        """Return the session the class-level methods act on."""
+        return _current_session.get() or cls.default_session
+
+    @classmethod
+    def new_session(cls) -> HistorySession:
+        """Return an empty, separate history for use with session(), saved to the same file."""
+        return HistorySession()
+
+    @classmethod
+    @contextmanager
+    def session(cls, session: HistorySession):
+        """Make another session (e.g. from new_session) the current one for the duration of a block.
+
+        Only the calling thread or asyncio task sees the change. Used to give each network
+        client its own history.
+        """
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            _current_session.reset(token)
 
     @classmethod
     def add_calculation(cls, calculation: Calculation):
         """Add a new calculation to the history."""
-        cls.history.append(calculation)
-        cls._cleared = False
-        logging.debug("Added calculation: %s", calculation)
+        cls.current().add_calculation(calculation)
+
+    @classmethod
+    def add_calculations(cls, operation: Callable, a_values, b_values, results, backend: str = DEFAULT_BACKEND):
+        """Add many calculations of one operation in a single append, e.g. from bulk arithmetic."""
+        cls.current().add_calculations(operation, a_values, b_values, results, backend)
+
+    @classmethod
+    def merge_history(cls, history: HistoryStore):
+        """Append every entry of another history store, keeping its order."""
+        cls.current().merge_history(history)
 
     @classmethod
     def get_history(cls) -> List[Calculation]:
         """Retrieve the entire history of calculations."""
-        return cls.history
-    
+        with cls.current().reading() as history:
+            return list(history)
+
     @classmethod
     def clear_history(cls):
         """Clear the history of calculations."""
-        cls.history.clear()
-        cls._cleared = True
-        logging.info("Cleared the current instance history.")
-    
+        cls.current().clear_history()
+
     @classmethod
     def get_latest(cls) -> Calculation:
         """Get the latest calculation. Returns None if there is no history."""
-        if cls.history:
-            return cls.history[-1]
+        with cls.current().reading() as history:
+            if history:
+                return history[-1]
         return None
-    
+
     @classmethod
     def find_by_operation(cls, operation_name: str) -> List[Calculation]:
         """Find and return a list of calculations by name of the operation."""
-        return [calc for calc in cls.history if calc.operation.__name__ == operation_name]
-    
+        with cls.current().reading() as history:
+            return history.find(operation_name)
+
     @classmethod
-    def save_history(cls):
-        """Save the current instance history to a CSV file."""
-        if cls._cleared:
-            logging.warning("History was cleared; not saving current instance history.")
-            return
-        
-        data = [{
-            'a': calc.a,
-            'b': calc.b,
-            'operation': calc.operation.__name__,
-            'result': calc.perform()
-        } for calc in cls.history]
-        
-        try:
-            if os.path.exists(cls.file_path):
-                # Try reading the existing CSV file
-                try:
-                    existing_df = pd.read_csv(cls.file_path)
-                except pd.errors.EmptyDataError:
-                    # If the CSV file is empty, create an empty DataFrame
-                    existing_df = pd.DataFrame(columns=['a', 'b', 'operation', 'result'])
-                new_df = pd.DataFrame(data)
-                combined_df = pd.concat([existing_df, new_df], ignore_index=True).drop_duplicates()
-            else:
-                combined_df = pd.DataFrame(data)
-            
-            combined_df.to_csv(cls.file_path, index=False)
-            logging.info("Saved current instance history to CSV file.")
-        except Exception as e:
-            logging.error("Failed to save history: %s", e)
+    def count_by_operation(cls, operation_name: str) -> int:
+        """Return how many calculations in the history use the named operation."""
+        with cls.current().reading() as history:
+            return history.count(operation_name)
+
+    @classmethod
+    def storage(cls) -> HistoryBackend:
+        """Return the storage backend for the current file_path, chosen by its extension."""
+        return cls.current().storage()
+
+    @classmethod
+    def save_history(cls, append: Optional[bool] = None, deduplicate: Optional[bool] = None):
+        """Save the current instance history to the history file.
+
+        In append mode only the entries added since the last save are written to the end of
+        the file. Deduplication defaults to on for rewrites and off for appends.
+        """
+        cls.current().save_history(append, deduplicate)
 
     @classmethod
     def load_history(cls):
-        """Load the calculation history from a CSV file into the current instance."""
-        try:
-            if not os.path.exists(cls.file_path) or os.path.getsize(cls.file_path) == 0:
-                cls.history = []
-                logging.info("No existing history to load from CSV file.")
-                return
-            df = pd.read_csv(cls.file_path)
-            operations = {'add': add, 'subtract': subtract, 'multiply': multiply, 'divide': divide}
-            cls.history = [Calculation(Decimal(row['a']), Decimal(row['b']), operations[row['operation']]) for _, row in df.iterrows()]
-            logging.info("Loaded history from CSV file.")
-        except pd.errors.EmptyDataError:
-            logging.warning("The CSV file is empty. No history to load.")
-            cls.history = []
-        except Exception as e:
-            logging.error("Failed to load history: %s", e)
-            cls.history = []
+        """Load the calculation history from the history file into the current instance."""
+        cls.current().load_history()
+
+    @classmethod
+    def enable_wal(cls, sync_entries: int = 1000, sync_interval: float = 0.05, compact_entries: int = 100_000) -> bool:
+        """Log the current instance's new entries to a write-ahead log; see HistorySession.enable_wal."""
+        return cls.current().enable_wal(sync_entries, sync_interval, compact_entries)
+
+    @classmethod
+    def enable_autosave(cls, interval: float = 5.0, dirty_entries: int = 10_000):
+        """Save the current instance's new entries in the background; see HistorySession.enable_autosave."""
+        cls.current().enable_autosave(interval, dirty_entries)
+
+    @classmethod
+    def query_history(cls, operation_name: Optional[str] = None, min_result=None, max_result=None) -> List[Calculation]:
+        """Return the saved calculations with the given operation and a result in [min_result, max_result]."""
+        return list(cls.storage().query(operation_name, min_result, max_result, cls.load_batch_size))
 
     @classmethod
     def delete_history(cls):
-        """Delete the CSV file containing the history and clear in-memory history."""
-        try:
-            if os.path.exists(cls.file_path):
-                os.remove(cls.file_path)
-                logging.info("Deleted history CSV file.")
-                cls.clear_history()  # Clear in-memory history as well
-            else:
-                logging.warning("No history file found to delete.")
-        except Exception as e:
-            logging.error("Failed to delete history: %s", e)
+        """Delete the history file and clear in-memory history."""
+        cls.current().delete_history()
 
     @classmethod
-    def print_history(cls):
-        """Print the current history of calculations."""
-        for calc in cls.history:
-            print(calc)
-        logging.info("Printed current instance history.")
+    def print_history(cls, offset: int = 0, limit: Optional[int] = None, tail: Optional[int] = None,
+                      stream: bool = False, output: Optional[TextIO] = None):
+        """Print the current history of calculations, or a page of it.
+
+        offset and limit select a range of entries; tail prints the last `tail` entries instead
+        of starting at offset. Only the selected entries are read. In stream mode entries are
+        formatted a chunk at a time and each chunk is written with a single call.
+        """
+        if min(offset, limit or 0, tail or 0) < 0:
+            raise ValueError("offset, limit and tail must not be negative.")
+        session = cls.current()
+        with session.reading() as history:
+            total = len(history)
+        if tail is not None:
+            offset = max(total - tail, 0)
+        end = total if limit is None else min(total, offset + limit)
+        if stream:
+            output = output or sys.stdout
+        for start in range(offset, end, cls.print_chunk_size):
+            with session.reading():  # Slices the history as first read, even if it has been cleared since
+                chunk = history[start:min(start + cls.print_chunk_size, end)]
+            if stream:
+                output.write(''.join(f"{calc!r}\n" for calc in chunk))
+            else:
+                for calc in chunk:
+                    print(calc, file=output)
+        if stream:
+            output.flush()
+        logging.info("Printed %d entries of the current instance history.", max(end - offset, 0))
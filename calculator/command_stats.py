@@ -0,0 +1,138 @@
+"""Per-command call counts, error counts and latency histograms, with optional cProfile capture."""
+import io
+import json
+import logging
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+# Upper bounds, in seconds, of the latency histogram buckets; slower calls go in a final overflow bucket
+LATENCY_BUCKETS = (1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3,
+                   1e-2, 2e-2, 5e-2, 1e-1, 2e-1, 5e-1, 1.0, 2.0, 5.0)
+UNKNOWN_COMMAND = '<unknown>'  # Inputs that name no registered command are counted under this name
+PROFILE_LINES = 25  # Functions listed in a profile report
+
+
+class CommandTimings:
+    """Counts, errors and a latency histogram for one command."""
+    __slots__ = ('count', 'errors', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = self.errors = 0
+        self.total = self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, seconds: float, failed: bool):
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Return the upper bound of the bucket holding the given fraction of calls (max for overflow)."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, calls in zip(LATENCY_BUCKETS, self.buckets):
+            seen += calls
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'errors': self.errors, 'total_seconds': self.total,
+                'mean_seconds': self.total / self.count if self.count else 0.0,
+                'p50_seconds': self.percentile(0.5), 'p99_seconds': self.percentile(0.99),
+                'max_seconds': self.max,
+                'histogram': {_bucket_label(index): calls for index, calls in enumerate(self.buckets) if calls}}
+
+
+def _bucket_label(index: int) -> str:
+    if index == len(LATENCY_BUCKETS):
+        return f"> {LATENCY_BUCKETS[-1]:g}s"
+    return f"<= {LATENCY_BUCKETS[index]:g}s"
+
+
+class CommandStats:
+    """Timings of the commands run through a CommandHandler.
+
+    A profiling capture can be started for the next N commands; they then run under cProfile,
+    and when the last one finishes the report is kept (and written to a file if one was given).
+    """
+
+    def __init__(self):
+        self.commands: Dict[str, CommandTimings] = {}
+        self.profile_remaining = 0
+        self.profile_report: Optional[str] = None
+        self._profiler = None  # cProfile.Profile while capturing
+        self._profile_path: Optional[str] = None
+
+    def call(self, name: str, func: Callable, *args):
+        """Run func(*args), recording its duration, and whether it raised, under the command name."""
+        profiler = self._profiler
+        if profiler is not None:
+            profiler.enable()
+        failed = False
+        start = perf_counter()
+        try:
+            return func(*args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._profiled_one()
+            self.record(name, elapsed, failed)
+
+    def record(self, name: str, seconds: float, failed: bool = False):
+        timings = self.commands.get(name)
+        if timings is None:
+            timings = self.commands[name] = CommandTimings()
+        timings.add(seconds, failed)
+
+    def start_profile(self, commands: int, path: Optional[str] = None):
+        """Profile the next `commands` commands; the report is also dumped to path if given."""
+        if commands <= 0:
+            raise ValueError("The number of commands to profile must be positive.")
+        # cProfile and pstats are only imported once profiling is asked for, to keep startup quick
+        import cProfile  # pylint: disable=import-outside-toplevel
+        self._profiler = cProfile.Profile()
+        self._profile_path = path
+        self.profile_remaining = commands
+        self.profile_report = None
+
+    def _profiled_one(self):
+        self.profile_remaining -= 1
+        if self.profile_remaining > 0:
+            return
+        profiler, self._profiler = self._profiler, None
+        if self._profile_path:
+            profiler.dump_stats(self._profile_path)
+        import pstats  # pylint: disable=import-outside-toplevel
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        self.profile_report = report.getvalue()
+        logging.info("Finished profiling commands%s.", f"; stats written to {self._profile_path}"
+                     if self._profile_path else "")
+
+    def reset(self):
+        """Forget every timing; a profiling capture in progress carries on."""
+        self.commands.clear()
+
+    def summary(self) -> Dict[str, dict]:
+        return {name: timings.summary() for name, timings in sorted(self.commands.items())}
+
+    def to_json(self) -> str:
+        return json.dumps({'commands': self.summary(), 'buckets_seconds': list(LATENCY_BUCKETS)}, indent=2)
+
+    def lines(self) -> List[str]:
+        """Return a table of the timings, one line per command."""
+        lines = [f"{'Command':<16}{'Calls':>8}{'Errors':>8}{'Mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'Max ms':>10}"]
+        for name, summary in self.summary().items():
+            lines.append(f"{name:<16}{summary['count']:>8}{summary['errors']:>8}"
+                         f"{summary['mean_seconds'] * 1000:>10.3f}{summary['p50_seconds'] * 1000:>10.3f}"
+                         f"{summary['p99_seconds'] * 1000:>10.3f}{summary['max_seconds'] * 1000:>10.3f}")
+        return lines
@@ -1,18 +1,43 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Optional
+from calculator.command_stats import UNKNOWN_COMMAND, CommandStats
 
 class Command(ABC):
     @abstractmethod
     def execute(self, *args):
         pass
 
+class LazyCommand(Command):
+    """Placeholder for a command that is only created, and its plugin imported, when first run."""
+    def __init__(self, loader: Callable[[], Command]):
+        self.loader = loader
+        self._command = None
+
+    def load(self) -> Command:
+        if self._command is None:
+            self._command = self.loader()
+        return self._command
+
+    def execute(self, *args):
+        return self.load().execute(*args)
+
 class CommandHandler:
     def __init__(self):
         self.commands = {}
+        self.stats: Optional[CommandStats] = None  # Set to a CommandStats to time every command
 
     def register_command(self, command_name: str, command: Command):
         self.commands[command_name] = command
 
     def execute_command(self, user_input: str):
+        stats = self.stats
+        if stats is None:
+            return self._dispatch(user_input)
+        parts = user_input.split(maxsplit=1)
+        name = parts[0] if parts and parts[0] in self.commands else UNKNOWN_COMMAND
+        return stats.call(name, self._dispatch, user_input)
+
+    def _dispatch(self, user_input: str):
         if not user_input.strip():
             raise ValueError("No input provided.")
         
@@ -21,6 +46,10 @@ class CommandHandler:
         args = parts[1:]
 
         if command_name in self.commands:
-            return self.commands[command_name].execute(*args)
+            command = self.commands[command_name]
+            if isinstance(command, LazyCommand):
+                # Swap the placeholder for the real command so later calls skip the indirection
+                command = self.commands[command_name] = command.load()
+            return command.execute(*args)
         else:
             raise ValueError(f"No such command: {command_name}")
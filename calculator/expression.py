@@ -0,0 +1,225 @@
+"""Infix expressions: parsing into a small AST, compiling to cached programs, and evaluation.
+
+An expression such as ``(x + 2) * y / 4`` is parsed with the usual precedence (``*`` and
+``/`` before ``+`` and ``-``, left to right, parentheses first, unary ``+``/``-``) and
+compiled into a list of steps, one per binary operation, in evaluation order. Steps whose
+operands are all constants are computed once at compile time. Compiled programs are cached
+by expression text and numeric backend, so evaluating the same template with different
+variable values skips parsing and compiling.
+
+Every step is recorded in Calculations as an ordinary Calculation when the program runs;
+folded steps are recorded with their precomputed results.
+"""
+import re
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+from calculator import Calculator
+from calculator.backends import NumericBackend, get_backend
+from calculator.cache import MISSING, ResultCache
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations
+from calculator.operations import add, divide, multiply, subtract
+
+TEMPLATE_CACHE_SIZE = 256
+templates = ResultCache(TEMPLATE_CACHE_SIZE)  # (expression, backend key) -> Program
+
+BINARY_OPERATORS = {'+': add, '-': subtract, '*': multiply, '/': divide}
+# Calculator methods that run and record each operation (through the result cache, if enabled)
+CALCULATOR_METHODS = {add: Calculator.add, subtract: Calculator.subtract,
+                      multiply: Calculator.multiply, divide: Calculator.divide}
+TOKEN = re.compile(r"(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(?P<name>[A-Za-z_]\w*)|(?P<operator>[-+*/()])")
+NAME = re.compile(r"[A-Za-z_]\w*")
+
+
+class Number(NamedTuple):
+    text: str
+
+
+class Variable(NamedTuple):
+    name: str
+
+
+class BinaryOp(NamedTuple):
+    operation: Callable
+    left: 'Node'
+    right: 'Node'
+
+
+Node = Union[Number, Variable, BinaryOp]
+
+
+def tokenize(text: str) -> List[Tuple[str, str, int]]:
+    """Split an expression into (kind, text, position) tokens."""
+    tokens, position = [], 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position == len(text):
+            return tokens
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid expression: unexpected '{text[position]}' at position {position}")
+        tokens.append((match.lastgroup, match.group(), position))
+        position = match.end()
+
+
+class _Parser:
+    """Recursive-descent parser over the tokens of one expression."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.index = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.index][1] if self.index < len(self.tokens) else None
+
+    def _error(self, expected: str) -> ValueError:
+        if self.index >= len(self.tokens):
+            return ValueError(f"Invalid expression: expected {expected} at the end")
+        _, token, position = self.tokens[self.index]
+        return ValueError(f"Invalid expression: expected {expected}, found '{token}' at position {position}")
+
+    def parse(self) -> Node:
+        node = self._sum()
+        if self.index < len(self.tokens):
+            raise self._error("an operator")
+        return node
+
+    def _sum(self) -> Node:
+        node = self._product()
+        while self._peek() in ('+', '-'):
+            self.index += 1
+            node = BinaryOp(BINARY_OPERATORS[self.tokens[self.index - 1][1]], node, self._product())
+        return node
+
+    def _product(self) -> Node:
+        node = self._factor()
+        while self._peek() in ('*', '/'):
+            self.index += 1
+            node = BinaryOp(BINARY_OPERATORS[self.tokens[self.index - 1][1]], node, self._factor())
+        return node
+
+    def _factor(self) -> Node:
+        if self.index >= len(self.tokens):
+            raise self._error("a number, a name or '('")
+        kind, token, _ = self.tokens[self.index]
+        self.index += 1
+        if kind == 'number':
+            return Number(token)
+        if kind == 'name':
+            return Variable(token)
+        if token in ('+', '-'):
+            operand = self._factor()
+            if token == '+':
+                return operand
+            if isinstance(operand, Number):  # A negative literal, not a subtraction
+                return Number(operand.text[1:] if operand.text.startswith('-') else '-' + operand.text)
+            return BinaryOp(subtract, Number('0'), operand)
+        if token == '(':
+            node = self._sum()
+            if self._peek() != ')':
+                raise self._error("')'")
+            self.index += 1
+            return node
+        self.index -= 1
+        raise self._error("a number, a name or '('")
+
+
+def parse(text: str) -> Node:
+    """Parse an infix expression into its AST."""
+    return _Parser(text).parse()
+
+
+# Kinds of step operands
+CONSTANT, VARIABLE, STEP = range(3)
+
+
+class Step(NamedTuple):
+    operation: Callable
+    a: Tuple[int, object]  # (kind, value): a constant, a variable name or the index of an earlier step
+    b: Tuple[int, object]
+    result: object  # Precomputed result of a folded step, else None
+
+
+class Program:
+    """The steps that compute an expression's AST with one numeric backend."""
+
+    def __init__(self, node: Node, backend: NumericBackend):
+        self.backend = backend
+        self.steps: List[Step] = []
+        self.variables: List[str] = []
+        self.output = self._emit(node)  # The operand holding the final value
+
+    def _emit(self, node: Node) -> Tuple[int, object]:
+        """Add the steps computing node and return the operand that refers to its value."""
+        if isinstance(node, Number):
+            return CONSTANT, self.backend.parse(node.text)
+        if isinstance(node, Variable):
+            if node.name not in self.variables:
+                self.variables.append(node.name)
+            return VARIABLE, node.name
+        a, b = self._emit(node.left), self._emit(node.right)
+        if a[0] == b[0] == CONSTANT:
+            result = self.backend.compute(node.operation, a[1], b[1])  # Folded now, recorded on every run
+            self.steps.append(Step(node.operation, a, b, result))
+            return CONSTANT, result
+        self.steps.append(Step(node.operation, a, b, None))
+        return STEP, len(self.steps) - 1
+
+    def evaluate(self, bindings: Mapping[str, object]):
+        """Run the steps with the given variable values, recording each one; returns the result."""
+        missing = [name for name in self.variables if name not in bindings]
+        if missing:
+            raise ValueError(f"No value given for variable: {missing[0]}")
+        backend = self.backend
+        values = {name: backend.parse(value) if isinstance(value, str) else backend.convert(value)
+                  for name, value in bindings.items()}
+        results = []
+        for operation, a, b, folded in self.steps:
+            a_value = a[1] if a[0] == CONSTANT else values[a[1]] if a[0] == VARIABLE else results[a[1]]
+            b_value = b[1] if b[0] == CONSTANT else values[b[1]] if b[0] == VARIABLE else results[b[1]]
+            if folded is None:
+                results.append(CALCULATOR_METHODS[operation](a_value, b_value, backend))
+            else:
+                Calculations.add_calculation(Calculation.create(a_value, b_value, operation, folded, backend.name))
+                results.append(folded)
+        kind, value = self.output
+        return value if kind == CONSTANT else values[value] if kind == VARIABLE else results[value]
+
+
+def compile_expression(text: str, backend: Optional[Union[str, NumericBackend]] = None) -> Program:
+    """Return the compiled program for an expression, from the template cache if possible."""
+    if backend is None:
+        backend = Calculator.backend
+    elif isinstance(backend, str):
+        backend = get_backend(backend)
+    key = (' '.join(text.split()), backend.cache_key())
+    program = templates.get(key)
+    if program is MISSING:
+        program = Program(parse(text), backend)
+        templates.put(key, program)
+    return program
+
+
+def evaluate(text: str, bindings: Optional[Mapping[str, object]] = None,
+             backend: Optional[Union[str, NumericBackend]] = None):
+    """Evaluate an expression with variable values given as numbers or text, recording every step."""
+    program = compile_expression(text, backend)
+    bindings = bindings or {}
+    unknown = [name for name in bindings if name not in program.variables]
+    if unknown:
+        raise ValueError(f"Unknown variable: {unknown[0]}")
+    return program.evaluate(bindings)
+
+
+def parse_bindings(args) -> Tuple[str, Dict[str, str]]:
+    """Split command arguments into the expression and its name=value bindings."""
+    expression, bindings = [], {}
+    for arg in args:
+        name, separator, value = arg.partition('=')
+        if not separator:
+            expression.append(arg)
+        elif NAME.fullmatch(name) and value:
+            bindings[name] = value
+        else:
+            raise ValueError(f"Invalid variable binding: {arg}. Use name=value.")
+    return ' '.join(expression), bindings
@@ -0,0 +1,342 @@
+"""Compact, column-oriented storage for the calculation history."""
+import struct
+from array import array
+from decimal import Decimal, Context, MAX_EMAX, MIN_EMIN
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from calculator.backends import DEFAULT_BACKEND
+from calculator.calculation import Calculation
+from calculator.operations import OPERATIONS
+
+# Exponent values marking entries stored outside the main coefficient array
+POOLED = -128  # The value lives in the column's overflow pool
+WIDE = -127  # The coefficient array holds an index into the wide coefficient arrays
+FLOAT = -126  # The coefficient array holds the bits of a float
+MAX_COEFFICIENT_DIGITS = 18  # Always fits in a signed 64-bit integer
+MAX_WIDE_DIGITS = 2 * MAX_COEFFICIENT_DIGITS  # Split over two 64-bit integers
+_WIDE_BASE = 10 ** MAX_COEFFICIENT_DIGITS
+_POWERS_OF_TEN = [10 ** digits for digits in range(MAX_WIDE_DIGITS + 1)]
+# Scaling by a power of ten must never round, whatever the caller's decimal context is
+_EXACT = Context(prec=MAX_WIDE_DIGITS, Emax=MAX_EMAX, Emin=MIN_EMIN)
+_FLOAT_BITS = struct.Struct('d')
+_INT_BITS = struct.Struct('q')
+
+
+def pack_decimal(value, max_digits: int = MAX_COEFFICIENT_DIGITS) -> Optional[Tuple[int, int]]:
+    """Split a number into an integer coefficient and an int8 exponent, or None if it does not fit."""
+    if type(value) is not Decimal:  # pylint: disable=unidiomatic-typecheck
+        if isinstance(value, int) and not isinstance(value, bool):
+            value = Decimal(value)
+        elif not isinstance(value, Decimal):
+            return None
+    if not value.is_finite():
+        return None
+    text = str(value)
+    if 'E' in text:
+        _, digits, exponent = value.as_tuple()
+        if len(digits) > max_digits:
+            return None
+        coefficient = int(value.scaleb(-exponent, _EXACT))
+    else:
+        # Plain notation: the exponent is minus the number of digits after the point.
+        # Parsing the string is considerably faster than Decimal.as_tuple().
+        whole, _, fraction = text.partition('.')
+        coefficient, exponent = int(whole + fraction), -len(fraction)
+    if abs(coefficient) >= _POWERS_OF_TEN[max_digits] or not FLOAT < exponent < 128:
+        return None
+    if not coefficient and text[0] == '-':
+        return None  # Negative zero would lose its sign
+    return coefficient, exponent
+
+
+def unpack_decimal(coefficient: int, exponent: int) -> Decimal:
+    """Rebuild the Decimal packed by pack_decimal."""
+    return Decimal(coefficient).scaleb(exponent, _EXACT)
+
+
+def packed_text(coefficient: int, exponent: int) -> str:
+    """Return str() of the Decimal packed by pack_decimal, without building it if possible."""
+    if exponent == 0:
+        return str(coefficient)
+    digits = str(abs(coefficient))
+    if exponent > 0 or len(digits) - 1 + exponent < -6:
+        return str(unpack_decimal(coefficient, exponent))  # Decimal uses scientific notation here
+    digits = digits.rjust(1 - exponent, '0')
+    return f"{'-' if coefficient < 0 else ''}{digits[:exponent]}.{digits[exponent:]}"
+
+
+def float_from_bits(bits: int) -> float:
+    """Return the float whose 64 bits, read as a signed integer, are bits."""
+    return _FLOAT_BITS.unpack(_INT_BITS.pack(bits))[0]
+
+
+def float_bits(value: float) -> int:
+    """Return the 64 bits of a float as a signed integer."""
+    return _INT_BITS.unpack(_FLOAT_BITS.pack(value))[0]
+
+
+class DecimalColumn:
+    """A column of numbers packed as coefficient/exponent pairs.
+
+    Coefficients of up to 36 digits, such as full-precision division results, are split over
+    two extra 64-bit arrays. Floats keep their 64 bits in the coefficient array. Values that
+    cannot be packed at all (special values, other number types) are kept as-is in a small
+    overflow pool keyed by row.
+    """
+    __slots__ = ('coefficients', 'exponents', 'wide_high', 'wide_low', 'wide_exponents', 'pool')
+
+    def __init__(self):
+        self.coefficients = array('q')
+        self.exponents = array('b')
+        self.wide_high = array('q')
+        self.wide_low = array('Q')
+        self.wide_exponents = array('b')
+        self.pool: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return len(self.exponents)
+
+    def append(self, value):
+        packed = pack_decimal(value, MAX_WIDE_DIGITS)
+        if packed is None and type(value) is float:  # pylint: disable=unidiomatic-typecheck
+            packed = (float_bits(value), FLOAT)
+        elif packed is None:
+            self.pool[len(self.exponents)] = value
+            packed = (0, POOLED)
+        elif not -_WIDE_BASE < packed[0] < _WIDE_BASE:
+            packed = self._append_wide(*packed)
+        self.coefficients.append(packed[0])
+        self.exponents.append(packed[1])
+
+    def _append_wide(self, coefficient: int, exponent: int) -> Tuple[int, int]:
+        """Store a coefficient too large for the main array and return its placeholder."""
+        high, low = divmod(coefficient, _WIDE_BASE)
+        self.wide_high.append(high)
+        self.wide_low.append(low)
+        self.wide_exponents.append(exponent)
+        return len(self.wide_exponents) - 1, WIDE
+
+    def extend(self, values: Iterable):
+        for value in values:
+            self.append(value)
+
+    def extend_floats(self, values):
+        """Append a NumPy float64 array, copying its bits straight into the coefficient array."""
+        self.coefficients.frombytes(values.astype('=f8', copy=False).tobytes())
+        self.exponents.frombytes(FLOAT.to_bytes(1, 'little', signed=True) * len(values))
+
+    def merge(self, other: 'DecimalColumn'):
+        """Append all rows of another column."""
+        rows, wide_rows = len(self), len(self.wide_exponents)
+        coefficients = other.coefficients
+        if wide_rows and other.wide_exponents:
+            # Wide placeholders index into the wide arrays, which are shifted by the rows already here
+            coefficients = array('q', coefficients)
+            for index, exponent in enumerate(other.exponents):
+                if exponent == WIDE:
+                    coefficients[index] += wide_rows
+        self.coefficients.extend(coefficients)
+        self.exponents.extend(other.exponents)
+        self.wide_high.extend(other.wide_high)
+        self.wide_low.extend(other.wide_low)
+        self.wide_exponents.extend(other.wide_exponents)
+        self.pool.update((rows + index, value) for index, value in other.pool.items())
+
+    def get(self, index: int):
+        """Return the value at a non-negative row index."""
+        exponent = self.exponents[index]
+        if exponent == WIDE:
+            wide = self.coefficients[index]
+            return unpack_decimal(self.wide_high[wide] * _WIDE_BASE + self.wide_low[wide], self.wide_exponents[wide])
+        if exponent == FLOAT:
+            return float_from_bits(self.coefficients[index])
+        if exponent == POOLED:
+            return self.pool[index]
+        return unpack_decimal(self.coefficients[index], exponent)
+
+    def text(self, index: int) -> str:
+        """Return str() of the value at a non-negative row index, without building a Decimal if possible."""
+        exponent = self.exponents[index]
+        if exponent == 0:
+            return str(self.coefficients[index])
+        if exponent in (WIDE, FLOAT, POOLED):
+            return str(self.get(index))
+        return packed_text(self.coefficients[index], exponent)
+
+    def clear(self):
+        self.coefficients = array('q')
+        self.exponents = array('b')
+        self.wide_high = array('q')
+        self.wide_low = array('Q')
+        self.wide_exponents = array('b')
+        self.pool.clear()
+
+
+class HistoryStore:
+    """Columnar history with the list-like API used by Calculations.
+
+    Operands and results are kept in packed columns, and the operation and the numeric backend
+    that produced the result as one-byte codes. Calculation objects are only created when an
+    entry is read back. An index from operation code to row positions keeps searches by
+    operation proportional to the matches.
+    """
+
+    def __init__(self):
+        self.a = DecimalColumn()
+        self.b = DecimalColumn()
+        self.results = DecimalColumn()
+        self.operation_codes = array('B')
+        self._operations: List[Callable] = []
+        self._codes: Dict[Callable, int] = {}
+        self._codes_by_name: Dict[str, List[int]] = {}
+        self._positions: List[array] = []  # Row positions per operation code
+        self.backend_codes = array('B')
+        self._backends: List[str] = []
+        self._backend_codes: Dict[str, int] = {}
+        for operation in OPERATIONS.values():
+            self._code(operation)
+        self._backend_code(DEFAULT_BACKEND)
+
+    def _code(self, operation: Callable) -> int:
+        """Return the code of an operation, registering operations not seen before."""
+        code = self._codes.get(operation)
+        if code is None:
+            code = len(self._operations)
+            self._operations.append(operation)
+            self._codes[operation] = code
+            self._codes_by_name.setdefault(operation.__name__, []).append(code)
+            self._positions.append(array('Q'))
+        return code
+
+    def _backend_code(self, backend: str) -> int:
+        """Return the code of a backend name, registering names not seen before."""
+        code = self._backend_codes.get(backend)
+        if code is None:
+            code = self._backend_codes[backend] = len(self._backends)
+            self._backends.append(backend)
+        return code
+
+    def append(self, calculation: Calculation):
+        """Add a calculation, storing its operands, operation code and (cached) result."""
+        result = calculation.perform()
+        code = self._codes.get(calculation.operation)
+        if code is None:
+            code = self._code(calculation.operation)
+        self._positions[code].append(len(self.operation_codes))
+        self.operation_codes.append(code)
+        backend = self._backend_codes.get(calculation.backend)
+        self.backend_codes.append(self._backend_code(calculation.backend) if backend is None else backend)
+        self.a.append(calculation.a)
+        self.b.append(calculation.b)
+        self.results.append(result)
+
+    def extend_columns(self, a_values: Iterable, b_values: Iterable,
+                       operations: Iterable[Callable], results: Iterable,
+                       backends: Optional[Iterable[str]] = None):
+        """Append whole columns at once, as produced by a bulk history load."""
+        codes = array('B', map(self._code, operations))
+        positions = self._positions
+        for position, code in enumerate(codes, len(self.operation_codes)):
+            positions[code].append(position)
+        self.operation_codes.extend(codes)
+        if backends is None:
+            self.backend_codes.frombytes(bytes([self._backend_code(DEFAULT_BACKEND)]) * len(codes))
+        else:
+            self.backend_codes.extend(map(self._backend_code, backends))
+        self.a.extend(a_values)
+        self.b.extend(b_values)
+        self.results.extend(results)
+
+    def extend_operation(self, operation: Callable, a_values, b_values, results,
+                         backend: str = DEFAULT_BACKEND):
+        """Append many entries of one operation at once.
+
+        NumPy float64 arrays are copied in bulk; any other sequences are packed value by value.
+        """
+        code = self._code(operation)
+        start = len(self.operation_codes)
+        count = len(results)
+        self._positions[code].extend(range(start, start + count))
+        self.operation_codes.frombytes(bytes([code]) * count)
+        self.backend_codes.frombytes(bytes([self._backend_code(backend)]) * count)
+        for column, values in ((self.a, a_values), (self.b, b_values), (self.results, results)):
+            if getattr(values, 'dtype', None) == 'float64':
+                column.extend_floats(values)
+            else:
+                column.extend(values)
+
+    def merge(self, other: 'HistoryStore'):
+        """Append every entry of another store, e.g. one filled in a worker process."""
+        remap = [self._code(operation) for operation in other._operations]
+        start = len(self.operation_codes)
+        for code, positions in enumerate(other._positions):
+            self._positions[remap[code]].extend(start + position for position in positions)
+        if remap == list(range(len(remap))):
+            self.operation_codes.extend(other.operation_codes)
+        else:
+            self.operation_codes.extend(array('B', (remap[code] for code in other.operation_codes)))
+        backend_remap = [self._backend_code(backend) for backend in other._backends]
+        if backend_remap == list(range(len(backend_remap))):
+            self.backend_codes.extend(other.backend_codes)
+        else:
+            self.backend_codes.extend(array('B', (backend_remap[code] for code in other.backend_codes)))
+        self.a.merge(other.a)
+        self.b.merge(other.b)
+        self.results.merge(other.results)
+
+    def __len__(self) -> int:
+        return len(self.operation_codes)
+
+    def _calculation(self, index: int) -> Calculation:
+        return Calculation(self.a.get(index), self.b.get(index), self._operations[self.operation_codes[index]],
+                           self.results.get(index), self._backends[self.backend_codes[index]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._calculation(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._calculation(index)
+
+    def __iter__(self) -> Iterator[Calculation]:
+        for index in range(len(self)):
+            yield self._calculation(index)
+
+    def clear(self):
+        self.operation_codes = array('B')
+        self.backend_codes = array('B')
+        self._positions = [array('Q') for _ in self._operations]
+        self.a.clear()
+        self.b.clear()
+        self.results.clear()
+
+    def positions(self, operation_name: str) -> List[int]:
+        """Return the row positions of the entries whose operation has the given name, in order."""
+        codes = self._codes_by_name.get(operation_name, [])
+        if len(codes) == 1:
+            return self._positions[codes[0]].tolist()
+        return sorted(position for code in codes for position in self._positions[code])
+
+    def find(self, operation_name: str) -> List[Calculation]:
+        """Return the calculations whose operation has the given name."""
+        return [self._calculation(index) for index in self.positions(operation_name)]
+
+    def count(self, operation_name: str) -> int:
+        """Return how many entries use the operation with the given name."""
+        return sum(len(self._positions[code]) for code in self._codes_by_name.get(operation_name, []))
+
+    def rows(self, start: int = 0) -> Iterator[tuple]:
+        """Yield (a, b, operation name, result, backend name) for the entries from start onwards."""
+        for index in range(start, len(self.operation_codes)):
+            yield (self.a.get(index), self.b.get(index), self._operations[self.operation_codes[index]].__name__,
+                   self.results.get(index), self._backends[self.backend_codes[index]])
+
+    def text_rows(self, start: int = 0) -> Iterator[Tuple[str, str, str, str, str]]:
+        """Like rows(), but with every field as the text written to history files."""
+        a_text, b_text, result_text = self.a.text, self.b.text, self.results.text
+        names = [operation.__name__ for operation in self._operations]
+        codes, backends, backend_codes = self.operation_codes, self._backends, self.backend_codes
+        for index in range(start, len(self.operation_codes)):
+            yield (a_text(index), b_text(index), names[codes[index]], result_text(index),
+                   backends[backend_codes[index]])
@@ -0,0 +1,50 @@
+"""Queue-based logging: the root logger's handlers run on a background thread.
+
+The root logger gets a QueueHandler that only puts records on a queue; a QueueListener
+thread passes them to the handlers configured before (e.g. the rotating file handler), so
+file writes and rotation are off the command path. Queued records are written out when
+the listener is stopped, which also happens at interpreter exit.
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_listener: Optional[QueueListener] = None
+
+
+def start_queue_logging() -> QueueListener:
+    """Move the root logger's handlers behind a queue; does nothing if already started."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is not None:
+        return _listener
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_queue_logging():
+    """Write out every queued record and put the original handlers back on the root logger."""
+    global _listener  # pylint: disable=global-statement
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()  # Returns once the thread has handled everything queued so far
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+        handler.flush()
+
+
+# Registered after logging's own exit hook, so it runs first and queued records reach the handlers before they close
+atexit.register(stop_queue_logging)
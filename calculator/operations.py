@@ -12,4 +12,7 @@ def multiply(a: Decimal, b: Decimal) -> Decimal:
 def divide(a: Decimal, b: Decimal) -> Decimal:
     if b == 0:
         raise ValueError("Cannot divide by zero")
-    return a / b
\ No newline at end of file
+    return a / b
+
+# Lookup table from operation name to function, used when rebuilding history from disk
+OPERATIONS = {'add': add, 'subtract': subtract, 'multiply': multiply, 'divide': divide}
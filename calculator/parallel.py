@@ -0,0 +1,115 @@
+"""Run large command files across several processes.
+
+The file is split into chunks at line boundaries. Each worker process runs its chunks
+through its own CalculatorREPL (so the normal plugin commands and Calculator are used) and
+sends back the chunk's output, errors and history. The parent writes the output and merges
+the histories in input order, then saves the history once.
+
+A worker only sees its own chunk's history, and chunks run in any order, so the commands
+that clear, load, save or delete the whole history are rejected as errors on their line.
+"""
+import io
+import logging
+import mmap
+import os
+import sys
+from multiprocessing import Pool
+from typing import List, Optional, TextIO, Tuple
+from calculator.calculations import Calculations
+from calculator.commands import Command
+from calculator.history_store import HistoryStore
+
+CHUNK_SIZE = 8 << 20  # Target bytes per chunk; keeps per-chunk output small enough to buffer
+CHUNKS_PER_WORKER = 4  # Minimum chunks per worker, so uneven chunks still balance out
+_COUNT_BLOCK = 64 << 20
+SESSION_COMMANDS = ('Clearhistory', 'Loadhistory', 'Savehistory', 'Deletehistory')  # Rejected in workers
+
+_worker_repl = None
+
+
+def split_chunks(path: str, chunks: int) -> List[Tuple[int, int, int]]:
+    """Split a file into up to `chunks` byte ranges that end on line boundaries.
+
+    Returns (start, end, first_line) for each non-empty range, where first_line is the
+    1-based number of the range's first line.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        boundaries = [0]
+        for i in range(1, chunks):
+            newline = data.find(b'\n', max(size * i // chunks, boundaries[-1]))
+            if newline < 0:
+                break
+            if newline + 1 > boundaries[-1]:
+                boundaries.append(newline + 1)
+        if boundaries[-1] < size:
+            boundaries.append(size)
+        ranges = []
+        first_line = 1
+        for start, end in zip(boundaries, boundaries[1:]):
+            ranges.append((start, end, first_line))
+            for block in range(start, end, _COUNT_BLOCK):
+                first_line += data[block:min(block + _COUNT_BLOCK, end)].count(b'\n')
+    return ranges
+
+
+class SessionOnlyCommand(Command):
+    """Stands in for a whole-history command in a worker, failing with an error for its line."""
+    def __init__(self, name: str):
+        self.name = name
+
+    def execute(self, *args):
+        raise ValueError(f"{self.name} is not available when running with several workers.")
+
+
+def _init_worker():
+    global _worker_repl  # pylint: disable=global-statement
+    from calculator.repl import CalculatorREPL  # pylint: disable=import-outside-toplevel
+    _worker_repl = CalculatorREPL()
+    for name in SESSION_COMMANDS:
+        _worker_repl.command_handler.register_command(name, SessionOnlyCommand(name))
+
+
+def _run_chunk(task: Tuple[str, int, int, int]) -> Tuple[str, str, int, int, HistoryStore]:
+    """Run one chunk in a worker and return its output, errors, counts and history."""
+    path, start, end, first_line = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    output, errors = io.StringIO(), io.StringIO()
+    # A session of its own: the default one is inherited from the parent, write-ahead log included
+    with Calculations.session(Calculations.new_session()) as session:
+        executed, failed = _worker_repl.run_batch(text.split('\n'), output=output, errors=errors,
+                                                  flush_size=len(text) + 1, first_line=first_line,
+                                                  save_history=False)
+    return output.getvalue(), errors.getvalue(), executed, failed, session.history
+
+
+def run_parallel(path: str, workers: Optional[int] = None, output: Optional[TextIO] = None,
+                 errors: Optional[TextIO] = None, chunk_size: int = CHUNK_SIZE) -> Tuple[int, int]:
+    """Run the commands in a file with a pool of worker processes.
+
+    Output, errors and history are merged in input order. Unlike the interactive prompt,
+    'exit' only ends the chunk it appears in, and the commands in SESSION_COMMANDS fail.
+    Returns the number of commands run and the number that failed.
+    """
+    workers = workers or os.cpu_count() or 1
+    output = output or sys.stdout
+    errors = errors or sys.stderr
+    chunks = max(workers * CHUNKS_PER_WORKER, os.path.getsize(path) // chunk_size + 1)
+    tasks = [(path, start, end, first_line) for start, end, first_line in split_chunks(path, chunks)]
+    executed = failed = 0
+    with Pool(workers, initializer=_init_worker) as pool:
+        for chunk_output, chunk_errors, chunk_executed, chunk_failed, history in pool.imap(_run_chunk, tasks):
+            output.write(chunk_output)
+            errors.write(chunk_errors)
+            executed += chunk_executed
+            failed += chunk_failed
+            Calculations.merge_history(history)
+    output.flush()
+    errors.flush()
+    Calculations.save_history()
+    logging.info("Parallel run finished: %d commands, %d errors, %d workers.", executed, failed, workers)
+    return executed, failed
@@ -0,0 +1,83 @@
+"""Cached manifest of the command classes each plugin package provides.
+
+Plugin sources are scanned with ast rather than imported, and the result is cached in a
+JSON file next to the plugins. A package is only rescanned when its __init__.py mtime changes.
+"""
+import ast
+import json
+import logging
+import os
+from typing import Dict, List
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '.manifest.json'
+
+
+def _base_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ''
+
+
+def _takes_command_handler(node: ast.ClassDef) -> bool:
+    """Return True if the class's __init__ expects the command handler."""
+    for item in node.body:
+        if isinstance(item, ast.FunctionDef) and item.name == '__init__':
+            return any(arg.arg == 'command_handler' for arg in item.args.args)
+    return False
+
+
+def scan_plugin(init_path: str) -> List[dict]:
+    """List the command classes defined at the top level of a plugin's __init__.py."""
+    with open(init_path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), init_path)
+    return [{'class': node.name, 'needs_handler': _takes_command_handler(node)}
+            for node in tree.body
+            if isinstance(node, ast.ClassDef) and node.name.endswith('Command')
+            and any(_base_name(base).endswith('Command') for base in node.bases)]
+
+
+def _read_manifest(manifest_path: str) -> Dict[str, dict]:
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest['plugins']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+
+def _write_manifest(manifest_path: str, plugins: Dict[str, dict]):
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'plugins': plugins}, f, indent=1)
+        os.replace(temp_path, manifest_path)
+    except OSError as e:
+        logging.warning("Could not write plugin manifest: %s", e)
+
+
+def load_manifest(plugins_path: str) -> Dict[str, dict]:
+    """Return {package: {'mtime_ns': ..., 'commands': [...]}} for every plugin package."""
+    manifest_path = os.path.join(plugins_path, MANIFEST_NAME)
+    cached = _read_manifest(manifest_path)
+    plugins = {}
+    changed = False
+    for package in sorted(os.listdir(plugins_path)):
+        init_path = os.path.join(plugins_path, package, '__init__.py')
+        try:
+            mtime_ns = os.stat(init_path).st_mtime_ns
+        except OSError:
+            continue  # Not a plugin package
+        entry = cached.get(package)
+        if entry is None or entry.get('mtime_ns') != mtime_ns:
+            entry = {'mtime_ns': mtime_ns, 'commands': scan_plugin(init_path)}
+            changed = True
+        plugins[package] = entry
+    if changed or plugins.keys() != cached.keys():
+        _write_manifest(manifest_path, plugins)
+        logging.info("Plugin manifest rebuilt.")
+    return plugins
@@ -0,0 +1,16 @@
+from calculator.commands import Command
+from calculator import Calculator
+
+class CacheStatsCommand(Command):
+    def execute(self, *args):
+        cache = Calculator.cache
+        if cache is None:
+            print("Result cache is disabled. Set RESULT_CACHE_SIZE to enable it.")
+            return
+        if args and args[0].lower() == 'reset':
+            cache.clear()
+            print("Result cache cleared.")
+            return
+        stats = cache.stats()
+        print(f"Hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {stats['hit_rate']:.1%}")
+        print(f"Entries: {stats['size']} of {stats['maxsize']}")
@@ -0,0 +1,16 @@
+from decimal import InvalidOperation
+from calculator.commands import Command
+from calculator.expression import evaluate, parse_bindings
+
+class EvalCommand(Command):
+    """Eval EXPRESSION [name=value ...], e.g. Eval (x + 2) * y / 4 x=3 y=1.5"""
+    def execute(self, *args):
+        expression, bindings = parse_bindings(args)
+        if not expression:
+            raise ValueError("Eval command requires an expression.")
+        try:
+            result = evaluate(expression, bindings)
+        except InvalidOperation:
+            raise ValueError("Invalid input for Decimal conversion.")
+        print(f"Result: {result}")
+        return result
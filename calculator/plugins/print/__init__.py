@@ -2,5 +2,15 @@ from calculator.commands import Command
 from calculator.calculations import Calculations
 
 class PrintHistoryCommand(Command):
+    """Printhistory [offset=N] [limit=N] [tail=N] [stream]"""
     def execute(self, *args):
-        history = Calculations.print_history()
+        options = {}
+        for arg in args:
+            key, separator, value = arg.lower().partition('=')
+            if key == 'stream' and not separator:
+                options['stream'] = True
+            elif separator and key in ('offset', 'limit', 'tail') and value.isdigit():
+                options[key] = int(value)
+            else:
+                raise ValueError(f"Invalid argument: {arg}. Use offset=N, limit=N, tail=N or stream.")
+        Calculations.print_history(**options)
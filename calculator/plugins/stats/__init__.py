@@ -0,0 +1,54 @@
+from calculator.commands import Command
+from calculator.command_stats import CommandStats
+
+USAGE = "Use Stats [on|off|reset], Stats json [FILE] or Stats profile N [FILE]."
+
+class StatsCommand(Command):
+    def __init__(self, command_handler):
+        self.command_handler = command_handler
+
+    def execute(self, *args):
+        action = args[0].lower() if args else 'show'
+        stats = self.command_handler.stats
+        if action == 'on':
+            if stats is None:
+                self.command_handler.stats = CommandStats()
+            print("Command timing enabled.")
+        elif action == 'off':
+            self.command_handler.stats = None
+            print("Command timing disabled.")
+        elif stats is None:
+            print("Command timing is disabled. Run 'Stats on' or set COMMAND_STATS=1 to enable it.")
+        elif action == 'show':
+            print('\n'.join(stats.lines()))
+        elif action == 'reset':
+            stats.reset()
+            print("Command timings cleared.")
+        elif action == 'json':
+            self._export(stats, args[1] if len(args) > 1 else None)
+        elif action == 'profile':
+            self._profile(stats, args[1:])
+        else:
+            raise ValueError(f"Unknown Stats action: {args[0]}. {USAGE}")
+
+    @staticmethod
+    def _export(stats, path):
+        if path is None:
+            print(stats.to_json())
+            return
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(stats.to_json())
+        print(f"Command timings written to {path}.")
+
+    @staticmethod
+    def _profile(stats, args):
+        if not args:
+            if stats.profile_remaining:
+                print(f"Profiling; {stats.profile_remaining} more commands to capture.")
+            else:
+                print(stats.profile_report or "No profile captured yet.")
+            return
+        if not args[0].isdigit() or int(args[0]) == 0:
+            raise ValueError(f"Invalid number of commands to profile: {args[0]}. {USAGE}")
+        stats.start_profile(int(args[0]), args[1] if len(args) > 1 else None)
+        print(f"Profiling the next {args[0]} commands.")
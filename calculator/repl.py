@@ -1,60 +1,132 @@
+import io
 import logging
 import logging.config
 import os
+import sys
 import importlib.util
+from contextlib import redirect_stdout
+from functools import partial
+from typing import Iterable, Optional, TextIO, Tuple
 from dotenv import load_dotenv
-from calculator.commands import CommandHandler, Command
+from calculator import Calculator
+from calculator.backends import backend_from_settings
+from calculator.cache import ResultCache
+from calculator.command_stats import CommandStats
+from calculator.commands import CommandHandler, Command, LazyCommand
+from calculator.log_queue import start_queue_logging, stop_queue_logging
 from calculator.calculations import Calculations
+from calculator.plugin_manifest import load_manifest
 
 class CalculatorREPL:
     def __init__(self, plugin_dir='plugins'):
         if not os.path.exists('logs'):
             os.makedirs('logs')
-        self.configure_logging()
         load_dotenv()
+        self.configure_logging()
         self.settings = self.load_environment_variables()
         self.settings.setdefault('ENVIRONMENT', 'PRODUCTION')
+        self.configure_backend()
+        self.configure_cache()
         self.command_handler = CommandHandler()
+        self.configure_stats()
+        self.configure_wal()
+        self.configure_autosave()
         self.plugin_dir = self.settings.get('PLUGIN_DIR', 'plugins')
+        self._plugin_modules = {}
         self._load_plugins()
         #Calculations.load_history()  # Load history on startup
     
     def configure_logging(self):
+        stop_queue_logging()  # Reconfiguring replaces the handlers a running listener writes to
         logging_conf_path = 'logging.conf'
         if os.path.exists(logging_conf_path):
             logging.config.fileConfig(logging_conf_path, disable_existing_loggers=False)
         else:
             logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
             logging.info("Logging configured.")
+        if os.getenv('LOG_QUEUE', '').strip().lower() in ('1', 'true', 'yes', 'on'):
+            start_queue_logging()
+            logging.info("Logging through a background queue.")
     
+    def configure_backend(self):
+        """Set the default numeric backend from NUMERIC_BACKEND and DECIMAL_PRECISION."""
+        try:
+            Calculator.backend = backend_from_settings(self.settings)
+            logging.info("Numeric backend: %s", Calculator.backend.name)
+        except ValueError as e:
+            logging.error("%s; keeping the %s backend.", e, Calculator.backend.name)
+
+    def configure_cache(self):
+        """Enable the result cache when RESULT_CACHE_SIZE is a positive number of entries."""
+        size = self.settings.get('RESULT_CACHE_SIZE', '').strip()
+        try:
+            Calculator.cache = ResultCache(int(size)) if size and int(size) > 0 else None
+        except ValueError:
+            logging.error("Invalid RESULT_CACHE_SIZE: %s; the result cache is disabled.", size)
+            Calculator.cache = None
+        if Calculator.cache is not None:
+            logging.info("Result cache enabled with %d entries.", Calculator.cache.maxsize)
+
+    def configure_stats(self):
+        """Time every command when COMMAND_STATS is set to 1, true, yes or on."""
+        if self.settings.get('COMMAND_STATS', '').strip().lower() in ('1', 'true', 'yes', 'on'):
+            self.command_handler.stats = CommandStats()
+            logging.info("Command timing enabled.")
+
+    def configure_wal(self):
+        """Log new history entries to a write-ahead log when HISTORY_WAL is set to 1, true, yes or on."""
+        if self.settings.get('HISTORY_WAL', '').strip().lower() not in ('1', 'true', 'yes', 'on'):
+            return
+        try:
+            sync_entries = int(self.settings.get('WAL_SYNC_ENTRIES', '1000'))
+            sync_interval = int(self.settings.get('WAL_SYNC_MS', '50')) / 1000
+            compact_entries = int(self.settings.get('WAL_COMPACT_ENTRIES', '100000'))
+            Calculations.enable_wal(sync_entries, sync_interval, compact_entries)
+        except ValueError as e:
+            logging.error("Invalid write-ahead log setting: %s; running without a log.", e)
+
+    def configure_autosave(self):
+        """Save new history entries in the background when AUTOSAVE_SECONDS is a positive number."""
+        seconds = self.settings.get('AUTOSAVE_SECONDS', '').strip()
+        if not seconds:
+            return
+        try:
+            Calculations.enable_autosave(float(seconds), int(self.settings.get('AUTOSAVE_ENTRIES', '10000')))
+        except ValueError as e:
+            logging.error("Invalid autosave setting: %s; autosave is disabled.", e)
+
     def load_environment_variables(self):
         settings = {key: value for key, value in os.environ.items()}
         logging.info("Environment variables loaded.")
         return settings
 
     def _load_plugins(self):
+        """Register every plugin command from the manifest; modules are imported on first use."""
         plugins_path = os.path.join(os.path.dirname(__file__), self.plugin_dir)
 
-        for subdir in os.listdir(plugins_path):
-            subdir_path = os.path.join(plugins_path, subdir)
-            if os.path.isdir(subdir_path):
-                init_path = os.path.join(subdir_path, '__init__.py')
-                if os.path.exists(init_path):
-                    module_name = f"calculator.plugins.{subdir}"
-                    spec = importlib.util.spec_from_file_location(module_name, init_path)
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-                    for attr in dir(module):
-                        if attr.endswith("Command"):
-                            command_class = getattr(module, attr)
-                            if callable(command_class) and issubclass(command_class, Command):
-                                if command_class.__module__ == module_name:
-                                    if attr == "MenuCommand":
-                                        instance = command_class(self.command_handler)
-                                    else:
-                                        instance = command_class()
-                                    command_name = instance.__class__.__name__.replace('Command', '').replace('_', ' ').title()
-                                    self.command_handler.register_command(command_name, instance)
+        for subdir, entry in load_manifest(plugins_path).items():
+            init_path = os.path.join(plugins_path, subdir, '__init__.py')
+            module_name = f"calculator.plugins.{subdir}"
+            for command in entry['commands']:
+                command_name = command['class'].replace('Command', '').replace('_', ' ').title()
+                loader = partial(self._create_command, module_name, init_path, command['class'], command['needs_handler'])
+                self.command_handler.register_command(command_name, LazyCommand(loader))
+
+    def _create_command(self, module_name, init_path, class_name, needs_handler):
+        """Import a plugin module (once) and instantiate one of its command classes."""
+        module = self._plugin_modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, init_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self._plugin_modules[module_name] = module
+            logging.info("Loaded plugin %s.", module_name)
+        command_class = getattr(module, class_name)
+        if not (isinstance(command_class, type) and issubclass(command_class, Command)):
+            raise TypeError(f"{module_name}.{class_name} is not a command.")
+        if needs_handler:
+            return command_class(self.command_handler)
+        return command_class()
 
     def start(self):
         print("Type 'Menu' to see the list of available commands or 'Exit' to exit.")
@@ -74,4 +146,61 @@ class CalculatorREPL:
                     print(f"An unexpected error occurred: {e}")
                     logging.error("An unexpected error occurred: %s", e)
         finally:
-            Calculations.save_history()  # Save history on exit
+            if Calculations.current().autosaving:
+                Calculations.current().disable_autosave()  # Only entries since the last autosave are left
+            else:
+                Calculations.save_history()  # Save history on exit
+
+    def run_batch(self, lines: Iterable[str], output: Optional[TextIO] = None, errors: Optional[TextIO] = None,
+                  flush_size: int = 1 << 16, first_line: int = 1, save_history: bool = True) -> Tuple[int, int]:
+        """Run commands from an iterable of lines, such as an open file, without prompting.
+
+        Command output is buffered and written in blocks of about flush_size characters.
+        Errors are reported per line (numbered from first_line) on the errors stream and do not
+        stop the run. History is saved once at the end unless save_history is False.
+        Returns the number of commands run and the number that failed.
+        """
+        output = output or sys.stdout
+        errors = errors or sys.stderr
+        buffer = io.StringIO()
+        error_lines = []
+        executed = failed = 0
+        execute_command = self.command_handler.execute_command
+        try:
+            with redirect_stdout(buffer):
+                for line_number, line in enumerate(lines, first_line):
+                    user_input = line.strip()
+                    if not user_input or user_input.startswith('#'):
+                        continue
+                    if user_input.lower() == 'exit':
+                        break
+                    executed += 1
+                    try:
+                        execute_command(user_input)
+                    except ValueError as e:
+                        failed += 1
+                        error_lines.append(f"Line {line_number}: Error: {e}\n")
+                        logging.error("Error executing command on line %d: %s", line_number, e)
+                    except Exception as e:
+                        failed += 1
+                        error_lines.append(f"Line {line_number}: An unexpected error occurred: {e}\n")
+                        logging.error("An unexpected error occurred on line %d: %s", line_number, e)
+                    if buffer.tell() >= flush_size:
+                        self._flush_batch_output(buffer, output, error_lines, errors)
+        finally:
+            self._flush_batch_output(buffer, output, error_lines, errors)
+            if save_history:
+                Calculations.save_history()  # Save history once for the whole batch
+        logging.info("Batch run finished: %d commands, %d errors.", executed, failed)
+        return executed, failed
+
+    @staticmethod
+    def _flush_batch_output(buffer: io.StringIO, output: TextIO, error_lines: list, errors: TextIO):
+        output.write(buffer.getvalue())
+        output.flush()
+        buffer.seek(0)
+        buffer.truncate()
+        if error_lines:
+            errors.writelines(error_lines)
+            errors.flush()
+            error_lines.clear()
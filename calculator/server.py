@@ -0,0 +1,118 @@
+"""Asyncio server that shares one warm calculator process between many clients.
+
+Protocol (UTF-8, one command per line, like the REPL):
+
+* Each request line is dispatched to CommandHandler.execute_command.
+* Each request gets exactly one status line back: ``OK <result>`` when the command returns
+  a value, ``OK`` when it does not, or ``ERR <message>`` when it fails.
+* For commands that return nothing, anything they print (e.g. Menu, Printhistory) is sent
+  first, one ``. <text>`` line per printed line.
+* ``exit`` closes the connection.
+
+Clients may pipeline: send many lines without waiting, and read the responses in order.
+All complete lines received in one read are answered with one write. If a client stops
+reading, the server stops reading from it too once the write buffer passes the high-water mark.
+Every connection has its own history session.
+"""
+import asyncio
+import io
+import logging
+from contextlib import redirect_stdout
+from typing import Optional
+from calculator.calculations import Calculations, HistorySession
+from calculator.commands import CommandHandler
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+WRITE_HIGH_WATER = 256 << 10  # Bytes of unsent responses before a connection stops being read
+READ_SIZE = 64 << 10
+MAX_LINE = 64 << 10
+
+
+def format_response(command_handler: CommandHandler, user_input: str) -> str:
+    """Run one request line and return the response text."""
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output):
+            result = command_handler.execute_command(user_input)
+    except Exception as e:  # Errors are reported to the client, like the REPL reports them to the user
+        return f"ERR {' '.join(str(e).split()) or type(e).__name__}\n"
+    if result is not None:
+        return f"OK {result}\n"
+    printed = ''.join(f". {line}\n" for line in output.getvalue().splitlines())
+    return f"{printed}OK\n"
+
+
+class CalculatorServer:
+    """Serves a CommandHandler over TCP or a Unix socket."""
+
+    def __init__(self, command_handler: CommandHandler):
+        self.command_handler = command_handler
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None):
+        """Start listening on host:port, or on a Unix socket if path is given."""
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        for sock in self.server.sockets:
+            logging.info("Calculator server listening on %s", sock.getsockname())
+        return self.server
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one connection with its own history session until it closes or sends exit."""
+        peer = writer.get_extra_info('peername')
+        logging.info("Client connected: %s", peer)
+        session = Calculations.new_session()
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        pending = b''
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                lines = (pending + data).split(b'\n')
+                # Keep an unfinished last line for the next read, unless the client is done sending
+                pending = lines.pop() if data else b''
+                if len(pending) > MAX_LINE:
+                    writer.write(b"ERR Line too long\n")
+                    break
+                responses, closing = self._respond(lines, session)
+                # Every complete line received so far is answered with a single write
+                writer.write(responses.encode('utf-8'))
+                await writer.drain()
+                if closing or not data:
+                    break
+        except ConnectionError as e:
+            logging.warning("Client %s disconnected: %s", peer, e)
+        finally:
+            writer.close()
+            logging.info("Client disconnected: %s", peer)
+
+    def _respond(self, lines, session: HistorySession):
+        """Answer a run of request lines; returns the responses and whether the client sent exit."""
+        responses = []
+        with Calculations.session(session):
+            for line in lines:
+                user_input = line.decode('utf-8', errors='replace').strip()
+                if user_input.lower() == 'exit':
+                    return ''.join(responses), True
+                if user_input:
+                    responses.append(format_response(self.command_handler, user_input))
+        return ''.join(responses), False
+
+
+def serve(command_handler: CommandHandler, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          path: Optional[str] = None):
+    """Run the server until interrupted."""
+    async def main():
+        server = CalculatorServer(command_handler)
+        await server.start(host, port, path)
+        await server.serve_forever()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logging.info("Calculator server stopped.")
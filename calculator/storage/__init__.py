@@ -0,0 +1,227 @@
+"""Storage backends for the calculation history.
+
+Calculations saves, loads and deletes its history through a HistoryBackend chosen by the
+extension of HISTORY_FILE_PATH: ``.db``, ``.sqlite`` and ``.sqlite3`` use SQLite, ``.bin``
+uses the memory-mapped binary format, and anything else uses CSV. Backend modules are only
+imported when a history file is first used.
+
+Backends take an advisory lock on ``<path>.lock`` (with fcntl, where available) while they
+read or write the history, so several processes can share one history file. The CSV and
+binary backends are IndexedHistoryBackends: they keep the hashes of the stored rows in
+``<path>.idx`` (see row_index), so deduplicating a save costs time in proportion to the new
+rows. SQLite gets the same from an index inside the database.
+"""
+import importlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+from calculator.backends import DEFAULT_BACKEND, get_backend
+from calculator.history_store import HistoryStore
+from calculator.operations import OPERATIONS
+from calculator.storage.row_index import RowIndex
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; the lock then only excludes other threads of this process
+    fcntl = None
+
+HISTORY_COLUMNS = ['a', 'b', 'operation', 'result', 'backend']
+
+# File extension -> (module, class) of the backend that stores it
+BACKENDS_BY_EXTENSION = {
+    '.bin': ('calculator.storage.binary_backend', 'BinaryHistoryBackend'),
+    '.db': ('calculator.storage.sqlite_backend', 'SqliteHistoryBackend'),
+    '.sqlite': ('calculator.storage.sqlite_backend', 'SqliteHistoryBackend'),
+    '.sqlite3': ('calculator.storage.sqlite_backend', 'SqliteHistoryBackend'),
+}
+DEFAULT_STORAGE = ('calculator.storage.csv_backend', 'CsvHistoryBackend')
+LOCK_SUFFIX = '.lock'
+
+
+class HistoryBackend(ABC):
+    """Persists history rows for one file."""
+    name = ''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + LOCK_SUFFIX
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+
+    def exists(self) -> bool:
+        """Return True if there is a non-empty history file."""
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    @contextmanager
+    def locked(self, exclusive: bool = True):
+        """Hold the advisory lock on the history file: exclusive for writers, shared for readers.
+
+        The lock file is left in place, since removing it would let two processes lock different files.
+        Nested use by one thread keeps the lock it already holds.
+        """
+        with self._thread_lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.lock_path, 'ab') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _file_state(self) -> Optional[Tuple[int, int]]:
+        """Return the history file's modification time and size, to notice writes by other processes."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @abstractmethod
+    def save(self, history: HistoryStore, start: int, append: bool, deduplicate: bool, stored: int = 0):
+        """Write the entries of history from start onwards.
+
+        Appending only adds rows; otherwise the backend merges them with what it already holds.
+        With deduplicate, rows already stored (or repeated) are not stored again; the first
+        `stored` entries of history are known to be stored, so they need not be checked.
+        """
+
+    @abstractmethod
+    def load(self, batch_size: int) -> HistoryStore:
+        """Read the whole stored history, parsing batch_size rows at a time."""
+
+    @abstractmethod
+    def delete(self) -> bool:
+        """Remove the stored history; returns False if there was nothing to delete."""
+
+    def query(self, operation: Optional[str] = None, min_result=None, max_result=None,
+              batch_size: int = 100_000) -> HistoryStore:
+        """Return the stored entries matching an operation name and an inclusive result range.
+
+        This default loads everything and filters it; backends with indexes override it.
+        """
+        history = self.load(batch_size)
+        matches = HistoryStore()
+        indexes = history.positions(operation) if operation else range(len(history))
+        for index in indexes:
+            calculation = history[index]
+            result = calculation.perform()
+            if (min_result is None or result >= min_result) and (max_result is None or result <= max_result):
+                matches.append(calculation)
+        return matches
+
+
+class IndexedHistoryBackend(HistoryBackend):
+    """A file backend that keeps the hashes of its rows in a RowIndex, to deduplicate saves cheaply.
+
+    save() decides between appending and a full merge; subclasses write the rows in _append()
+    and _rewrite(), which get each row both as the values to store and as text.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._index = RowIndex(path)
+
+    def save(self, history: HistoryStore, start: int, append: bool, deduplicate: bool, stored: int = 0):
+        first = max(start, stored) if deduplicate else start  # Stored entries would all be dropped
+        # Read out before taking the lock, to hold it briefly
+        rows, text_rows = self._rows(history, first)
+        with self.locked():
+            if append or (deduplicate and self._can_append() and self._has_unique_rows()):
+                self._append(rows, text_rows, deduplicate)
+            else:
+                if first > start:  # A full merge rewrites every entry
+                    rows, text_rows = self._rows(history, start)
+                self._rewrite(rows, text_rows, deduplicate)
+
+    def _rows(self, history: HistoryStore, start: int) -> Tuple[list, List[Tuple[str, ...]]]:
+        """Return the entries of history from start as the rows to write and as text rows."""
+        text_rows = list(history.text_rows(start))
+        return text_rows, text_rows
+
+    def _can_append(self) -> bool:
+        """Return True if new rows can be added to the file as it is, without rewriting it."""
+        return True
+
+    def _new_rows(self, rows: list, text_rows: List[Tuple[str, ...]], deduplicate: bool):
+        """Pick the rows an append writes.
+
+        Returns the row index to add them to, the rows, their hashes and whether any repeats.
+        A deduplicating append rebuilds a missing or stale index; other appends only keep an
+        index that is current, and otherwise get None for it and every row.
+        """
+        index = self._row_index(rebuild=deduplicate)
+        if index is None:
+            return None, rows, None, False
+        return (index, *index.new_rows(text_rows, deduplicate, rows))
+
+    def _reindex(self, text_rows: Optional[Iterable[Tuple[str, ...]]]):
+        """Index the rows a rewrite left in the file, if given, rather than read them back later."""
+        if text_rows is None:
+            self._index.invalidate()
+        else:
+            self._index.rebuild(text_rows, self._file_state())
+
+    @abstractmethod
+    def _append(self, rows: list, text_rows: List[Tuple[str, ...]], deduplicate: bool):
+        """Write rows to the end of the file (called with the lock held)."""
+
+    @abstractmethod
+    def _rewrite(self, rows: list, text_rows: List[Tuple[str, ...]], deduplicate: bool):
+        """Merge rows with the file's rows and replace the file (called with the lock held)."""
+
+    def _row_index(self, rebuild: bool = True) -> Optional[RowIndex]:
+        """Return the row index matching the file, rebuilding it if it is missing or stale.
+
+        Without rebuild, returns None instead of rebuilding; called with the lock held.
+        """
+        state = self._file_state()
+        if self._index.matches(state) or self._index.load(state):
+            return self._index
+        if not rebuild:
+            return None
+        self._index.rebuild(self._stored_text_rows(), state)
+        return self._index
+
+    def _has_unique_rows(self) -> bool:
+        """Return True if the file exists and none of its rows is repeated.
+
+        A deduplicating rewrite of such a file keeps every row where it is, so it can append instead.
+        """
+        return self.exists() and self._row_index().unique
+
+    @abstractmethod
+    def _stored_text_rows(self) -> Iterable[Tuple[str, ...]]:
+        """Yield every stored row as text, for rebuilding the row index."""
+
+
+def extend_from_text(history: HistoryStore, a: List[str], b: List[str], operations: List[str],
+                     results: List[str], backends: Optional[Iterable[str]] = None):
+    """Append rows read back as text, parsing each value with the backend that produced it."""
+    functions = [OPERATIONS.get(name) for name in operations]
+    if None in functions:
+        raise ValueError(f"Unknown operation in history: {operations[functions.index(None)]}")
+    backends = list(backends) if backends is not None else [DEFAULT_BACKEND] * len(functions)
+    names = set(backends)
+    if len(names) == 1:
+        parse = get_backend(names.pop()).parse
+        columns = [map(parse, column) for column in (a, b, results)]
+    else:
+        parsers = [get_backend(name).parse for name in backends]
+        columns = [map(lambda parse, text: parse(text), parsers, column) for column in (a, b, results)]
+    history.extend_columns(columns[0], columns[1], functions, columns[2], backends)
+
+
+def open_history_backend(path: str) -> HistoryBackend:
+    """Return the backend for a history file, chosen by its extension."""
+    module_name, class_name = BACKENDS_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), DEFAULT_STORAGE)
+    return getattr(importlib.import_module(module_name), class_name)(path)
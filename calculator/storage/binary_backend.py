@@ -0,0 +1,297 @@
+"""Binary history files with fixed-size records, read on demand through mmap.
+
+Layout of ``<path>``:
+
+* A 4 KiB header: magic, version, record size, then a JSON list of the operation and
+  backend names that record codes refer to.
+* 32-byte records: operation code, backend code, and for each of a, b and result an int8
+  exponent and an int64 coefficient, packed as in calculator.history_store.
+
+Values that do not fit a 64-bit coefficient (long Decimals, Fractions, special values) are
+written as text to ``<path>.pool``; their record holds the POOLED exponent and the text's
+offset in the pool. Because records have a fixed size, entry i is found without reading
+anything before it: loading only maps the file, and entries are decoded when accessed.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
+from calculator.backends import get_backend
+from calculator.calculation import Calculation
+from calculator.history_store import (FLOAT, POOLED, HistoryStore, float_bits, float_from_bits,
+                                      pack_decimal, packed_text, unpack_decimal)
+from calculator.operations import OPERATIONS
+from calculator.storage import IndexedHistoryBackend
+
+MAGIC = b'CALCHIST'
+VERSION = 1
+HEADER_SIZE = 4096
+HEADER = struct.Struct('<8sHHI')  # magic, version, record size, length of the names JSON
+RECORD = struct.Struct('<BBbbb3xqqq')  # operation, backend, 3 exponents, padding, 3 coefficients
+POOL_LENGTH = struct.Struct('<I')
+POOL_SUFFIX = '.pool'
+
+
+def _read_header(f) -> Tuple[List[str], List[str]]:
+    """Return the operation and backend names from a file's header."""
+    magic, version, record_size, names_length = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError("Not a binary history file of a supported version")
+    names = json.loads(f.read(names_length))
+    return names['operations'], names['backends']
+
+
+def _header(operations: List[str], backends: List[str]) -> bytes:
+    names = json.dumps({'operations': operations, 'backends': backends}).encode('utf-8')
+    if HEADER.size + len(names) > HEADER_SIZE:
+        raise ValueError("Too many operation and backend names for the history file header")
+    return (HEADER.pack(MAGIC, VERSION, RECORD.size, len(names)) + names).ljust(HEADER_SIZE, b'\0')
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    """Map a whole file read-only, or return None if it is missing or empty."""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+
+class BinaryRecords:
+    """Read-only, on-demand view of the records in a binary history file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self._records = self._pool = None
+        self._count = 0
+        self._positions = {}
+        self.operation_names: List[str] = []
+        self.backend_names: List[str] = []
+        if path is None:
+            return  # No records, e.g. after the history is cleared
+        with open(path, 'rb') as f:
+            self.operation_names, self.backend_names = _read_header(f)
+            # A partly written last record (e.g. after a crash) is ignored
+            self._count = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // RECORD.size
+        unknown = [name for name in self.operation_names if name not in OPERATIONS]
+        if unknown:
+            raise ValueError(f"Unknown operation in history: {unknown[0]}")
+        self._operations = [OPERATIONS[name] for name in self.operation_names]
+        self._parsers = [get_backend(name).parse for name in self.backend_names]
+        if self._count:
+            self._records = _map(path)
+            self._pool = _map(path + POOL_SUFFIX)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _value(self, coefficient: int, exponent: int, backend: int):
+        if exponent == FLOAT:
+            return float_from_bits(coefficient)
+        if exponent == POOLED:
+            return self._parsers[backend](self._pooled_text(coefficient))
+        return unpack_decimal(coefficient, exponent)
+
+    def _text(self, coefficient: int, exponent: int) -> str:
+        if exponent == FLOAT:
+            return str(float_from_bits(coefficient))
+        if exponent == POOLED:
+            return self._pooled_text(coefficient)
+        return packed_text(coefficient, exponent)
+
+    def _pooled_text(self, offset: int) -> str:
+        (length,) = POOL_LENGTH.unpack_from(self._pool, offset)
+        start = offset + POOL_LENGTH.size
+        return self._pool[start:start + length].decode('utf-8')
+
+    def calculation(self, index: int) -> Calculation:
+        """Decode the calculation stored at a non-negative index."""
+        operation, backend, a_exp, b_exp, r_exp, a, b, result = RECORD.unpack_from(
+            self._records, HEADER_SIZE + index * RECORD.size)
+        return Calculation(self._value(a, a_exp, backend), self._value(b, b_exp, backend),
+                           self._operations[operation], self._value(result, r_exp, backend),
+                           self.backend_names[backend])
+
+    def row(self, index: int) -> tuple:
+        calculation = self.calculation(index)
+        return (calculation.a, calculation.b, calculation.operation.__name__, calculation.perform(),
+                calculation.backend)
+
+    def text_row(self, index: int) -> Tuple[str, str, str, str, str]:
+        operation, backend, a_exp, b_exp, r_exp, a, b, result = RECORD.unpack_from(
+            self._records, HEADER_SIZE + index * RECORD.size)
+        return (self._text(a, a_exp), self._text(b, b_exp), self.operation_names[operation],
+                self._text(result, r_exp), self.backend_names[backend])
+
+    def positions(self, operation_name: str) -> List[int]:
+        """Return the indexes of the records with the named operation (cached; the file is read once)."""
+        if operation_name not in self.operation_names:
+            return []
+        if operation_name not in self._positions:
+            code = bytes([self.operation_names.index(operation_name)])
+            # The operation codes of all records, one byte each, copied out in a single strided slice
+            codes = self._records[HEADER_SIZE:HEADER_SIZE + self._count * RECORD.size:RECORD.size]
+            positions = []
+            index = codes.find(code)
+            while index >= 0:
+                positions.append(index)
+                index = codes.find(code, index + 1)
+            self._positions[operation_name] = positions
+        return self._positions[operation_name]
+
+
+class MappedHistoryStore(HistoryStore):
+    """A history whose first entries are read on demand from a binary file.
+
+    Entries added after loading are kept in the in-memory columns of HistoryStore and
+    numbered after the file's records.
+    """
+
+    def __init__(self, records: BinaryRecords):
+        super().__init__()
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records) + len(self.operation_codes)
+
+    def _calculation(self, index: int) -> Calculation:
+        base = len(self.records)
+        if index < base:
+            return self.records.calculation(index)
+        return super()._calculation(index - base)
+
+    def clear(self):
+        super().clear()
+        self.records = BinaryRecords()
+
+    def positions(self, operation_name: str) -> List[int]:
+        base = len(self.records)
+        return self.records.positions(operation_name) + [
+            base + position for position in super().positions(operation_name)]
+
+    def count(self, operation_name: str) -> int:
+        return len(self.records.positions(operation_name)) + super().count(operation_name)
+
+    def rows(self, start: int = 0) -> Iterator[tuple]:
+        base = len(self.records)
+        for index in range(start, base):
+            yield self.records.row(index)
+        yield from super().rows(max(start - base, 0))
+
+    def text_rows(self, start: int = 0) -> Iterator[Tuple[str, str, str, str, str]]:
+        base = len(self.records)
+        for index in range(start, base):
+            yield self.records.text_row(index)
+        yield from super().text_rows(max(start - base, 0))
+
+
+def _pack(value, pool: bytearray, pool_start: int) -> Tuple[int, int]:
+    """Return the coefficient and exponent to store for a value, adding its text to the pool if needed."""
+    if type(value) is float:  # pylint: disable=unidiomatic-typecheck
+        return float_bits(value), FLOAT
+    packed = pack_decimal(value) if isinstance(value, (Decimal, int)) else None
+    if packed is None:
+        offset = pool_start + len(pool)
+        text = str(value).encode('utf-8')
+        pool += POOL_LENGTH.pack(len(text)) + text
+        return offset, POOLED
+    return packed
+
+
+class BinaryHistoryBackend(IndexedHistoryBackend):
+    name = 'binary'
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.pool_path = path + POOL_SUFFIX
+
+    def load(self, batch_size: int) -> HistoryStore:
+        """Map the file; nothing is decoded until entries are accessed."""
+        with self.locked(exclusive=False):
+            history = MappedHistoryStore(BinaryRecords(self.path))
+        logging.info("Opened binary history file with %d entries.", len(history))
+        return history
+
+    def _rows(self, history: HistoryStore, start: int):
+        return list(history.rows(start)), list(history.text_rows(start))
+
+    def _append(self, rows, text_rows, deduplicate: bool):
+        index, rows, hashes, repeated = self._new_rows(rows, text_rows, deduplicate)
+        written = self._write(rows, append=True)
+        if index is not None:
+            index.add(hashes, repeated, self._file_state())
+        logging.info("Appended %d new history entries to binary file.", written)
+
+    def _rewrite(self, rows, text_rows, deduplicate: bool):
+        """Write the existing records followed by rows to a new file, then swap it in."""
+        existing = BinaryRecords(self.path) if self.exists() else BinaryRecords()
+        combined = [existing.row(index) for index in range(len(existing))]
+        combined.extend(rows)
+        seen = None
+        if deduplicate:
+            texts = [existing.text_row(index) for index in range(len(existing))]
+            texts.extend(text_rows)
+            seen, unique = set(), []
+            for row, text in zip(combined, texts):
+                if text not in seen:
+                    seen.add(text)
+                    unique.append(row)
+            combined = unique
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        written = BinaryHistoryBackend(temp_path)._write(combined, append=False)  # pylint: disable=protected-access
+        # The pool goes first, so the records that point into it never refer to a missing pool
+        os.replace(temp_path + POOL_SUFFIX, self.pool_path)
+        os.replace(temp_path, self.path)
+        self._reindex(seen)
+        logging.info("Saved %d history entries to binary file.", written)
+
+    def _write(self, rows, append: bool) -> int:
+        """Add rows of values to the end of the file, or to a new file; returns the count written."""
+        exists = append and self.exists()
+        operations, backends, count = [], [], 0
+        if exists:
+            with open(self.path, 'rb') as f:
+                operations, backends = _read_header(f)
+                count = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // RECORD.size
+        known_names = (list(operations), list(backends))
+        pool_start = os.path.getsize(self.pool_path) if exists and os.path.exists(self.pool_path) else 0
+        records, pool = bytearray(), bytearray()
+        for a, b, operation, result, backend in rows:
+            if operation not in operations:
+                operations.append(operation)
+            if backend not in backends:
+                backends.append(backend)
+            a_packed = _pack(a, pool, pool_start)
+            b_packed = _pack(b, pool, pool_start)
+            result_packed = _pack(result, pool, pool_start)
+            records += RECORD.pack(operations.index(operation), backends.index(backend),
+                                   a_packed[1], b_packed[1], result_packed[1],
+                                   a_packed[0], b_packed[0], result_packed[0])
+        with open(self.pool_path, 'ab' if exists else 'wb') as f:
+            f.write(pool)
+        with open(self.path, 'r+b' if exists else 'wb') as f:
+            if not exists or (operations, backends) != known_names:
+                f.write(_header(operations, backends))
+            f.truncate(HEADER_SIZE + count * RECORD.size)  # Drop a partly written last record
+            f.seek(HEADER_SIZE + count * RECORD.size)
+            f.write(records)
+        return len(records) // RECORD.size
+
+    def _stored_text_rows(self):
+        records = BinaryRecords(self.path) if self.exists() else BinaryRecords()
+        return (records.text_row(index) for index in range(len(records)))
+
+    def delete(self) -> bool:
+        with self.locked():
+            self._index.delete()
+            if not os.path.exists(self.path):
+                return False
+            os.remove(self.path)
+            if os.path.exists(self.pool_path):
+                os.remove(self.pool_path)
+        logging.info("Deleted binary history file.")
+        return True
@@ -0,0 +1,118 @@
+"""CSV history files, read and written with pandas.
+
+Rewrites go to a temporary file that then replaces the history file, so readers never see a
+partly written file. Appends prepare every new row first and write them with one call
+while holding the lock. Deduplication checks new rows against the row index instead of
+reading the file, and a deduplicating rewrite of a file without repeated rows appends.
+"""
+import logging
+import os
+from typing import List
+from calculator.backends import DEFAULT_BACKEND
+from calculator.history_store import HistoryStore
+from calculator.storage import HISTORY_COLUMNS, IndexedHistoryBackend, extend_from_text
+
+STORED_ROWS_BATCH = 100_000  # Rows parsed at a time when rebuilding the row index
+
+
+def _pandas():
+    """Import pandas on first use, so plain arithmetic never pays for importing it."""
+    import pandas  # pylint: disable=import-outside-toplevel
+    return pandas
+
+
+class CsvHistoryBackend(IndexedHistoryBackend):
+    name = 'CSV'
+
+    def _rewrite(self, rows: List[tuple], text_rows: List[tuple], deduplicate: bool):
+        """Merge rows of text with the existing file and rewrite it."""
+        pd = _pandas()
+        if os.path.exists(self.path):
+            # Try reading the existing CSV file
+            try:
+                existing_df = pd.read_csv(self.path, dtype=str, keep_default_na=False)
+            except pd.errors.EmptyDataError:
+                # If the CSV file is empty, create an empty DataFrame
+                existing_df = pd.DataFrame(columns=HISTORY_COLUMNS)
+            if 'backend' not in existing_df:
+                existing_df['backend'] = DEFAULT_BACKEND  # Files written before backends were recorded
+            new_df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+            combined_df = pd.concat([existing_df, new_df], ignore_index=True)
+        else:
+            combined_df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+        if deduplicate:
+            combined_df = combined_df.drop_duplicates()
+
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        combined_df.to_csv(temp_path, index=False)
+        os.replace(temp_path, self.path)
+        self._reindex(combined_df[HISTORY_COLUMNS].itertuples(index=False, name=None) if deduplicate else None)
+        logging.info("Saved current instance history to CSV file.")
+
+    def _append(self, rows: List[tuple], text_rows: List[tuple], deduplicate: bool):
+        """Write rows of text to the end of the file."""
+        has_header = self.exists()
+        if not self._can_append():
+            logging.info("History file has different columns; rewriting it instead of appending.")
+            self._rewrite(rows, text_rows, deduplicate)
+            return
+        index, rows, hashes, repeated = self._new_rows(rows, text_rows, deduplicate)
+        if not rows:
+            logging.info("No new history entries to append.")
+            return
+
+        _pandas().DataFrame(rows, columns=HISTORY_COLUMNS).to_csv(
+            self.path, mode='a', header=not has_header, index=False)
+        if index is not None:
+            index.add(hashes, repeated, self._file_state())
+        logging.info("Appended %d new history entries to CSV file.", len(rows))
+
+    def _file_columns(self) -> List[str]:
+        """Return the column names in the file's header line."""
+        with open(self.path, encoding='utf-8') as f:
+            return f.readline().strip().split(',')
+
+    def _can_append(self) -> bool:
+        """Return True if the file is missing or has exactly the columns written today."""
+        return not self.exists() or self._file_columns() == HISTORY_COLUMNS
+
+    def _stored_text_rows(self):
+        pd = _pandas()
+        try:
+            reader = pd.read_csv(self.path, dtype=str, keep_default_na=False, chunksize=STORED_ROWS_BATCH)
+        except pd.errors.EmptyDataError:
+            return
+        with reader:
+            for chunk in reader:
+                yield from chunk[HISTORY_COLUMNS].itertuples(index=False, name=None)
+
+    def load(self, batch_size: int) -> HistoryStore:
+        with self.locked(exclusive=False):
+            return self._load(batch_size)
+
+    def _load(self, batch_size: int) -> HistoryStore:
+        pd = _pandas()
+        history = HistoryStore()
+        try:
+            # Files written before backends were recorded have no backend column
+            reader = pd.read_csv(self.path, usecols=lambda column: column in HISTORY_COLUMNS, dtype=str,
+                                 chunksize=batch_size)
+            with reader:
+                for chunk in reader:
+                    extend_from_text(history, chunk['a'].tolist(), chunk['b'].tolist(),
+                                     chunk['operation'].tolist(), chunk['result'].tolist(),
+                                     chunk['backend'].tolist() if 'backend' in chunk else None)
+        except pd.errors.EmptyDataError:
+            logging.warning("The CSV file is empty. No history to load.")
+            return HistoryStore()
+        logging.info("Loaded history from CSV file.")
+        return history
+
+    def delete(self) -> bool:
+        with self.locked():
+            self._index.delete()
+            if not os.path.exists(self.path):
+                return False
+            os.remove(self.path)
+        logging.info("Deleted history CSV file.")
+        return True
@@ -0,0 +1,159 @@
+"""Persistent index of row hashes, so saves can deduplicate without reading the history file.
+
+``<history file>.idx`` holds a 64-bit hash of every row in the history file: a sorted part,
+searched with bisect, followed by a tail of hashes appended since the tail was last merged
+into it. The header records the history file's modification time and size when the index
+was last updated; an index that does not match the file (missing, damaged, or left behind
+by a writer that crashed or did not keep it) is stale and is rebuilt from the file.
+
+Hashes are 8-byte blake2b digests of a row's text, so every process computes the same ones.
+Two different rows share a hash with a probability of about 2**-64 per pair, so the hash
+is taken as the row's identity.
+"""
+import hashlib
+import logging
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from typing import Iterable, List, Optional, Tuple
+
+INDEX_SUFFIX = '.idx'
+MAGIC = b'CALCIDX1'
+HEADER = struct.Struct('<8sqqqq')  # Magic, history mtime_ns and size, sorted count, unique flag
+MIN_TAIL = 4096  # The tail is merged into the sorted part once it is this long and 1/8 of the sorted part
+
+
+def row_hash(text_row: Tuple[str, ...]) -> int:
+    """Return the 64-bit hash of a row of text, the same in every process."""
+    return int.from_bytes(hashlib.blake2b('\x1f'.join(text_row).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class RowIndex:
+    """The hashes of the rows in one history file, in memory and in ``<path>.idx``."""
+
+    def __init__(self, history_path: str):
+        self.path = history_path + INDEX_SUFFIX
+        self.unique = True  # No row of the history file is repeated
+        self._sorted = array('Q')
+        self._tail = array('Q')
+        self._tail_set = set()
+        self._state: Optional[Tuple[int, int]] = None  # History file state the hashes describe
+        self._known = False  # False until loaded or rebuilt, and after invalidate()
+        self._on_disk = False  # The index file holds exactly the hashes in memory
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._tail)
+
+    def __contains__(self, hash_value: int) -> bool:
+        if hash_value in self._tail_set:
+            return True
+        position = bisect_left(self._sorted, hash_value)
+        return position < len(self._sorted) and self._sorted[position] == hash_value
+
+    def matches(self, state: Optional[Tuple[int, int]]) -> bool:
+        """Return True if the hashes in memory describe the history file in the given state."""
+        return self._known and self._state == state
+
+    def invalidate(self):
+        """Forget the hashes, e.g. after the history file was rewritten; the next use rebuilds them."""
+        self._known = False
+
+    def _reset(self, hashes: array, unique: bool, state: Optional[Tuple[int, int]], sorted_count: int):
+        self._sorted, self._tail = hashes[:sorted_count], hashes[sorted_count:]
+        self._tail_set = set(self._tail)
+        self.unique = unique
+        self._state = state
+        self._known = True
+
+    def load(self, state: Optional[Tuple[int, int]]) -> bool:
+        """Read the index file; returns False if it is missing, damaged or stale for the given file state."""
+        self._known = False
+        if state is None:  # There is no history file, so there are no rows
+            self._reset(array('Q'), True, None, 0)
+            self._on_disk = False
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        if len(data) < HEADER.size or (len(data) - HEADER.size) % 8:
+            return False
+        magic, mtime_ns, size, sorted_count, unique = HEADER.unpack_from(data)
+        hashes = array('Q')
+        hashes.frombytes(data[HEADER.size:])
+        if magic != MAGIC or (mtime_ns, size) != state or sorted_count > len(hashes):
+            return False
+        self._reset(hashes, bool(unique), state, sorted_count)
+        self._on_disk = True
+        return True
+
+    def rebuild(self, text_rows: Iterable[Tuple[str, ...]], state: Optional[Tuple[int, int]]):
+        """Hash every row of the history file and write a new index file."""
+        hashes = array('Q', sorted(map(row_hash, text_rows)))
+        unique = all(hashes[i] != hashes[i + 1] for i in range(len(hashes) - 1))
+        self._reset(hashes, unique, state, len(hashes))
+        self._write()
+        logging.info("Rebuilt the row index %s with %d rows.", self.path, len(hashes))
+
+    def new_rows(self, text_rows: List[Tuple[str, ...]], deduplicate: bool, rows: Optional[list] = None):
+        """Pick the rows to write: all of them, or with deduplicate those not stored yet, each once.
+
+        rows are the values to return for text_rows, which are returned themselves by default.
+        Returns the picked rows, their hashes (for add()) and whether any of them repeats a row.
+        """
+        rows = text_rows if rows is None else rows
+        picked, hashes, seen, repeated = [], array('Q'), set(), False
+        for row, text_row in zip(rows, text_rows):
+            hash_value = row_hash(text_row)
+            if hash_value in seen or hash_value in self:
+                if deduplicate:
+                    continue
+                repeated = True
+            seen.add(hash_value)
+            picked.append(row)
+            hashes.append(hash_value)
+        return picked, hashes, repeated
+
+    def add(self, hashes: array, repeated: bool, state: Optional[Tuple[int, int]]):
+        """Record the hashes of rows just appended to the history file, which is now in the given state."""
+        self.unique = self.unique and not repeated
+        self._tail.extend(hashes)
+        self._tail_set.update(hashes)
+        self._state = state
+        if len(self._tail) >= max(MIN_TAIL, len(self._sorted) // 8):
+            self._sorted = array('Q', sorted(chain(self._sorted, self._tail)))
+            self._tail, self._tail_set = array('Q'), set()
+            self._write()
+        elif not self._on_disk:
+            self._write()
+        else:
+            try:
+                with open(self.path, 'r+b') as f:
+                    f.seek(0, os.SEEK_END)
+                    f.write(hashes.tobytes())
+                    f.seek(0)
+                    f.write(self._header())  # Last, so a crash before it leaves the index stale rather than wrong
+            except FileNotFoundError:  # Removed by someone else; the hashes in memory are still right
+                self._write()
+
+    def delete(self):
+        """Remove the index file along with the history file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._known = self._on_disk = False
+
+    def _header(self) -> bytes:
+        mtime_ns, size = self._state or (0, 0)
+        return HEADER.pack(MAGIC, mtime_ns, size, len(self._sorted), int(self.unique))
+
+    def _write(self):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self._header())
+            f.write(self._sorted.tobytes())
+            f.write(self._tail.tobytes())
+        os.replace(temp_path, self.path)
+        self._on_disk = True
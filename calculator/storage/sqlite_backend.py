@@ -0,0 +1,139 @@
+"""SQLite history databases.
+
+Values are stored as the same text the CSV backend writes, so nothing is rounded. Each row
+also keeps its result as a REAL, which with the operation is indexed for filtered queries.
+The database runs in WAL mode, so readers are not blocked while a save is in progress.
+An index over whole rows lets deduplicating saves check each new row inside the insert,
+under the write lock, so concurrent writers never store the same row twice. A flag in
+history_meta records whether any row is repeated; while none is, a deduplicating rewrite
+only inserts the new rows instead of deduplicating the whole table.
+"""
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from fractions import Fraction
+from itertools import islice
+from typing import Optional
+from calculator.history_store import HistoryStore
+from calculator.storage import HistoryBackend, extend_from_text
+
+INSERT_BATCH = 10_000  # Rows per executemany call; a whole save is still one transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    a TEXT NOT NULL,
+    b TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    result TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    result_value REAL
+);
+CREATE INDEX IF NOT EXISTS history_operation ON history (operation, result_value);
+CREATE INDEX IF NOT EXISTS history_result ON history (result_value);
+CREATE INDEX IF NOT EXISTS history_row ON history (a, b, operation, result, backend);
+CREATE TABLE IF NOT EXISTS history_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+COLUMNS = "a, b, operation, result, backend"
+INSERT = f"INSERT INTO history ({COLUMNS}, result_value) VALUES (?, ?, ?, ?, ?, ?)"
+# Skips rows already stored, including ones inserted earlier in the same save
+INSERT_NEW = (f"INSERT INTO history ({COLUMNS}, result_value) SELECT ?, ?, ?, ?, ?, ? WHERE NOT EXISTS "
+              f"(SELECT 1 FROM history WHERE a = ? AND b = ? AND operation = ? AND result = ? AND backend = ?)")
+# Whether a row with an id above the parameter repeats another row
+REPEATS_SINCE = ("SELECT EXISTS (SELECT 1 FROM history AS new WHERE new.id > ? AND EXISTS "
+                 "(SELECT 1 FROM history AS old WHERE old.a = new.a AND old.b = new.b AND old.operation = new.operation"
+                 " AND old.result = new.result AND old.backend = new.backend AND old.id <> new.id))")
+
+
+def _numeric(text: str) -> Optional[float]:
+    """Return a result's text as a float for range queries (None if it has no float value)."""
+    try:
+        return float(text)
+    except ValueError:
+        try:
+            return float(Fraction(text))  # Results of the fraction backend, e.g. '1/3'
+        except (ValueError, OverflowError, ZeroDivisionError):
+            return None
+
+
+class SqliteHistoryBackend(HistoryBackend):
+    name = 'SQLite'
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, which is enough in WAL mode
+        connection.executescript(SCHEMA)
+        return connection
+
+    def save(self, history: HistoryStore, start: int, append: bool, deduplicate: bool, stored: int = 0):
+        rows = history.text_rows(max(start, stored) if deduplicate else start)
+        inserted = 0
+        with self.locked(), closing(self._connect()) as connection, connection:
+            unique = self._unique(connection)
+            last_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+            while True:
+                if deduplicate:
+                    batch = [row + (_numeric(row[3]),) + row for row in islice(rows, INSERT_BATCH)]
+                else:
+                    batch = [row + (_numeric(row[3]),) for row in islice(rows, INSERT_BATCH)]
+                if not batch:
+                    break
+                inserted += connection.executemany(INSERT_NEW if deduplicate else INSERT, batch).rowcount
+            if not deduplicate and unique and inserted:
+                unique = not connection.execute(REPEATS_SINCE, (last_id,)).fetchone()[0]
+            if deduplicate and not append and not unique:
+                # Keep the first copy of every row, like the CSV rewrite does
+                connection.execute(f"DELETE FROM history WHERE id NOT IN "
+                                   f"(SELECT MIN(id) FROM history GROUP BY {COLUMNS})")
+                unique = True
+            connection.execute("INSERT OR REPLACE INTO history_meta (key, value) VALUES ('unique', ?)", (int(unique),))
+        logging.info("Saved %d history entries to SQLite database.", inserted)
+
+    @staticmethod
+    def _unique(connection: sqlite3.Connection) -> bool:
+        """Return True if no stored row is repeated; a non-empty database without the flag may have repeats."""
+        row = connection.execute("SELECT value FROM history_meta WHERE key = 'unique'").fetchone()
+        if row is None:
+            return not connection.execute("SELECT EXISTS (SELECT 1 FROM history)").fetchone()[0]
+        return bool(row[0])
+
+    def _read(self, sql: str, parameters, batch_size: int) -> HistoryStore:
+        history = HistoryStore()
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(sql, parameters)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                extend_from_text(history, *map(list, zip(*rows)))
+        return history
+
+    def load(self, batch_size: int) -> HistoryStore:
+        with self.locked(exclusive=False):
+            history = self._read(f"SELECT {COLUMNS} FROM history ORDER BY id", (), batch_size)
+        logging.info("Loaded history from SQLite database.")
+        return history
+
+    def query(self, operation: Optional[str] = None, min_result=None, max_result=None,
+              batch_size: int = 100_000) -> HistoryStore:
+        """Return matching entries using the indexes; result bounds are compared as floats."""
+        conditions, parameters = [], []
+        for condition, value in (("operation = ?", operation), ("result_value >= ?", min_result),
+                                 ("result_value <= ?", max_result)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value if condition.startswith('operation') else float(value))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._read(f"SELECT {COLUMNS} FROM history{where} ORDER BY id", parameters, batch_size)
+
+    def delete(self) -> bool:
+        with self.locked():
+            if not os.path.exists(self.path):
+                return False
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+        logging.info("Deleted history SQLite database.")
+        return True
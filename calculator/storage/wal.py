@@ -0,0 +1,112 @@
+"""Write-ahead log of history entries that have not been saved yet.
+
+Entries are appended to ``<history file>.wal`` as lines of text (a, b, operation, result,
+backend) and made durable with group commit: lines are collected in memory and written and
+fsynced together, at most every ``sync_interval`` seconds or once ``sync_entries`` are
+waiting. A crash therefore loses at most one window of entries. The log is emptied
+whenever the history is saved, and on startup any entries left in it are recovered into
+the history file.
+
+One process owns a log at a time; it holds an exclusive lock on the log file while it has
+the log open.
+"""
+import logging
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+from calculator.storage import HISTORY_COLUMNS, fcntl
+
+WAL_SUFFIX = '.wal'
+
+
+class WriteAheadLog:
+    """An append-only log file with batched fsync."""
+
+    def __init__(self, path: str, sync_entries: int = 1000, sync_interval: float = 0.05):
+        if sync_entries <= 0 or sync_interval <= 0:
+            raise ValueError("The write-ahead log needs a positive batch size and interval.")
+        self.path = path
+        self.sync_entries = sync_entries
+        self.sync_interval = sync_interval
+        self.entries = 0  # Lines written to the file since it was last emptied
+        self.commits = 0
+        self._pending: List[str] = []
+        self._pending_lock = threading.Lock()  # Guards _pending; held only to add or take lines
+        self._commit_lock = threading.Lock()  # Serialises writes, fsyncs and truncation
+        self._file = None
+
+    def open(self) -> bool:
+        """Open and lock the log file; returns False if another process has it open."""
+        f = open(self.path, 'ab+')  # pylint: disable=consider-using-with
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+        self._file = f
+        return True
+
+    def close(self):
+        """Commit what is pending, then close the file (which releases the lock)."""
+        if self._file is not None:
+            self.commit()
+            self._file.close()
+            self._file = None
+
+    def append(self, text_rows: Iterable[Tuple[str, ...]]) -> int:
+        """Queue rows for the next commit; returns how many are waiting."""
+        lines = [','.join(row) + '\n' for row in text_rows]
+        with self._pending_lock:
+            self._pending.extend(lines)
+            return len(self._pending)
+
+    def commit(self):
+        """Write every queued line with one write and one fsync."""
+        with self._commit_lock:
+            with self._pending_lock:
+                lines, self._pending = self._pending, []
+            if not lines or self._file is None:
+                return
+            self._file.write(''.join(lines).encode('utf-8'))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries += len(lines)
+            self.commits += 1
+
+    def truncate(self):
+        """Empty the log, e.g. once every entry in it has been saved to the history file."""
+        with self._commit_lock:
+            with self._pending_lock:
+                self._pending = []
+            if self._file is not None:
+                self._file.truncate(0)
+                os.fsync(self._file.fileno())
+            self.entries = 0
+
+    def read(self) -> List[Tuple[str, ...]]:
+        """Return the rows in the log file, skipping a last line cut short by a crash."""
+        if self._file is None:
+            return []
+        with self._commit_lock:
+            self._file.seek(0)
+            data = self._file.read().decode('utf-8', errors='replace')
+        lines = data.split('\n')[:-1]  # The text after the last newline was never fully written
+        rows = [tuple(line.split(',')) for line in lines]
+        valid = [row for row in rows if len(row) == len(HISTORY_COLUMNS)]
+        if len(valid) != len(rows):
+            logging.warning("Skipped %d damaged lines in the write-ahead log.", len(rows) - len(valid))
+        return valid
+
+
+def wal_path(history_path: str) -> str:
+    return history_path + WAL_SUFFIX
+
+
+def open_wal(history_path: str, sync_entries: int, sync_interval: float) -> Optional[WriteAheadLog]:
+    """Open the log for a history file, or return None if another process is using it."""
+    wal = WriteAheadLog(wal_path(history_path), sync_entries, sync_interval)
+    if not wal.open():
+        logging.warning("Write-ahead log %s is in use by another process; running without it.", wal.path)
+        return None
+    return wal
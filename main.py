@@ -1,5 +1,43 @@
+import argparse
+import sys
 from calculator.repl import CalculatorREPL
 
-if __name__ == '__main__':
+def parse_address(address: str):
+    """Turn 'HOST:PORT', 'PORT' or 'unix:PATH' into keyword arguments for serve()."""
+    from calculator.server import DEFAULT_HOST  # pylint: disable=import-outside-toplevel
+    if address.startswith('unix:'):
+        return {'path': address[len('unix:'):]}
+    host, _, port = address.rpartition(':')
+    return {'host': host or DEFAULT_HOST, 'port': int(port)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Advanced Python Calculator")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="run the commands in FILE ('-' for stdin) instead of starting the interactive prompt")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="with --batch FILE, split the file across N worker processes")
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help="serve commands over the network on HOST:PORT, PORT or unix:PATH")
+    args = parser.parse_args(argv)
+
     repl = CalculatorREPL()
-    repl.start()
+    # The server and worker pool are imported only when asked for, to keep the prompt quick to start
+    if args.serve is not None:
+        from calculator.server import serve  # pylint: disable=import-outside-toplevel
+        serve(repl.command_handler, **parse_address(args.serve))
+        return 0
+    if args.batch is None:
+        repl.start()
+        return 0
+    if args.batch == '-':
+        _, failed = repl.run_batch(sys.stdin)
+    elif args.workers > 1:
+        from calculator.parallel import run_parallel  # pylint: disable=import-outside-toplevel
+        _, failed = run_parallel(args.batch, workers=args.workers)
+    else:
+        with open(args.batch, encoding='utf-8') as f:
+            _, failed = repl.run_batch(f)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Tests for saving history in the background."""
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from calculator.calculation import Calculation
+from calculator.calculations import HistorySession
+from calculator.operations import add
+
+# pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def session(tmp_path):
+    """Fixture for a session with its own history file; autosave is stopped afterwards."""
+    session = HistorySession(file_path=str(tmp_path / 'history.csv'))
+    yield session
+    session.disable_autosave()
+
+def _add(session: HistorySession, count: int, start: int = 0):
+    for i in range(start, start + count):
+        session.add_calculation(Calculation(Decimal(i), Decimal(1), add))
+
+def _saved(session: HistorySession):
+    storage = session.storage()
+    return [int(row[0]) for row in storage.load(1_000).rows()] if storage.exists() else []
+
+def _wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+def test_autosave_on_timer(session):
+    """Test that unsaved entries are appended once the interval passes."""
+    session.enable_autosave(interval=0.02, dirty_entries=1_000_000)
+    _add(session, 5)
+    assert _wait_for(lambda: session.saved_count == 5)
+    assert _saved(session) == [0, 1, 2, 3, 4]
+
+def test_autosave_coalesces_entries(session):
+    """Test that reaching the threshold wakes the thread, and each save writes many entries."""
+    session.enable_autosave(interval=60, dirty_entries=100)
+    _add(session, 1_000)
+    assert _wait_for(lambda: session.saved_count >= 900)
+    assert session.autosaves < 100
+    session.disable_autosave()
+    assert not session.autosaving
+    assert _saved(session) == list(range(1_000))  # Each entry written once, in order
+
+@pytest.mark.parametrize('save_mode, copies', [('rewrite', 1), ('append', 3)])
+def test_autosave_follows_save_mode(session, save_mode, copies):
+    """Test that autosave drops rows already stored in rewrite mode and keeps them in append mode."""
+    session.save_mode = save_mode
+    _add(session, 1)
+    session.save_history()
+    session.enable_autosave(interval=60)
+    _add(session, 1)
+    _add(session, 1)
+    session.disable_autosave()
+    assert _saved(session) == [0] * copies
+
+def test_invalid_autosave_settings(session):
+    """Test that the interval and threshold must be positive."""
+    with pytest.raises(ValueError):
+        session.enable_autosave(interval=0)
+
+@pytest.mark.parametrize('action', ['clear_history', 'delete_history'])
+def test_clear_or_delete_during_save(session, action):
+    """Test that a clear or delete waits for a save in progress and the save does not undo it."""
+    _add(session, 3)
+    session.save_history(append=True)
+    storage = session.storage()
+    save, saving = storage.save, threading.Event()
+
+    def slow_save(*args):
+        saving.set()
+        time.sleep(0.1)
+        save(*args)
+
+    with patch.object(storage, 'save', side_effect=slow_save):
+        session.enable_autosave(interval=0.01)
+        _add(session, 2, start=3)
+        assert saving.wait(5)
+        getattr(session, action)()
+        assert not session.history and session.saved_count == 0
+    session.disable_autosave()
+    if action == 'delete_history':
+        assert not storage.exists()
+    else:
+        assert _saved(session) == [0, 1, 2, 3, 4]
+    _add(session, 1, start=10)
+    session.enable_autosave(interval=0.01)
+    assert _wait_for(lambda: session.saved_count == 1)
+    assert _saved(session) == ([10] if action == 'delete_history' else [0, 1, 2, 3, 4, 10])
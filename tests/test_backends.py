@@ -0,0 +1,71 @@
+"""Tests for the selectable numeric backends."""
+from decimal import Decimal
+from fractions import Fraction
+import pytest
+from calculator import Calculator
+from calculator.backends import DecimalBackend, backend_from_settings, get_backend
+from calculator.calculations import Calculations
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture
+def history_file(tmp_path, monkeypatch):
+    """Fixture that points the history at a temporary file and starts with an empty history."""
+    monkeypatch.setattr(Calculations, 'file_path', str(tmp_path / 'history.csv'))
+    Calculations.clear_history()
+    yield tmp_path / 'history.csv'
+    Calculations.clear_history()
+
+def test_get_backend():
+    """Test looking backends up by name."""
+    assert get_backend('float').name == 'float'
+    assert get_backend('Fraction').name == 'fraction'
+    assert get_backend('decimal').precision is None
+    assert get_backend('decimal:50').precision == 50
+    for name in ('double', 'decimal:x', 'decimal:0', 'float:3'):
+        with pytest.raises(ValueError):
+            get_backend(name)
+
+def test_backend_from_settings():
+    """Test choosing the backend from the environment settings."""
+    assert backend_from_settings({}).name == 'decimal'
+    assert backend_from_settings({'NUMERIC_BACKEND': 'float'}).name == 'float'
+    assert backend_from_settings({'NUMERIC_BACKEND': 'decimal', 'DECIMAL_PRECISION': '6'}).name == 'decimal:6'
+
+def test_per_call_backend(history_file):
+    """Test that each backend computes in its own number type and is recorded in the history."""
+    assert Calculator.divide(1, 3, backend='float') == 1 / 3
+    assert Calculator.divide(1, 3, backend='fraction') == Fraction(1, 3)
+    assert Calculator.divide(1, 3, backend='decimal:5') == Decimal('0.33333')
+    assert Calculator.divide(Decimal('0.1'), 3, backend=DecimalBackend()) == Decimal('0.1') / 3
+    assert [calc.backend for calc in Calculations.get_history()] == ['float', 'fraction', 'decimal:5', 'decimal']
+    with pytest.raises(ValueError):
+        Calculator.divide(1, 0, backend='fraction')
+    assert len(Calculations.get_history()) == 4
+
+def test_default_backend(history_file, monkeypatch):
+    """Test that calls without a backend use Calculator.backend."""
+    monkeypatch.setattr(Calculator, 'backend', get_backend('float'))
+    assert isinstance(Calculator.add(Decimal('0.1'), Decimal('0.2')), float)
+    assert Calculations.get_latest().backend == 'float'
+
+def test_save_and_load_backends(history_file):
+    """Test that saved values are loaded back in the number type of their backend."""
+    Calculator.divide(1, 3, backend='fraction')
+    Calculator.multiply(0.1, 3, backend='float')
+    Calculator.add(1, 2)
+    Calculations.save_history()
+    Calculations.load_history()
+    history = Calculations.get_history()
+    assert [calc.perform() for calc in history] == [Fraction(1, 3), 0.1 * 3, Decimal(3)]
+    assert [calc.backend for calc in history] == ['fraction', 'float', 'decimal']
+
+def test_file_without_backend_column(history_file):
+    """Test that history files written before backends were recorded still load and are upgraded."""
+    history_file.write_text("a,b,operation,result\n1,2,add,3\n", encoding='utf-8')
+    Calculations.load_history()
+    assert Calculations.get_latest().backend == 'decimal'
+    Calculator.add(1, 1, backend='float')
+    Calculations.save_history(append=True)
+    assert history_file.read_text(encoding='utf-8').splitlines() == [
+        'a,b,operation,result,backend', '1,2,add,3,decimal', '1.0,1.0,add,2.0,float']
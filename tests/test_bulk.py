@@ -0,0 +1,60 @@
+"""Tests for bulk arithmetic on Calculator."""
+from decimal import Decimal
+import pytest
+from calculator import Calculator
+from calculator.calculations import Calculations
+
+np = pytest.importorskip('numpy')
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture
+def clean_history():
+    """Fixture that starts and ends with an empty history."""
+    Calculations.clear_history()
+    yield
+    Calculations.clear_history()
+
+def test_float_operations(clean_history):
+    """Test that each bulk operation matches NumPy and records every element."""
+    a = np.array([1.0, 2.5, -3.0])
+    b = [4, 0.5, 2]
+    assert Calculator.add_many(a, b).results.tolist() == [5.0, 3.0, -1.0]
+    assert Calculator.subtract_many(a, b).results.tolist() == [-3.0, 2.0, -5.0]
+    assert Calculator.multiply_many(a, b).results.tolist() == [4.0, 1.25, -6.0]
+    assert Calculator.divide_many(a, b).results.tolist() == [0.25, 5.0, -1.5]
+    assert len(Calculations.get_history()) == 12
+    assert Calculations.get_latest().perform() == -1.5
+    assert Calculations.count_by_operation('multiply') == 3
+
+def test_float_divide_by_zero(clean_history):
+    """Test that division by zero is reported per element and those elements are not recorded."""
+    result = Calculator.divide_many([1, 0, 3, 4], [2, 0, 0, 8])
+    assert result.errors == {1: "Cannot divide by zero", 2: "Cannot divide by zero"}
+    assert np.isnan(result.results[1]) and np.isnan(result.results[2])
+    assert [calc.perform() for calc in Calculations.get_history()] == [0.5, 0.5]
+
+def test_exact_mode(clean_history):
+    """Test that exact mode gives Decimal results with per-element errors."""
+    result = Calculator.divide_many([Decimal('1'), '2', 0.1], [3, 0, Decimal('0.2')], exact=True)
+    assert result.results == [Decimal(1) / Decimal(3), None, Decimal('0.5')]
+    assert result.errors == {1: "Cannot divide by zero"}
+    assert Calculations.get_history()[1].a == Decimal('0.1')
+    assert Calculator.add_many(np.array([1, 2]), np.array([3, 4]), exact=True).results == [Decimal(4), Decimal(6)]
+    assert len(Calculations.get_history()) == 4
+
+def test_length_mismatch(clean_history):
+    """Test that operand sequences of different lengths are rejected."""
+    with pytest.raises(ValueError):
+        Calculator.add_many([1, 2], [1])
+    with pytest.raises(ValueError):
+        Calculator.add_many([1, 2], [1], exact=True)
+    assert not Calculations.get_history()
+
+def test_saved_float_history(clean_history, tmp_path, monkeypatch):
+    """Test that bulk float results are saved and loaded back as Decimals."""
+    monkeypatch.setattr(Calculations, 'file_path', str(tmp_path / 'history.csv'))
+    Calculator.multiply_many([0.5, 2], [3, 0.25])
+    Calculations.save_history()
+    Calculations.load_history()
+    assert [calc.perform() for calc in Calculations.get_history()] == [Decimal('1.5'), Decimal('0.5')]
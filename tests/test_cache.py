@@ -0,0 +1,122 @@
+"""Tests for the result cache."""
+import threading
+from collections import OrderedDict
+from decimal import Decimal, localcontext
+import pytest
+from calculator import Calculator
+from calculator.cache import MISSING, ResultCache
+from calculator.calculations import Calculations
+from calculator.plugins.cache import CacheStatsCommand
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Fixture that enables a small result cache on an empty history."""
+    result_cache = ResultCache(2)
+    monkeypatch.setattr(Calculator, 'cache', result_cache)
+    Calculations.clear_history()
+    yield result_cache
+    Calculations.clear_history()
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    result_cache = ResultCache(2)
+    result_cache.put('a', 1)
+    result_cache.put('b', 2)
+    assert result_cache.get('a') == 1
+    result_cache.put('c', 3)
+    assert result_cache.get('b') is MISSING
+    assert result_cache.get('a') == 1 and result_cache.get('c') == 3
+    assert result_cache.stats() == {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2, 'hit_rate': 0.75}
+    with pytest.raises(ValueError):
+        ResultCache(0)
+
+def test_calculator_uses_cache(cache):
+    """Test that repeated operations hit the cache and are still all recorded."""
+    assert Calculator.divide(Decimal('1'), Decimal('3')) == Decimal(1) / Decimal(3)
+    assert Calculator.divide(Decimal('1'), Decimal('3')) == Decimal(1) / Decimal(3)
+    assert Calculator.add(Decimal('1'), Decimal('3')) == Decimal(4)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert [calc.perform() for calc in Calculations.get_history()] == [Decimal(1) / 3, Decimal(1) / 3, 4]
+
+def test_cache_keeps_representation_and_context(cache):
+    """Test that equal operands written differently, or another precision, are not mixed up."""
+    assert str(Calculator.add(Decimal('1.0'), Decimal('2'))) == '3.0'
+    assert str(Calculator.add(Decimal('1'), Decimal('2'))) == '3'
+    with localcontext() as context:
+        context.prec = 5
+        assert str(Calculator.divide(Decimal('1'), Decimal('3'))) == '0.33333'
+    assert Calculator.divide(Decimal('1'), Decimal('3')) == Decimal(1) / Decimal(3)
+    assert cache.hits == 0
+
+def test_divide_by_zero_not_cached(cache):
+    """Test that division by zero raises every time and is not recorded."""
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Cannot divide by zero"):
+            Calculator.divide(Decimal('1'), Decimal('0'))
+    assert len(cache) == 0
+    assert not Calculations.get_history()
+
+class _PausingEntries(OrderedDict):
+    """Entries whose lookups in one thread pause, so another thread can run between lookup and update."""
+    reader = None
+
+    def __init__(self):
+        super().__init__()
+        self.paused, self.resume = threading.Event(), threading.Event()
+
+    def get(self, key, default=None):
+        result = super().get(key, default)
+        if threading.current_thread() is self.reader:
+            self.paused.set()
+            self.resume.wait(0.1)
+        return result
+
+def test_cache_shared_by_threads():
+    """Test that a lookup does not fail when another thread evicts the entry in the middle of it."""
+    result_cache = ResultCache(1)
+    entries = result_cache._entries = _PausingEntries()  # pylint: disable=protected-access
+    result_cache.put('a', 1)
+    errors = []
+
+    def reader():
+        try:
+            assert result_cache.get('a') == 1
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(e)
+
+    thread = entries.reader = threading.Thread(target=reader)
+    thread.start()
+    assert entries.paused.wait(5)
+    result_cache.put('b', 2)  # Evicts 'a', unless the lookup holds the cache
+    entries.resume.set()
+    thread.join()
+    assert not errors
+    assert list(entries) == ['b'] and result_cache.hits == 1
+
+def test_cache_stats_command(cache, capsys):
+    """Test the Cachestats command output and reset."""
+    Calculator.add(Decimal('1'), Decimal('2'))
+    Calculator.add(Decimal('1'), Decimal('2'))
+    CacheStatsCommand().execute()
+    assert capsys.readouterr().out == "Hits: 1, misses: 1, hit rate: 50.0%\nEntries: 1 of 2\n"
+    CacheStatsCommand().execute('reset')
+    assert cache.stats()['hits'] == 0 and len(cache) == 0
+
+def test_cache_stats_command_disabled(monkeypatch, capsys):
+    """Test the Cachestats command when no cache is configured."""
+    monkeypatch.setattr(Calculator, 'cache', None)
+    CacheStatsCommand().execute()
+    assert "disabled" in capsys.readouterr().out
+
+def test_repl_configures_cache(monkeypatch):
+    """Test that RESULT_CACHE_SIZE enables the cache and bad values leave it off."""
+    from calculator.repl import CalculatorREPL  # pylint: disable=import-outside-toplevel
+    monkeypatch.setattr(Calculator, 'cache', None)
+    monkeypatch.setenv('RESULT_CACHE_SIZE', '128')
+    CalculatorREPL()
+    assert Calculator.cache.maxsize == 128
+    monkeypatch.setenv('RESULT_CACHE_SIZE', 'lots')
+    CalculatorREPL()
+    assert Calculator.cache is None
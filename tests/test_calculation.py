@@ -40,3 +40,38 @@ def test_divide_by_zero():
     calc = Calculation(Decimal('10'), Decimal('0'), divide)
     with pytest.raises(ValueError, match="Cannot divide by zero"):
         calc.perform()
+
+def test_perform_caches_result():
+    """
+    Test that the operation runs only once however often perform() is called.
+    """
+    calls = []
+    def counting_add(a, b):
+        calls.append((a, b))
+        return a + b
+    calc = Calculation(Decimal('1'), Decimal('2'), counting_add)
+    assert calc.perform() == Decimal('3')
+    assert calc.perform() == Decimal('3')
+    assert len(calls) == 1
+
+def test_known_result_is_not_recomputed():
+    """
+    Test that a result passed to the constructor is returned without running the operation.
+    """
+    calc = Calculation(Decimal('10'), Decimal('0'), divide, Decimal('7'))
+    assert calc.perform() == Decimal('7')
+
+def test_create_takes_constructor_arguments():
+    """
+    Test that create takes the result before the backend, in the same order as the constructor.
+    """
+    calc = Calculation.create(Decimal('10'), Decimal('0'), divide, Decimal('7'))
+    assert calc.perform() == Decimal('7') and calc.backend == Calculation(1, 2, add).backend
+    assert Calculation.create(Decimal('1'), Decimal('2'), add, None, 'float').backend == 'float'
+
+def test_calculation_has_slots():
+    """
+    Test that Calculation instances do not carry a per-instance __dict__.
+    """
+    calc = Calculation(Decimal('10'), Decimal('5'), add)
+    assert not hasattr(calc, '__dict__')
@@ -1,9 +1,11 @@
 """Test for calculations"""
 from decimal import Decimal
+import io
 import os
 import pytest
 from calculator.calculations import Calculations
 from calculator.calculation import Calculation
+from calculator.history_store import HistoryStore
 from calculator.operations import add, subtract
  # pylint: disable=redefined-outer-name, unused-argument
 @pytest.fixture
@@ -81,3 +83,104 @@ def test_load_history_no_file(setup_calculations):
     """Test loading history when no file exists."""
     Calculations.load_history()
     assert len(Calculations.get_history()) == 0
+
+def test_append_save_writes_only_new_entries(setup_calculations):
+    """Test that append mode only writes entries added since the last save."""
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.save_history(append=True)
+    Calculations.add_calculation(Calculation(Decimal('20'), Decimal('3'), subtract))
+    Calculations.save_history(append=True)
+    Calculations.save_history(append=True)
+    with open(Calculations.file_path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines == ['a,b,operation,result,backend', '10,5,add,15,decimal', '20,3,subtract,17,decimal']
+
+def test_append_save_after_load_skips_loaded_entries(setup_calculations):
+    """Test that entries loaded from the file are not appended again."""
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.save_history(append=True)
+    Calculations.load_history()
+    Calculations.add_calculation(Calculation(Decimal('1'), Decimal('2'), add))
+    Calculations.save_history(append=True)
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 2
+
+def test_append_save_deduplicate(setup_calculations):
+    """Test that optional deduplication drops rows already present in the file."""
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.save_history(append=True)
+    Calculations.clear_history()
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.save_history(append=True, deduplicate=True)
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 1
+
+def test_append_save_without_deduplicate_keeps_repeats(setup_calculations):
+    """Test that append mode keeps repeated rows unless deduplication is requested."""
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.save_history(append=True)
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 2
+
+def test_load_history_in_batches(setup_calculations, monkeypatch):
+    """Test that loading in several chunks keeps rows in order and parses operands exactly."""
+    monkeypatch.setattr(Calculations, 'load_batch_size', 2)
+    with open(Calculations.file_path, 'w', encoding='utf-8') as f:
+        f.write("a,b,operation,result\n0.1,2,add,2.1\n5,0.2,divide,25\n3,4,multiply,12\n")
+    Calculations.load_history()
+    history = Calculations.get_history()
+    assert [calc.operation.__name__ for calc in history] == ['add', 'divide', 'multiply']
+    assert history[0].a == Decimal('0.1')
+    assert history[1].perform() == Decimal('25')
+
+def test_load_history_unknown_operation(setup_calculations):
+    """Test that an unknown operation name leaves the history empty."""
+    with open(Calculations.file_path, 'w', encoding='utf-8') as f:
+        f.write("a,b,operation,result\n1,2,power,1\n")
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 0
+
+def test_find_and_count_by_operation(setup_calculations):
+    """Test that lookups by operation stay consistent across adds, clears and loads."""
+    Calculations.add_calculation(Calculation(Decimal('10'), Decimal('5'), add))
+    Calculations.add_calculation(Calculation(Decimal('20'), Decimal('3'), subtract))
+    Calculations.add_calculation(Calculation(Decimal('1'), Decimal('1'), add))
+    assert Calculations.count_by_operation('add') == 2
+    assert Calculations.find_by_operation('subtract') == [Calculation(Decimal('20'), Decimal('3'), subtract)]
+    Calculations.save_history()
+    Calculations.clear_history()
+    assert Calculations.count_by_operation('add') == 0
+    Calculations.load_history()
+    assert Calculations.count_by_operation('add') == 2
+    assert [calc.a for calc in Calculations.find_by_operation('add')] == [Decimal('10'), Decimal('1')]
+
+def test_print_history_pages(setup_calculations, capsys, monkeypatch):
+    """Test offset, limit and tail, in normal and streaming mode, across chunk boundaries."""
+    monkeypatch.setattr(Calculations, 'print_chunk_size', 3)
+    for i in range(10):
+        Calculations.add_calculation(Calculation(Decimal(i), Decimal('1'), add))
+    for stream in (False, True):
+        Calculations.print_history(offset=2, limit=5, stream=stream)
+        assert capsys.readouterr().out == ''.join(f"Calculation({i}, 1, add)\n" for i in range(2, 7))
+        Calculations.print_history(tail=4, stream=stream)
+        assert capsys.readouterr().out == ''.join(f"Calculation({i}, 1, add)\n" for i in range(6, 10))
+        Calculations.print_history(offset=8, limit=5, stream=stream)
+        assert capsys.readouterr().out == "Calculation(8, 1, add)\nCalculation(9, 1, add)\n"
+        Calculations.print_history(tail=20, limit=1, stream=stream)
+        assert capsys.readouterr().out == "Calculation(0, 1, add)\n"
+    with pytest.raises(ValueError):
+        Calculations.print_history(tail=-1)
+
+def test_print_history_tail_reads_only_tail(setup_calculations, monkeypatch):
+    """Test that printing the tail only reads the entries it prints."""
+    for i in range(100):
+        Calculations.add_calculation(Calculation(Decimal(i), Decimal('1'), add))
+    read = []
+    original = HistoryStore._calculation  # pylint: disable=protected-access
+    monkeypatch.setattr(HistoryStore, '_calculation', lambda self, index: read.append(index) or original(self, index))
+    output = io.StringIO()
+    Calculations.print_history(tail=2, stream=True, output=output)
+    assert read == [98, 99]
+    assert output.getvalue() == "Calculation(98, 1, add)\nCalculation(99, 1, add)\n"
@@ -1,5 +1,13 @@
 '''My Calculator Test'''
+import os
+import subprocess
+import sys
+from decimal import Decimal
+import pytest
 from calculator import Calculator
+from calculator.calculations import Calculations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 def test_addition():
     '''Test that addition function works '''    
@@ -16,3 +24,27 @@ def test_divide():
 def test_multiply():
     '''Test that multiply function works '''    
     assert Calculator.multiply(2,2) == 4
+
+def test_failed_operation_not_recorded():
+    '''Test that a division by zero is not added to the history'''
+    Calculations.clear_history()
+    with pytest.raises(ValueError, match="Cannot divide by zero"):
+        Calculator.divide(Decimal('1'), Decimal('0'))
+    assert Calculations.get_latest() is None
+
+def _imported_modules(code):
+    '''Return the modules reported by python -X importtime while running code'''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            check=True, capture_output=True, text=True)
+    return {line.rsplit('|', 1)[1].strip() for line in result.stderr.splitlines()
+            if line.startswith('import time:') and line.count('|') == 2} - {'imported package'}
+
+def test_arithmetic_imports_only_standard_library():
+    '''Test that the arithmetic path does not import pandas or any other third-party package'''
+    baseline = _imported_modules('pass')
+    modules = _imported_modules('from calculator import Calculator; Calculator.add(1, 2)') - baseline
+    allowed = set(sys.stdlib_module_names) | {'calculator'}
+    third_party = {name for name in modules
+                   if name.split('.')[0] not in allowed and not name.startswith('_sysconfigdata')}
+    assert not third_party, f"Arithmetic imported {sorted(third_party)}"
+    assert 'pandas' not in modules
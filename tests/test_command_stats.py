@@ -0,0 +1,104 @@
+"""Tests for command timing and the Stats command."""
+import json
+import pytest
+from calculator.command_stats import LATENCY_BUCKETS, UNKNOWN_COMMAND, CommandStats, CommandTimings
+from calculator.commands import Command, CommandHandler
+from calculator.plugins.stats import StatsCommand
+
+# pylint: disable=redefined-outer-name
+
+class EchoCommand(Command):
+    """Command that returns its arguments, or fails when asked to."""
+    def execute(self, *args):
+        if 'fail' in args:
+            raise ValueError("Failed.")
+        return args
+
+@pytest.fixture
+def handler():
+    """Fixture for a handler with timing enabled and an Echo and a Stats command."""
+    command_handler = CommandHandler()
+    command_handler.register_command('Echo', EchoCommand())
+    command_handler.register_command('Stats', StatsCommand(command_handler))
+    command_handler.stats = CommandStats()
+    return command_handler
+
+def test_timing_disabled_by_default():
+    """Test that a new handler records nothing."""
+    command_handler = CommandHandler()
+    command_handler.register_command('Echo', EchoCommand())
+    assert command_handler.execute_command('Echo 1') == ('1',)
+    assert command_handler.stats is None
+
+def test_counts_and_errors(handler):
+    """Test that calls and errors are counted per command, and unknown commands under one name."""
+    assert handler.execute_command('Echo 1 2') == ('1', '2')
+    handler.execute_command('Echo')
+    with pytest.raises(ValueError, match="Failed"):
+        handler.execute_command('Echo fail')
+    for user_input in ('Nope 1', '   '):
+        with pytest.raises(ValueError):
+            handler.execute_command(user_input)
+    summary = handler.stats.summary()
+    assert (summary['Echo']['count'], summary['Echo']['errors']) == (3, 1)
+    assert (summary[UNKNOWN_COMMAND]['count'], summary[UNKNOWN_COMMAND]['errors']) == (2, 2)
+    assert sum(summary['Echo']['histogram'].values()) == 3
+
+def test_histogram_percentiles():
+    """Test that latencies land in the right buckets and percentiles come from them."""
+    timings = CommandTimings()
+    for seconds in [0.000005] * 98 + [0.003, 100.0]:
+        timings.add(seconds, False)
+    summary = timings.summary()
+    assert summary['histogram'] == {'<= 1e-05s': 98, '<= 0.005s': 1, f'> {LATENCY_BUCKETS[-1]:g}s': 1}
+    assert summary['p50_seconds'] == 1e-05
+    assert summary['p99_seconds'] == 0.005
+    assert summary['max_seconds'] == 100.0
+
+def test_profile_capture(handler, tmp_path):
+    """Test that profiling covers exactly the requested number of commands."""
+    path = tmp_path / 'commands.prof'
+    handler.stats.start_profile(2, str(path))
+    handler.execute_command('Echo 1')
+    assert handler.stats.profile_remaining == 1 and handler.stats.profile_report is None
+    handler.execute_command('Echo 2')
+    assert handler.stats.profile_remaining == 0
+    assert 'function calls' in handler.stats.profile_report
+    assert path.exists()
+    with pytest.raises(ValueError):
+        handler.stats.start_profile(0)
+
+def test_stats_command(handler, capsys, tmp_path):
+    """Test showing, exporting, resetting and toggling timings with the Stats command."""
+    handler.execute_command('Echo 1')
+    handler.execute_command('Stats')
+    assert 'Echo' in capsys.readouterr().out
+    path = tmp_path / 'stats.json'
+    handler.execute_command(f'Stats json {path}')
+    exported = json.loads(path.read_text(encoding='utf-8'))
+    assert exported['commands']['Echo']['count'] == 1
+    handler.execute_command('Stats json')
+    assert json.loads(capsys.readouterr().out.split('\n', 1)[1])['commands']['Stats']['count'] == 2
+    handler.execute_command('Stats reset')
+    assert list(handler.stats.summary()) == ['Stats']  # Only the reset itself
+    handler.execute_command('Stats profile 1')
+    handler.execute_command('Echo 1')
+    capsys.readouterr()
+    handler.execute_command('Stats profile')
+    assert 'function calls' in capsys.readouterr().out
+    with pytest.raises(ValueError, match="Unknown Stats action"):
+        handler.execute_command('Stats bogus')
+    handler.execute_command('Stats off')
+    assert handler.stats is None
+    handler.execute_command('Stats')
+    assert 'disabled' in capsys.readouterr().out
+    handler.execute_command('Stats on')
+    assert isinstance(handler.stats, CommandStats)
+
+def test_repl_configures_stats(monkeypatch):
+    """Test that COMMAND_STATS turns timing on for the REPL's handler."""
+    from calculator.repl import CalculatorREPL  # pylint: disable=import-outside-toplevel
+    monkeypatch.setenv('COMMAND_STATS', 'on')
+    assert isinstance(CalculatorREPL().command_handler.stats, CommandStats)
+    monkeypatch.setenv('COMMAND_STATS', '0')
+    assert CalculatorREPL().command_handler.stats is None
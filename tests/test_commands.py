@@ -3,7 +3,7 @@ Tests for commands.
 """
 
 import pytest
-from calculator.commands import Command, CommandHandler
+from calculator.commands import Command, CommandHandler, LazyCommand
 
 class TestCommand(Command):
     """A test command that implements the execute method."""
@@ -44,3 +44,17 @@ def test_execute_command_with_args():
     handler.register_command('testargs', command)
     result = handler.execute_command('testargs arg1 arg2')
     assert result == ('arg1', 'arg2')
+
+def test_lazy_command_loaded_on_first_execute():
+    """Test that a lazily registered command is created once, on first use."""
+    created = []
+    def loader():
+        created.append(True)
+        return TestCommand()
+    handler = CommandHandler()
+    handler.register_command('lazy', LazyCommand(loader))
+    assert not created
+    assert handler.execute_command('lazy') == "Executed"
+    assert handler.execute_command('lazy') == "Executed"
+    assert len(created) == 1
+    assert isinstance(handler.commands['lazy'], TestCommand)
@@ -0,0 +1,92 @@
+"""Tests for expression parsing, compilation and the Eval command."""
+import re
+from decimal import Decimal
+from fractions import Fraction
+import pytest
+from calculator.calculations import Calculations
+from calculator.expression import (BinaryOp, Number, Variable, compile_expression, evaluate, parse,
+                                   parse_bindings, templates)
+from calculator.operations import add, divide, multiply, subtract
+from calculator.plugins.eval import EvalCommand
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture
+def history():
+    """Fixture for an empty history and template cache."""
+    Calculations.clear_history()
+    templates.clear()
+    yield
+    Calculations.clear_history()
+
+def _steps():
+    return [(calc.a, calc.b, calc.operation, calc.perform()) for calc in Calculations.get_history()]
+
+def test_precedence_and_parentheses():
+    """Test that * and / bind tighter than + and -, left to right, with parentheses first."""
+    assert parse("1 + 2 * x") == BinaryOp(add, Number('1'), BinaryOp(multiply, Number('2'), Variable('x')))
+    assert parse("8 - 4 - 2") == BinaryOp(subtract, BinaryOp(subtract, Number('8'), Number('4')), Number('2'))
+    assert parse("(1 + 2) / -x") == BinaryOp(divide, BinaryOp(add, Number('1'), Number('2')),
+                                             BinaryOp(subtract, Number('0'), Variable('x')))
+    assert parse("--1.5e3") == Number('1.5e3')
+    assert parse("-(+2)") == Number('-2')
+
+@pytest.mark.parametrize("text, message", [
+    ("1 +", "at the end"), ("(1 + 2", "expected ')'"), ("1 2", "found '2' at position 2"),
+    ("2 $ 3", "unexpected '$' at position 2"), (")", "found ')' at position 0"), ("", "at the end"),
+])
+def test_invalid_expressions(text, message):
+    """Test that malformed expressions raise ValueError saying where."""
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse(text)
+
+def test_every_step_recorded_in_order(history):
+    """Test that each operation, folded or not, is recorded in evaluation order."""
+    assert evaluate("(x + 2) * y / (2 * 2)", {'x': '3', 'y': Decimal('1.5')}) == Decimal('1.875')
+    assert _steps() == [(3, 2, add, 5), (5, Decimal('1.5'), multiply, Decimal('7.5')),
+                        (2, 2, multiply, 4), (Decimal('7.5'), 4, divide, Decimal('1.875'))]
+
+def test_constant_folding(history):
+    """Test that constant sub-expressions are computed once at compile time but recorded on every run."""
+    program = compile_expression("x * (2 + 3)")
+    assert [step.result for step in program.steps] == [5, None]
+    assert evaluate("x * (2 + 3)", {'x': 2}) == 10
+    assert evaluate("x * (2 + 3)", {'x': 4}) == 20
+    assert [step[2] for step in _steps()] == [add, multiply, add, multiply]
+    assert compile_expression("7").steps == [] and evaluate("7") == 7
+    with pytest.raises(ValueError, match="Cannot divide by zero"):
+        compile_expression("1 / (2 - 2)")
+
+def test_template_cache(history):
+    """Test that the same template is compiled once per backend, whatever the values or extra spacing."""
+    assert compile_expression("x + 1") is compile_expression("  x  +   1 ")
+    assert evaluate("x+1", {'x': 1}) == 2 and evaluate("x+1", {'x': 41}) == 42
+    assert compile_expression("x+1", 'fraction') is not compile_expression("x+1")
+    assert evaluate("x / 3", {'x': 1}, 'fraction') == Fraction(1, 3)
+    assert Calculations.get_latest().backend == 'fraction'
+
+def test_variable_errors(history):
+    """Test missing and unknown variables."""
+    with pytest.raises(ValueError, match="No value given for variable: y"):
+        evaluate("x + y", {'x': 1})
+    with pytest.raises(ValueError, match="Unknown variable: z"):
+        evaluate("x", {'x': 1, 'z': 2})
+    with pytest.raises(ValueError, match="Cannot divide by zero"):
+        evaluate("1 / x", {'x': 0})
+
+def test_parse_bindings():
+    """Test splitting command arguments into the expression and its bindings."""
+    assert parse_bindings(['(x', '+', '1)', '*', 'y', 'x=2', 'y=-3']) == ('(x + 1) * y', {'x': '2', 'y': '-3'})
+    for bad in ('1x=2', 'x=', '=3'):
+        with pytest.raises(ValueError, match="Invalid variable binding"):
+            parse_bindings(['x', bad])
+
+def test_eval_command(history, capsys):
+    """Test the Eval command."""
+    command = EvalCommand()
+    assert command.execute('2', '*', '(x', '-', '1)', 'x=4') == 6
+    assert capsys.readouterr().out == "Result: 6\n"
+    with pytest.raises(ValueError, match="requires an expression"):
+        command.execute('x=1')
+    with pytest.raises(ValueError, match="Decimal conversion"):
+        command.execute('x', 'x=abc')
@@ -0,0 +1,201 @@
+"""Tests for the columnar history store."""
+import tracemalloc
+from decimal import Decimal
+from fractions import Fraction
+import pytest
+from calculator.calculation import Calculation
+from calculator.history_store import HistoryStore, pack_decimal, unpack_decimal
+from calculator.operations import add, subtract, multiply, divide
+
+@pytest.mark.parametrize("value", [
+    Decimal('0'), Decimal('15'), Decimal('-2.50'), Decimal('1E+2'), Decimal('0.000001'),
+    Decimal('999999999999999999'), Decimal('-3.1E-124'),
+])
+def test_pack_round_trip(value):
+    """Test that packable values come back with the same value and representation."""
+    packed = pack_decimal(value)
+    assert packed is not None
+    assert str(unpack_decimal(*packed)) == str(value)
+
+@pytest.mark.parametrize("value", [
+    Decimal('0.3333333333333333333333333333'), Decimal('-0'), Decimal('NaN'), Decimal('Infinity'),
+    Decimal('1E+200'), Decimal('1E-126'), Decimal('1E-127'), 1.5,
+])
+def test_pack_unpackable(value):
+    """Test that values that do not fit the packed format are rejected."""
+    assert pack_decimal(value) is None
+
+def test_append_and_read_back():
+    """Test that calculations read back from the store equal the ones added."""
+    store = HistoryStore()
+    calcs = [Calculation(Decimal('10'), Decimal('5'), add),
+             Calculation(Decimal('1'), Decimal('3'), divide),
+             Calculation(Decimal('-0'), Decimal('2.5'), multiply),
+             Calculation(Decimal('-2'), Decimal('3'), divide),
+             Calculation(Decimal('NaN'), Decimal('1'), add)]
+    for calc in calcs:
+        store.append(calc)
+    assert len(store) == 5
+    assert list(store)[:4] == calcs[:4]
+    assert store[-1].a.is_nan()
+    assert store[1:4] == calcs[1:4]
+    assert str(store[2].a) == '-0'
+    assert list(store.rows(3))[0][3] == Decimal(-2) / Decimal(3)
+    assert list(store.rows(1))[0] == (Decimal('1'), Decimal('3'), 'divide', Decimal(1) / Decimal(3), 'decimal')
+
+def test_index_out_of_range():
+    """Test that reading past the end raises IndexError."""
+    store = HistoryStore()
+    with pytest.raises(IndexError):
+        store[0]  # pylint: disable=pointless-statement
+
+def test_find_and_clear():
+    """Test searching by operation name and clearing the store."""
+    store = HistoryStore()
+    store.append(Calculation(Decimal('1'), Decimal('2'), add))
+    store.append(Calculation(Decimal('3'), Decimal('2'), subtract))
+    store.append(Calculation(Decimal('4'), Decimal('2'), add))
+    assert [calc.a for calc in store.find('add')] == [Decimal('1'), Decimal('4')]
+    assert not store.find('divide')
+    store.clear()
+    assert len(store) == 0
+
+def test_custom_operation():
+    """Test that operations outside calculator.operations get their own code."""
+    def power(a, b):
+        return a ** b
+    store = HistoryStore()
+    store.append(Calculation(Decimal('2'), Decimal('3'), power))
+    assert store[0].operation is power
+    assert list(store.rows())[0][3] == Decimal('8')
+
+def _traced_size(build) -> int:
+    """Return the memory still allocated by build() when it returns."""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+def test_per_entry_footprint():
+    """Test that the store uses at least 5x less memory per entry than a list of calculations."""
+    count = 20_000
+    operations = [add, subtract, multiply, divide]
+
+    def calculations():
+        return (Calculation(Decimal(i) / 4, Decimal(i % 97 + 1), operations[i % 4]) for i in range(count))
+
+    def build_list():
+        return list(calculations())
+
+    def build_store():
+        store = HistoryStore()
+        for calc in calculations():
+            store.append(calc)
+        return store
+
+    list_size = _traced_size(build_list)
+    store_size = _traced_size(build_store)
+    assert list_size / store_size >= 5, f"{list_size / count:.0f} vs {store_size / count:.0f} bytes per entry"
+
+def test_operation_index():
+    """Test that the per-operation index tracks appends, bulk loads and clears."""
+    store = HistoryStore()
+    store.append(Calculation(Decimal('1'), Decimal('2'), add))
+    store.extend_columns([Decimal('3'), Decimal('4')], [Decimal('1'), Decimal('1')],
+                         [subtract, add], [Decimal('2'), Decimal('5')])
+    store.append(Calculation(Decimal('6'), Decimal('2'), divide))
+    assert store.positions('add') == [0, 2]
+    assert store.count('add') == 2
+    assert store.count('subtract') == 1
+    assert store.count('power') == 0
+    assert [calc.a for calc in store.find('add')] == [Decimal('1'), Decimal('4')]
+    store.clear()
+    assert store.count('add') == 0
+    store.append(Calculation(Decimal('7'), Decimal('1'), add))
+    assert store.positions('add') == [0]
+
+def test_operation_index_same_name():
+    """Test that different functions sharing a name are found together, in history order."""
+    def add(a, b):  # pylint: disable=redefined-outer-name
+        return a + b + 1
+    store = HistoryStore()
+    store.append(Calculation(Decimal('1'), Decimal('1'), add))
+    store.append(Calculation(Decimal('2'), Decimal('2'), globals()['add']))
+    store.append(Calculation(Decimal('3'), Decimal('3'), add))
+    assert store.positions('add') == [0, 1, 2]
+    assert store.count('add') == 3
+
+@pytest.mark.parametrize("text", [
+    '12.25', '-0.001', '0.0000001', '1.000', '-7', '123E+5', '-4.5E-9', '0E-3', '1E-125',
+])
+def test_pack_matches_as_tuple(text):
+    """Test that the string-based packing agrees with Decimal.as_tuple()."""
+    value = Decimal(text)
+    sign, digits, exponent = value.as_tuple()
+    coefficient = int(''.join(map(str, digits))) * (-1 if sign else 1)
+    assert pack_decimal(value) == (coefficient, exponent)
+
+@pytest.mark.parametrize("text", [
+    '0', '15', '-2.50', '0.000001', '0.0000001', '-0.5', '1E+2', '-0', 'NaN', '123456.789',
+    '0.3333333333333333333333333333', '-12345678901234567890.5', '1.0E-12',
+])
+def test_text_matches_str(text):
+    """Test that formatting packed values gives exactly str() of the Decimal."""
+    store = HistoryStore()
+    store.append(Calculation(Decimal(text), Decimal('1'), multiply))
+    assert list(store.text_rows()) == [(str(Decimal(text)), '1', 'multiply', str(Decimal(text) * 1), 'decimal')]
+
+def test_merge_stores():
+    """Test that merging keeps order, wide and pooled values, and the operation index."""
+    def power(a, b):
+        return a ** b
+    first, second = HistoryStore(), HistoryStore()
+    first.append(Calculation(Decimal('1'), Decimal('3'), divide))
+    first.append(Calculation(Decimal('2'), Decimal('2'), add))
+    second.append(Calculation(Decimal('2'), Decimal('3'), power))
+    second.append(Calculation(Decimal('2'), Decimal('3'), divide))
+    second.append(Calculation(Decimal('NaN'), Decimal('1'), add))
+    second.append(Calculation(Decimal('5'), Decimal('1'), subtract))
+    first.merge(second)
+    assert len(first) == 6
+    assert [row[2] for row in first.rows()] == ['divide', 'add', 'power', 'divide', 'add', 'subtract']
+    assert first[1].perform() == Decimal('4')
+    assert first[3].perform() == Decimal(2) / Decimal(3)
+    assert first[4].a.is_nan()
+    assert first.positions('add') == [1, 4]
+    assert first.positions('power') == [2]
+    assert first[2].operation is power
+
+def test_float_entries():
+    """Test that floats, appended singly or as arrays, come back as the same floats."""
+    np = pytest.importorskip('numpy')
+    store = HistoryStore()
+    store.append(Calculation(0.1, 3.0, multiply, backend='float'))
+    store.extend_operation(divide, np.array([1.0, -2.5]), np.array([3.0, float('inf')]),
+                           np.array([1 / 3, -0.0]), 'float')
+    store.extend_operation(add, [Decimal('1.5')], [Decimal('2')], [Decimal('3.5')])
+    assert [calc.a for calc in store] == [0.1, 1.0, -2.5, Decimal('1.5')]
+    assert store[1].perform() == 1 / 3
+    assert str(store[2].perform()) == '-0.0'
+    assert store.positions('divide') == [1, 2]
+    assert list(store.text_rows(2)) == [('-2.5', 'inf', 'divide', '-0.0', 'float'), ('1.5', '2', 'add', '3.5', 'decimal')]
+
+def test_backend_column():
+    """Test that each entry keeps the name of its backend, including through merges and clears."""
+    first, second = HistoryStore(), HistoryStore()
+    first.append(Calculation(Decimal('1'), Decimal('2'), add))
+    first.append(Calculation(Fraction(1, 3), Fraction(1), add, backend='fraction'))
+    second.append(Calculation(0.5, 2.0, divide, backend='float'))
+    second.append(Calculation(Fraction(1), Fraction(3), divide, backend='fraction'))
+    first.merge(second)
+    assert [calc.backend for calc in first] == ['decimal', 'fraction', 'float', 'fraction']
+    assert [row[4] for row in first.text_rows()] == ['decimal', 'fraction', 'float', 'fraction']
+    assert list(first.text_rows(3))[0][3] == '1/3'
+    first.clear()
+    first.append(Calculation(Decimal('1'), Decimal('2'), add))
+    assert first[0].backend == 'decimal'
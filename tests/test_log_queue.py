@@ -0,0 +1,50 @@
+"""Tests for queue-based logging."""
+import logging
+from logging.handlers import QueueHandler
+import pytest
+from calculator.log_queue import start_queue_logging, stop_queue_logging
+from calculator.repl import CalculatorREPL
+
+# pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def root_handlers():
+    """Fixture that restores the root logger's handlers and level after the test."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    stop_queue_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_queued_records_written_on_stop(root_handlers, tmp_path):
+    """Test that records go through the queue and are all written when logging stops."""
+    path = tmp_path / 'app.log'
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    for handler in list(root_handlers.handlers):
+        root_handlers.removeHandler(handler)
+    root_handlers.addHandler(file_handler)
+    root_handlers.setLevel(logging.INFO)
+    listener = start_queue_logging()
+    assert start_queue_logging() is listener
+    assert [type(handler) for handler in root_handlers.handlers] == [QueueHandler]
+    for i in range(1000):
+        logging.info("Record %d", i)
+    stop_queue_logging()
+    assert root_handlers.handlers == [file_handler]
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines == [f"Record {i}" for i in range(1000)]
+    file_handler.close()
+
+def test_repl_enables_queue_logging(root_handlers, monkeypatch):
+    """Test that LOG_QUEUE puts a queue in front of the configured handlers, and reconfiguring is safe."""
+    monkeypatch.setenv('LOG_QUEUE', '1')
+    CalculatorREPL()
+    CalculatorREPL()
+    assert [type(handler) for handler in root_handlers.handlers] == [QueueHandler]
+    monkeypatch.setenv('LOG_QUEUE', '0')
+    CalculatorREPL()
+    assert not any(isinstance(handler, QueueHandler) for handler in root_handlers.handlers)
@@ -0,0 +1,95 @@
+"""Tests for the multi-process command runner."""
+import io
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations, HistorySession
+from calculator.operations import add
+from calculator.parallel import SESSION_COMMANDS, _init_worker, _run_chunk, run_parallel, split_chunks
+
+# pylint: disable=redefined-outer-name, unused-argument, protected-access
+
+@pytest.fixture
+def clean_history():
+    """Fixture that starts and ends with an empty history."""
+    Calculations.clear_history()
+    yield
+    Calculations.clear_history()
+
+def test_split_chunks_line_boundaries(tmp_path):
+    """Test that chunks cover the file, end on newlines and know their first line number."""
+    path = tmp_path / 'commands.txt'
+    lines = [f"Add {i} {i * 10}\n" for i in range(50)]
+    path.write_text(''.join(lines), encoding='utf-8')
+    data = path.read_bytes()
+    chunks = split_chunks(str(path), 6)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for (_, end, _), (start, _, _) in zip(chunks, chunks[1:]):
+        assert end == start and data[end - 1:end] == b'\n'
+    for start, _, first_line in chunks:
+        assert data[:start].count(b'\n') + 1 == first_line
+
+def test_split_chunks_more_chunks_than_lines(tmp_path):
+    """Test that small files produce no empty chunks."""
+    path = tmp_path / 'commands.txt'
+    path.write_text("Add 1 2\nAdd 3 4", encoding='utf-8')
+    assert split_chunks(str(path), 8) == [(0, 8, 1), (8, 15, 2)]
+    empty = tmp_path / 'empty.txt'
+    empty.write_text('', encoding='utf-8')
+    assert not split_chunks(str(empty), 4)
+
+def test_run_parallel_merges_in_input_order(tmp_path, clean_history):
+    """Test that output, errors and history come back in the original input order."""
+    path = tmp_path / 'commands.txt'
+    lines = [f"Add {i} 1\n" for i in range(40)]
+    lines[7] = "Divide 1 x\n"
+    lines[30] = "Bogus 1 2\n"
+    path.write_text(''.join(lines), encoding='utf-8')
+    output, errors = io.StringIO(), io.StringIO()
+    with patch.object(Calculations, 'save_history') as mock_save_history:
+        executed, failed = run_parallel(str(path), workers=2, output=output, errors=errors)
+        mock_save_history.assert_called_once()
+    assert (executed, failed) == (40, 2)
+    expected = [f"Result: {i + 1}" for i in range(40) if i not in (7, 30)]
+    assert output.getvalue().splitlines() == expected
+    assert errors.getvalue().splitlines() == ["Line 8: Error: Invalid input for Decimal conversion.",
+                                              "Line 31: Error: No such command: Bogus"]
+    history = Calculations.get_history()
+    assert [calc.a for calc in history] == [Decimal(i) for i in range(40) if i not in (7, 30)]
+    assert Calculations.count_by_operation('add') == 38
+
+def test_run_parallel_rejects_whole_history_commands(tmp_path, clean_history):
+    """Test that commands acting on the whole history fail on their line instead of running in a chunk."""
+    path = tmp_path / 'commands.txt'
+    lines = [f"Add {i} 1\n" for i in range(8)]
+    for position, name in zip((1, 3, 5, 7), SESSION_COMMANDS):
+        lines[position] = f"{name}\n"
+    path.write_text(''.join(lines), encoding='utf-8')
+    output, errors = io.StringIO(), io.StringIO()
+    with patch.object(Calculations, 'save_history'):
+        executed, failed = run_parallel(str(path), workers=2, output=output, errors=errors)
+    assert (executed, failed) == (8, 4)
+    assert errors.getvalue().splitlines() == [
+        f"Line {position + 1}: Error: {name} is not available when running with several workers."
+        for position, name in zip((1, 3, 5, 7), SESSION_COMMANDS)]
+    assert [calc.a for calc in Calculations.get_history()] == [Decimal(i) for i in (0, 2, 4, 6)]
+
+def test_chunk_leaves_parent_log_alone(tmp_path):
+    """Test that a worker running a chunk uses its own history, not the inherited session and its log."""
+    parent = HistorySession(file_path=str(tmp_path / 'history.csv'))
+    assert parent.enable_wal(sync_interval=10)
+    try:
+        parent.add_calculation(Calculation(Decimal(1), Decimal(2), add))
+        parent.sync_wal()
+        logged = parent.wal.read()
+        path = tmp_path / 'commands.txt'
+        path.write_text("Add 3 4\nAdd 5 6\n", encoding='utf-8')
+        with patch.object(Calculations, 'default_session', parent):
+            _init_worker()
+            chunk_output, _, executed, _, history = _run_chunk((str(path), 0, path.stat().st_size, 1))
+        assert executed == 2 and chunk_output.splitlines() == ["Result: 7", "Result: 11"]
+        assert [calc.a for calc in history] == [Decimal(3), Decimal(5)]
+        assert parent.wal.read() == logged and len(parent.history) == 1
+    finally:
+        parent.disable_wal()
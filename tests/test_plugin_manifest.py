@@ -0,0 +1,72 @@
+"""Tests for the cached plugin manifest."""
+import json
+import os
+from unittest.mock import patch
+from calculator.plugin_manifest import MANIFEST_NAME, load_manifest, scan_plugin
+
+# pylint: disable=redefined-outer-name
+
+def _write_plugin(plugins_path, name, source):
+    package = plugins_path / name
+    package.mkdir(exist_ok=True)
+    (package / '__init__.py').write_text(source, encoding='utf-8')
+    return package / '__init__.py'
+
+GREET_SOURCE = '''
+from calculator.commands import Command
+
+class Helper:
+    pass
+
+class GreetCommand(Command):
+    def execute(self, *args):
+        return "hello"
+
+class ListCommand(Command):
+    def __init__(self, command_handler):
+        self.command_handler = command_handler
+
+    def execute(self, *args):
+        return list(self.command_handler.commands)
+'''
+
+def test_scan_plugin(tmp_path):
+    """Test that only command classes are listed and handler-taking ones are flagged."""
+    init_path = _write_plugin(tmp_path, 'greet', GREET_SOURCE)
+    assert scan_plugin(str(init_path)) == [
+        {'class': 'GreetCommand', 'needs_handler': False},
+        {'class': 'ListCommand', 'needs_handler': True},
+    ]
+
+def test_manifest_is_cached_and_reused(tmp_path):
+    """Test that a warm start reads the manifest instead of rescanning plugin sources."""
+    _write_plugin(tmp_path, 'greet', GREET_SOURCE)
+    (tmp_path / 'notes.txt').write_text('not a plugin', encoding='utf-8')
+    cold = load_manifest(str(tmp_path))
+    assert list(cold) == ['greet']
+    assert os.path.exists(tmp_path / MANIFEST_NAME)
+    with patch('calculator.plugin_manifest.scan_plugin') as mock_scan:
+        warm = load_manifest(str(tmp_path))
+        mock_scan.assert_not_called()
+    assert warm == cold
+
+def test_manifest_invalidated_by_mtime(tmp_path):
+    """Test that changed, added and removed plugins are picked up."""
+    init_path = _write_plugin(tmp_path, 'greet', GREET_SOURCE)
+    load_manifest(str(tmp_path))
+    init_path.write_text("from calculator.commands import Command\n"
+                         "class WaveCommand(Command):\n    def execute(self, *args):\n        pass\n",
+                         encoding='utf-8')
+    os.utime(init_path, ns=(0, 1))
+    _write_plugin(tmp_path, 'other', GREET_SOURCE)
+    plugins = load_manifest(str(tmp_path))
+    assert plugins['greet']['commands'] == [{'class': 'WaveCommand', 'needs_handler': False}]
+    assert 'other' in plugins
+    with open(tmp_path / MANIFEST_NAME, encoding='utf-8') as f:
+        assert set(json.load(f)['plugins']) == {'greet', 'other'}
+
+def test_corrupt_manifest_is_rebuilt(tmp_path):
+    """Test that an unreadable manifest is ignored and rewritten."""
+    _write_plugin(tmp_path, 'greet', GREET_SOURCE)
+    (tmp_path / MANIFEST_NAME).write_text('{not json', encoding='utf-8')
+    assert list(load_manifest(str(tmp_path))) == ['greet']
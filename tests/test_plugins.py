@@ -149,6 +149,21 @@ def test_print_history_command(handler, capsys):  #pylint: disable=redefined-out
     captured = capsys.readouterr()
     assert "Calculation" in captured.out
 
+def test_print_history_command_arguments(capsys):
+    """Test the offset, limit, tail and stream arguments of the print history command."""
+    Calculations.clear_history()
+    for i in range(5):
+        Calculator.add(Decimal(i), Decimal('1'))
+    command = PrintHistoryCommand()
+    command.execute('offset=1', 'limit=2')
+    assert capsys.readouterr().out == "Calculation(1, 1, add)\nCalculation(2, 1, add)\n"
+    command.execute('tail=1', 'stream')
+    assert capsys.readouterr().out == "Calculation(4, 1, add)\n"
+    for bad in ('tail=-1', 'limit', 'page=2'):
+        with pytest.raises(ValueError, match="Invalid argument"):
+            command.execute(bad)
+    Calculations.clear_history()
+
 def test_menu_command():
     # Mock the command handler with some commands
     mock_command_handler = MagicMock()
@@ -1,6 +1,7 @@
 """
 Tests for the CalculatorREPL class.
 """
+import io
 import os
 import logging
 from unittest.mock import patch, MagicMock
@@ -8,6 +9,7 @@ import pytest
 from calculator.calculations import Calculations
 from calculator.repl import CalculatorREPL
 from calculator.commands import CommandHandler
+from main import main
 
 #pylint: disable=redefined-outer-name, line-too-long
 
@@ -84,3 +86,74 @@ def test_save_history_on_exit():
             with patch.object(repl, '_load_plugins'):
                 repl.start()
             mock_save_history.assert_called_once()
+
+def test_autosave_flushes_on_exit(monkeypatch):
+    """Test that with AUTOSAVE_SECONDS set, exit stops autosave instead of rewriting the history"""
+    monkeypatch.setenv('AUTOSAVE_SECONDS', '60')
+    repl = CalculatorREPL()
+    assert Calculations.current().autosaving
+    with patch('builtins.input', side_effect=['exit']):
+        with patch.object(Calculations, 'save_history') as mock_save_history:
+            repl.start()
+            mock_save_history.assert_not_called()
+    assert not Calculations.current().autosaving
+
+def test_plugins_imported_on_first_use(tmp_path, monkeypatch):
+    """Test that plugin commands are registered at startup but imported only when run"""
+    package = tmp_path / 'greet'
+    package.mkdir()
+    (package / '__init__.py').write_text(
+        "from calculator.commands import Command\n"
+        "IMPORTS.append('greet')\n"
+        "class GreetCommand(Command):\n"
+        "    def execute(self, *args):\n"
+        "        return 'hello'\n"
+        "class ListCommand(Command):\n"
+        "    def __init__(self, command_handler):\n"
+        "        self.command_handler = command_handler\n"
+        "    def execute(self, *args):\n"
+        "        return sorted(self.command_handler.commands)\n", encoding='utf-8')
+    imports = []
+    monkeypatch.setattr('builtins.IMPORTS', imports, raising=False)
+    monkeypatch.setenv('PLUGIN_DIR', str(tmp_path))
+    repl = CalculatorREPL()
+    assert sorted(repl.command_handler.commands) == ['Greet', 'List']
+    assert not imports
+    assert repl.command_handler.execute_command('Greet') == 'hello'
+    assert repl.command_handler.execute_command('List') == ['Greet', 'List']
+    assert imports == ['greet']
+
+def test_run_batch_reports_errors_per_line():
+    """Test that batch mode keeps going after errors and reports each one with its line number"""
+    repl = CalculatorREPL()
+    output, errors = io.StringIO(), io.StringIO()
+    lines = ["Add 1 2\n", "\n", "# comment\n", "Multiply 2 x\n", "Nope\n", "Subtract 5 3\n"]
+    with patch.object(Calculations, 'save_history') as mock_save_history:
+        executed, failed = repl.run_batch(lines, output=output, errors=errors)
+        mock_save_history.assert_called_once()
+    assert (executed, failed) == (4, 2)
+    assert output.getvalue() == "Result: 3\nResult: 2\n"
+    assert errors.getvalue() == ("Line 4: Error: Invalid input for Decimal conversion.\n"
+                                 "Line 5: Error: No such command: Nope\n")
+
+def test_run_batch_flushes_in_blocks_and_stops_at_exit():
+    """Test that buffered output is written as it fills up and that 'exit' ends the batch"""
+    repl = CalculatorREPL()
+    output = MagicMock()
+    with patch.object(Calculations, 'save_history'):
+        executed, _ = repl.run_batch(["Add 1 1\n"] * 5 + ["exit\n", "Add 1 1\n"], output=output,
+                                     errors=io.StringIO(), flush_size=20)
+    assert executed == 5
+    written = "".join(call.args[0] for call in output.write.call_args_list)
+    assert written == "Result: 2\n" * 5
+    assert output.write.call_count > 1
+
+def test_main_batch_file(tmp_path, capsys):
+    """Test running main.py's batch mode on a command file"""
+    commands = tmp_path / 'commands.txt'
+    commands.write_text("Add 2 3\nDivide 1 0\n", encoding='utf-8')
+    with patch.object(Calculations, 'save_history'):
+        assert main(['--batch', str(commands)]) == 1
+    captured = capsys.readouterr()
+    assert "Result: 5" in captured.out
+    assert "Line 2:" in captured.err
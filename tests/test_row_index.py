@@ -0,0 +1,91 @@
+"""Tests for the row-hash index used to deduplicate history saves."""
+import os
+from decimal import Decimal
+from unittest.mock import patch
+import pytest
+from calculator.calculation import Calculation
+from calculator.calculations import HistorySession
+from calculator.history_store import HistoryStore
+from calculator.operations import add
+from calculator.storage import open_history_backend
+from calculator.storage.row_index import INDEX_SUFFIX, RowIndex, row_hash
+
+# pylint: disable=redefined-outer-name, protected-access
+
+@pytest.fixture(params=['history.csv', 'history.bin'])
+def backend(request, tmp_path):
+    """Fixture for a CSV or binary history backend in a temporary directory."""
+    return open_history_backend(str(tmp_path / request.param))
+
+def _store(*values) -> HistoryStore:
+    store = HistoryStore()
+    for value in values:
+        store.append(Calculation(Decimal(value), Decimal(1), add))
+    return store
+
+def _saved(backend):
+    return [int(row[0]) for row in backend.load(1_000).rows()]
+
+def test_index_lookup_and_persistence(tmp_path):
+    """Test that hashes are found, picked once, and survive a reload only for the same file state."""
+    index = RowIndex(str(tmp_path / 'history.csv'))
+    rows = [('1', '1', 'add', '2', 'decimal'), ('2', '1', 'add', '3', 'decimal')]
+    index.rebuild(rows, (1, 100))
+    assert row_hash(rows[0]) in index and len(index) == 2
+    new = [('3', '1', 'add', '4', 'decimal'), rows[1], ('3', '1', 'add', '4', 'decimal')]
+    picked, hashes, repeated = index.new_rows(new, deduplicate=True)
+    assert picked == [new[0]] and not repeated
+    index.add(hashes, repeated, (2, 150))
+    assert index.new_rows(new, deduplicate=False)[2]  # Without deduplication, repeats are reported
+    reloaded = RowIndex(str(tmp_path / 'history.csv'))
+    assert not reloaded.load((1, 100))  # Stale: the file has changed since
+    assert reloaded.load((2, 150))
+    assert all(row_hash(row) in reloaded for row in rows + new) and reloaded.unique
+
+def test_deduplicated_append_does_not_read_file(backend):
+    """Test that once the index is built, deduplicating only hashes the new rows."""
+    backend.save(_store(1, 2), 0, append=True, deduplicate=True)
+    with patch.object(type(backend), '_stored_text_rows', side_effect=AssertionError("read the file")):
+        backend.save(_store(2, 3), 0, append=True, deduplicate=True)
+        backend.save(_store(3, 4), 0, append=False, deduplicate=True)  # A unique file is appended to
+    assert _saved(backend) == [1, 2, 3, 4]
+
+def test_missing_or_stale_index_is_rebuilt(backend):
+    """Test that deduplication is still exact after the index is deleted or the file changes behind it."""
+    backend.save(_store(1, 2), 0, append=True, deduplicate=True)
+    os.remove(backend.path + INDEX_SUFFIX)
+    backend.save(_store(2, 3), 0, append=True, deduplicate=True)
+    other = open_history_backend(backend.path)
+    other._index.delete()  # Another writer appends without keeping the index
+    other.save(_store(4), 0, append=True, deduplicate=False)
+    backend.save(_store(4, 5), 0, append=True, deduplicate=True)
+    assert _saved(backend) == [1, 2, 3, 4, 5]
+
+def test_rewrite_removes_repeats_then_appends(backend):
+    """Test that a file with repeated rows gets a full deduplicating rewrite, after which saves append."""
+    backend.save(_store(1, 1, 2), 0, append=True, deduplicate=False)
+    backend.save(_store(3), 0, append=False, deduplicate=True)
+    assert _saved(backend) == [1, 2, 3]
+    with patch.object(type(backend), '_rewrite', side_effect=AssertionError("rewrote the file")):
+        backend.save(_store(2, 4), 0, append=False, deduplicate=True)
+    assert _saved(backend) == [1, 2, 3, 4]
+
+def test_rewrite_save_checks_only_new_entries(backend):
+    """Test that a deduplicating rewrite after a load formats and hashes only the entries added since."""
+    backend.save(_store(*range(100)), 0, append=True, deduplicate=True)
+    session = HistorySession(file_path=backend.path)
+    session.load_history()
+    session.add_calculation(Calculation(Decimal(100), Decimal(1), add))
+    with patch.object(RowIndex, 'new_rows', autospec=True, side_effect=RowIndex.new_rows) as new_rows:
+        session.save_history(append=False, deduplicate=True)
+    assert len(new_rows.call_args.args[1]) == 1
+    assert _saved(backend) == list(range(101))
+
+def test_delete_removes_index(backend):
+    """Test that deleting the history deletes its index too."""
+    backend.save(_store(1), 0, append=True, deduplicate=True)
+    assert os.path.exists(backend.path + INDEX_SUFFIX)
+    backend.delete()
+    assert not os.path.exists(backend.path + INDEX_SUFFIX)
+    backend.save(_store(1), 0, append=True, deduplicate=True)
+    assert _saved(backend) == [1]
@@ -0,0 +1,66 @@
+"""Tests for the network server."""
+import asyncio
+from calculator.calculations import Calculations
+from calculator.repl import CalculatorREPL
+from calculator.server import CalculatorServer, format_response
+from main import parse_address
+
+async def _connect(server):
+    host, port = server.sockets[0].getsockname()[:2]
+    return await asyncio.open_connection(host, port)
+
+async def _with_server(client):
+    """Start a server on a free port, run client(server) against it, then stop the server."""
+    server = await CalculatorServer(CalculatorREPL().command_handler).start('127.0.0.1', 0)
+    async with server:
+        return await client(server)
+
+def test_format_response():
+    """Test the OK, OK-with-output and ERR responses."""
+    handler = CalculatorREPL().command_handler
+    Calculations.clear_history()
+    assert format_response(handler, "Add 2 3") == "OK 5\n"
+    assert format_response(handler, "Divide 1 0") == "ERR Cannot divide by zero.\n"
+    assert format_response(handler, "Bogus").startswith("ERR ")
+    assert format_response(handler, "Printhistory") == ". Calculation(2, 3, add)\nOK\n"
+    Calculations.clear_history()
+
+def test_pipelined_requests_keep_order():
+    """Test that many requests sent at once are answered in order."""
+    async def client(server):
+        reader, writer = await _connect(server)
+        writer.write(''.join(f"Multiply {i} 2\n" for i in range(500)).encode() + b"Divide 1 0\nexit\n")
+        await writer.drain()
+        responses = (await reader.read()).decode().splitlines()
+        writer.close()
+        return responses
+    responses = asyncio.run(_with_server(client))
+    assert responses == [f"OK {i * 2}" for i in range(500)] + ["ERR Cannot divide by zero."]
+
+def test_connections_have_separate_history():
+    """Test that each connection sees only its own calculations."""
+    async def client(server):
+        first_reader, first = await _connect(server)
+        second_reader, second = await _connect(server)
+        first.write(b"Add 1 1\n")
+        second.write(b"Add 2 2\nSubtract 5 1\n")
+        await first_reader.readline()
+        await second_reader.readline()
+        await second_reader.readline()
+        first.write(b"Printhistory\nexit\n")
+        second.write(b"Printhistory\nexit\n")
+        histories = [(await first_reader.read()).decode(), (await second_reader.read()).decode()]
+        first.close()
+        second.close()
+        return histories
+    Calculations.clear_history()
+    first, second = asyncio.run(_with_server(client))
+    assert first == ". Calculation(1, 1, add)\nOK\n"
+    assert second == ". Calculation(2, 2, add)\n. Calculation(5, 1, subtract)\nOK\n"
+    assert not Calculations.get_history()
+
+def test_parse_address():
+    """Test the --serve address forms."""
+    assert parse_address('unix:/tmp/calc.sock') == {'path': '/tmp/calc.sock'}
+    assert parse_address('0.0.0.0:9000') == {'host': '0.0.0.0', 'port': 9000}
+    assert parse_address('9000') == {'host': '127.0.0.1', 'port': 9000}
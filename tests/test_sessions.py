@@ -0,0 +1,150 @@
+"""Tests for history sessions and concurrent use of Calculations."""
+import io
+import sys
+import threading
+from decimal import Decimal
+import pytest
+from calculator import Calculator
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations, HistorySession
+from calculator.operations import add, multiply
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture
+def history():
+    """Fixture for an empty default history."""
+    Calculations.clear_history()
+    yield
+    Calculations.clear_history()
+
+def _run_threads(count: int, target):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_classmethods_use_default_session(history):
+    """Test that the class-level API reads and writes the default session."""
+    Calculator.add(Decimal('1'), Decimal('2'))
+    assert Calculations.current() is Calculations.default_session
+    assert len(Calculations.default_session.history) == 1
+    assert Calculations.get_latest().perform() == 3
+
+def test_sessions_are_separate(history, tmp_path):
+    """Test that a session has its own history, and its own file if given one."""
+    Calculator.add(Decimal('1'), Decimal('2'))
+    session = HistorySession(file_path=str(tmp_path / 'other.csv'))
+    with Calculations.session(session) as current:
+        assert current is session and not Calculations.get_history()
+        Calculator.multiply(Decimal('2'), Decimal('3'))
+        Calculations.save_history()
+    assert [calc.operation for calc in Calculations.get_history()] == [add]
+    assert [calc.operation for calc in session.history] == [multiply]
+    assert (tmp_path / 'other.csv').exists()
+    assert Calculations.new_session().path == Calculations.file_path
+
+def test_session_switch_is_per_thread(history):
+    """Test that session() only changes the current session of the calling thread."""
+    session, inside, release = HistorySession(), threading.Event(), threading.Event()
+
+    def worker():
+        with Calculations.session(session):
+            Calculations.add_calculation(Calculation(Decimal('1'), Decimal('1'), add))
+            inside.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    inside.wait(5)
+    assert Calculations.current() is Calculations.default_session
+    Calculations.add_calculation(Calculation(Decimal('2'), Decimal('2'), add))
+    release.set()
+    thread.join()
+    assert [calc.a for calc in session.history] == [Decimal('1')]
+    assert [calc.a for calc in Calculations.get_history()] == [Decimal('2')]
+
+def test_buffers_merged_and_released(history):
+    """Test that entries from threads are all merged on read and finished threads' buffers are dropped."""
+    def worker(index):
+        for i in range(100):
+            Calculations.add_calculation(Calculation(Decimal(index), Decimal(i), add))
+
+    _run_threads(4, worker)
+    assert len(Calculations.history) == 400
+    assert all(buffer.thread.is_alive() for buffer in Calculations.default_session._buffers)  # pylint: disable=protected-access
+    for index in range(4):
+        assert [calc.b for calc in Calculations.get_history() if calc.a == index] == list(range(100))
+
+def test_clear_while_adding(history):
+    """Test that clearing while other threads add entries neither fails nor loses later entries."""
+    stop = threading.Event()
+
+    def worker(index):
+        while not stop.is_set():
+            Calculations.add_calculation(Calculation(Decimal(index), Decimal('1'), add))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(50):
+        Calculations.clear_history()
+        assert all(calc.b == 1 for calc in Calculations.history[-10:])
+    stop.set()
+    for thread in threads:
+        thread.join()
+    Calculations.clear_history()
+    Calculations.add_calculation(Calculation(Decimal('5'), Decimal('1'), add))
+    assert len(Calculations.history) == 1
+
+def test_reads_while_another_thread_clears(history):
+    """Test that reading the history while another thread adds and clears never fails."""
+    errors, done = [], threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                Calculations.get_history()
+                Calculations.get_latest()
+                Calculations.print_history(tail=5, output=io.StringIO())
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)  # Switch threads often, so a read overlaps a clear
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for _ in range(300):
+            for i in range(50):
+                Calculations.add_calculation(Calculation(Decimal(i), Decimal(1), add))
+            Calculations.clear_history()
+    finally:
+        done.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert not errors
+
+@pytest.mark.slow
+def test_concurrent_stress(history):
+    """Test 16 threads doing 1M operations in total: nothing lost and per-thread order kept."""
+    threads, per_thread = 16, 62_500
+
+    def worker(index):
+        a = Decimal(index)
+        for i in range(per_thread):
+            Calculator.add(a, Decimal(i))
+            if i % 10_000 == 0:
+                Calculations.count_by_operation('add')  # Reads merge the buffers while others write
+
+    _run_threads(threads, worker)
+    history = Calculations.history
+    assert len(history) == threads * per_thread
+    assert Calculations.count_by_operation('add') == threads * per_thread
+    next_b = [0] * threads
+    for a, b, _, result, _ in history.rows():
+        index = int(a)
+        assert b == next_b[index] and result == a + b
+        next_b[index] += 1
+    assert next_b == [per_thread] * threads
@@ -0,0 +1,223 @@
+"""Tests for the history storage backends."""
+import multiprocessing
+import sqlite3
+from decimal import Decimal
+from fractions import Fraction
+from unittest.mock import patch
+import pytest
+from calculator import Calculator
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations, HistorySession
+from calculator.history_store import HistoryStore
+from calculator.operations import add, divide
+from calculator import storage
+from calculator.storage import open_history_backend
+from calculator.storage.binary_backend import BinaryRecords, MappedHistoryStore, RECORD
+from calculator.storage.csv_backend import CsvHistoryBackend
+from calculator.storage.sqlite_backend import SqliteHistoryBackend
+
+# pylint: disable=redefined-outer-name, unused-argument
+
+@pytest.fixture(params=['history.csv', 'history.db', 'history.bin'])
+def history_path(request, tmp_path, monkeypatch):
+    """Fixture that points the history at a CSV file, an SQLite database or a binary file."""
+    path = tmp_path / request.param
+    monkeypatch.setattr(Calculations, 'file_path', str(path))
+    Calculations.clear_history()
+    yield path
+    Calculations.clear_history()
+
+def _add(*calculations):
+    for calculation in calculations:
+        Calculations.add_calculation(calculation)
+
+def test_backend_by_extension():
+    """Test that the file extension chooses the backend."""
+    assert isinstance(open_history_backend('history.csv'), CsvHistoryBackend)
+    assert isinstance(open_history_backend('data/history.DB'), SqliteHistoryBackend)
+    assert isinstance(open_history_backend('history.sqlite3'), SqliteHistoryBackend)
+    assert isinstance(open_history_backend('history'), CsvHistoryBackend)
+    assert open_history_backend('history.bin').name == 'binary'
+
+def test_save_and_load(history_path):
+    """Test that values of every backend survive a save and load exactly."""
+    Calculator.divide(1, 3)
+    Calculator.divide(1, 3, backend='fraction')
+    Calculator.multiply(0.1, 3, backend='float')
+    Calculations.save_history()
+    expected = Calculations.get_history()
+    Calculations.load_history()
+    history = Calculations.get_history()
+    assert history == expected
+    assert [calc.perform() for calc in history] == [calc.perform() for calc in expected]
+    assert [calc.backend for calc in history] == ['decimal', 'fraction', 'float']
+
+def test_append_and_deduplicate(history_path):
+    """Test append saves, append deduplication and rewrite deduplication."""
+    _add(Calculation(Decimal('1'), Decimal('2'), add))
+    Calculations.save_history(append=True)
+    _add(Calculation(Decimal('3'), Decimal('4'), add), Calculation(Decimal('3'), Decimal('4'), add))
+    Calculations.save_history(append=True)
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 3
+    _add(Calculation(Decimal('1'), Decimal('2'), add))
+    Calculations.save_history(append=True, deduplicate=True)
+    Calculations.load_history()
+    assert len(Calculations.get_history()) == 3
+    Calculations.save_history(append=False, deduplicate=True)
+    Calculations.load_history()
+    assert [calc.a for calc in Calculations.get_history()] == [Decimal('1'), Decimal('3')]
+
+def test_delete(history_path):
+    """Test that deleting removes the stored history and clears memory."""
+    _add(Calculation(Decimal('1'), Decimal('2'), add))
+    Calculations.save_history()
+    Calculations.delete_history()
+    assert not history_path.exists()
+    assert not Calculations.get_history()
+    Calculations.load_history()
+    assert not Calculations.get_history()
+
+def test_query(history_path):
+    """Test filtering saved history by operation and result range."""
+    _add(Calculation(Decimal('1'), Decimal('2'), add), Calculation(Decimal('1'), Decimal('4'), divide),
+         Calculation(Decimal('5'), Decimal('5'), add), Calculation(Fraction(2), Fraction(1), divide, backend='fraction'))
+    Calculations.save_history()
+    assert [calc.a for calc in Calculations.query_history('add')] == [Decimal('1'), Decimal('5')]
+    assert [calc.perform() for calc in Calculations.query_history(min_result=2, max_result=3)] == [Decimal(3), 2]
+    assert [calc.perform() for calc in Calculations.query_history('divide', max_result=1)] == [Decimal('0.25')]
+    assert not Calculations.query_history('multiply')
+
+def test_sqlite_wal_and_indexes(tmp_path):
+    """Test that the SQLite database uses WAL mode and has the query indexes."""
+    path = tmp_path / 'history.db'
+    backend = SqliteHistoryBackend(str(path))
+    store = Calculations.new_session().history
+    store.append(Calculation(Decimal('1'), Decimal('2'), add))
+    backend.save(store, 0, append=True, deduplicate=False)
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        indexes = {row[1] for row in connection.execute("PRAGMA index_list(history)")}
+        plan = ' '.join(row[3] for row in connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM history WHERE operation = 'add' AND result_value > 1"))
+    assert {'history_operation', 'history_result'} <= indexes
+    assert 'history_operation' in plan
+
+@pytest.fixture
+def binary_history(tmp_path, monkeypatch):
+    """Fixture with 1000 calculations saved to a binary history file."""
+    monkeypatch.setattr(Calculations, 'file_path', str(tmp_path / 'history.bin'))
+    Calculations.clear_history()
+    for i in range(1000):
+        if i % 2:
+            Calculator.divide(i, 7)
+        else:
+            Calculator.add(Decimal(i) / 4, 1)
+    Calculations.save_history(append=True)
+    yield tmp_path / 'history.bin'
+    Calculations.clear_history()
+
+def test_binary_reads_on_demand(binary_history, monkeypatch):
+    """Test that loading decodes nothing and that reads decode only the entries asked for."""
+    decoded = []
+    original = BinaryRecords.calculation
+    monkeypatch.setattr(BinaryRecords, 'calculation', lambda self, index: decoded.append(index) or original(self, index))
+    Calculations.load_history()
+    assert isinstance(Calculations.history, MappedHistoryStore)
+    assert len(Calculations.history) == 1000 and not decoded
+    assert Calculations.get_latest() == Calculation(Decimal(999), Decimal(7), divide)
+    assert [calc.a for calc in Calculations.history[500:503]] == [Decimal(125), Decimal(501), Decimal('125.5')]
+    assert decoded == [999, 500, 501, 502]
+    assert Calculations.count_by_operation('add') == 500
+    assert len(decoded) == 4
+
+def test_binary_appends_after_load(binary_history):
+    """Test that entries added after loading are numbered after the file's and saved on their own."""
+    Calculations.load_history()
+    Calculator.subtract(5, 1)
+    assert Calculations.history.positions('subtract') == [1000]
+    assert Calculations.get_latest().perform() == Decimal(4)
+    size = binary_history.stat().st_size
+    Calculations.save_history(append=True)
+    assert binary_history.stat().st_size == size + RECORD.size
+    Calculations.clear_history()
+    assert not Calculations.get_history()
+    Calculations.load_history()
+    assert len(Calculations.history) == 1001
+
+def test_binary_ignores_partial_record(binary_history):
+    """Test that a partly written last record is ignored and overwritten by the next append."""
+    with open(binary_history, 'ab') as f:
+        f.write(b'\x01' * 10)
+    Calculations.load_history()
+    assert len(Calculations.history) == 1000
+    Calculator.add(1, 1)
+    Calculations.save_history(append=True)
+    Calculations.load_history()
+    assert Calculations.get_latest() == Calculation(Decimal(1), Decimal(1), add)
+
+def test_deduplicating_appends_see_other_writers(history_path):
+    """Test that a deduplicating append skips rows another writer stored after this one last saved."""
+    first, second = HistorySession(file_path=str(history_path)), HistorySession(file_path=str(history_path))
+    second.add_calculation(Calculation(Decimal(1), Decimal(1), add))
+    second.save_history(append=True, deduplicate=True)
+    first.add_calculation(Calculation(Decimal(2), Decimal(2), add))
+    first.save_history(append=True, deduplicate=True)
+    second.add_calculation(Calculation(Decimal(2), Decimal(2), add))
+    second.save_history(append=True, deduplicate=True)
+    Calculations.load_history()
+    assert [(int(calc.a), int(calc.b)) for calc in Calculations.get_history()] == [(1, 1), (2, 2)]
+
+def test_sqlite_rewrite_deduplicates_table_only_with_repeats(tmp_path):
+    """Test that a deduplicating SQLite rewrite only scans the whole table when a row is repeated."""
+    backend = SqliteHistoryBackend(str(tmp_path / 'history.db'))
+    statements = []
+    connect = backend._connect  # pylint: disable=protected-access
+
+    def traced_connect():
+        connection = connect()
+        connection.set_trace_callback(statements.append)
+        return connection
+
+    def store(*values):
+        history = HistoryStore()
+        for value in values:
+            history.append(Calculation(Decimal(value), Decimal(1), add))
+        return history
+
+    with patch.object(backend, '_connect', traced_connect):
+        backend.save(store(1, 1, 2), 0, append=True, deduplicate=False)
+        backend.save(store(3), 0, append=False, deduplicate=True)
+        assert any(statement.startswith('DELETE') for statement in statements)
+        statements.clear()
+        backend.save(store(2, 4), 0, append=False, deduplicate=True)
+        assert not any(statement.startswith('DELETE') for statement in statements)
+    assert [int(calc.a) for calc in backend.load(100)] == [1, 2, 3, 4]
+
+def _save_from_process(path: str, worker: int, saves: int, rows: int, append: bool):
+    """Add rows and save them, several times, from a separate process."""
+    Calculations.file_path = path
+    Calculations.clear_history()
+    for save in range(saves):
+        for row in range(rows):
+            Calculations.add_calculation(Calculation(Decimal(worker), Decimal(save * rows + row), add))
+        Calculations.save_history(append=append)
+
+@pytest.mark.skipif(storage.fcntl is None or 'fork' not in multiprocessing.get_all_start_methods(),
+                    reason="needs fcntl and fork")
+@pytest.mark.parametrize('append', [False, True], ids=['rewrite', 'append'])
+def test_concurrent_processes_lose_no_rows(history_path, append):
+    """Test that processes saving to one history file at the same time lose no rows."""
+    workers, saves, rows = 6, 8, 25
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_save_from_process, args=(str(history_path), worker, saves, rows, append))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    Calculations.load_history()
+    saved = sorted((int(calc.a), int(calc.b)) for calc in Calculations.get_history())
+    assert saved == [(worker, row) for worker in range(workers) for row in range(saves * rows)]
+    assert not list(history_path.parent.glob('*.tmp'))
@@ -0,0 +1,157 @@
+"""Tests for the write-ahead log of unsaved history entries."""
+import multiprocessing
+import os
+import time
+from decimal import Decimal
+import pytest
+from calculator import storage
+from calculator.calculation import Calculation
+from calculator.calculations import Calculations, HistorySession
+from calculator.operations import add
+from calculator.storage.wal import WriteAheadLog, wal_path
+
+# pylint: disable=redefined-outer-name
+
+@pytest.fixture
+def session(tmp_path):
+    """Fixture for a session with its own history file; its log is closed afterwards."""
+    session = HistorySession(file_path=str(tmp_path / 'history.csv'))
+    yield session
+    session.disable_wal()
+
+def _add(session: HistorySession, count: int, start: int = 0):
+    for i in range(start, start + count):
+        session.add_calculation(Calculation(Decimal(i), Decimal(1), add))
+
+def test_log_commits_and_reads_rows(tmp_path):
+    """Test that committed rows are read back and a line cut short by a crash is skipped."""
+    wal = WriteAheadLog(str(tmp_path / 'log.wal'))
+    assert wal.open()
+    assert wal.append([('1', '2', 'add', '3', 'decimal'), ('4', '5', 'add', '9', 'decimal')]) == 2
+    assert wal.read() == []  # Nothing is written before the commit
+    wal.commit()
+    assert (wal.entries, wal.commits) == (2, 1)
+    with open(wal.path, 'ab') as f:
+        f.write(b'6,7,ad')
+    assert wal.read() == [('1', '2', 'add', '3', 'decimal'), ('4', '5', 'add', '9', 'decimal')]
+    wal.truncate()
+    assert wal.read() == [] and wal.entries == 0
+    wal.close()
+
+def test_log_rejects_invalid_settings(tmp_path):
+    """Test that the batch size and interval must be positive."""
+    with pytest.raises(ValueError):
+        WriteAheadLog(str(tmp_path / 'log.wal'), sync_entries=0)
+
+@pytest.mark.skipif(storage.fcntl is None, reason="needs fcntl")
+def test_log_is_owned_by_one_open_file(tmp_path):
+    """Test that a second open of the same log fails while the first is open."""
+    first, second = WriteAheadLog(str(tmp_path / 'log.wal')), WriteAheadLog(str(tmp_path / 'log.wal'))
+    assert first.open()
+    assert not second.open()
+    first.close()
+    assert second.open()
+    second.close()
+
+def test_session_logs_entries_until_saved(session):
+    """Test that entries are logged in history order and a save empties the log."""
+    assert session.enable_wal(sync_interval=10)
+    _add(session, 5)
+    session.sync_wal()
+    assert [row[0] for row in session.wal.read()] == ['0', '1', '2', '3', '4']
+    session.save_history()
+    assert session.wal.read() == []
+    _add(session, 2, start=5)
+    session.sync_wal()
+    assert [row[0] for row in session.wal.read()] == ['5', '6']  # Saved entries are not logged again
+    session.clear_history()
+    assert session.wal.read() == []
+
+def test_group_commit_batches_fsyncs(session):
+    """Test that the background thread commits many entries per fsync."""
+    assert session.enable_wal(sync_entries=500, sync_interval=0.01, compact_entries=0)
+    _add(session, 5_000)
+    deadline = time.monotonic() + 5
+    while session.wal.entries < 5_000 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert session.wal.entries == 5_000
+    assert session.wal.commits < 100
+
+def test_log_is_compacted_into_history_file(session):
+    """Test that a large log is saved to the history file and emptied."""
+    assert session.enable_wal(sync_entries=10, sync_interval=0.01, compact_entries=50)
+    _add(session, 60)
+    deadline = time.monotonic() + 5
+    while session.saved_count < 60 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert session.saved_count == 60
+    assert len(session.storage().load(1_000)) == 60
+    assert session.wal.entries < 50
+
+def _crash_after_logging(path: str, count: int):
+    """Log entries, commit them and exit without saving the history."""
+    session = HistorySession(file_path=path)
+    session.enable_wal(sync_interval=10)
+    _add(session, count)
+    session.sync_wal()
+    os._exit(0)  # pylint: disable=protected-access
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="needs fork")
+@pytest.mark.parametrize('extension', ['.csv', '.bin'])
+def test_unsaved_entries_are_recovered_on_startup(tmp_path, extension):
+    """Test that entries committed to the log by a process that crashed are recovered into the history file."""
+    path = str(tmp_path / f'history{extension}')
+    session = HistorySession(file_path=path)
+    _add(session, 3)
+    session.save_history()
+    process = multiprocessing.get_context('fork').Process(target=_crash_after_logging, args=(path, 4))
+    process.start()
+    process.join()
+    assert os.path.getsize(wal_path(path)) > 0
+    restarted = HistorySession(file_path=path, save_mode='append')  # Repeated rows are kept
+    assert restarted.enable_wal()
+    try:
+        assert restarted.wal.read() == []
+        restarted.load_history()
+        assert [int(calc.a) for calc in restarted.history] == [0, 1, 2, 0, 1, 2, 3]
+    finally:
+        restarted.disable_wal()
+
+@pytest.mark.parametrize('save_mode, expected', [('rewrite', [0, 1, 2]), ('append', [0, 1, 2, 0, 1, 2])])
+def test_recovery_after_save_follows_save_mode(tmp_path, save_mode, expected):
+    """Test that entries left in the log by a save that crashed before emptying it are not stored twice in rewrite mode."""
+    path = str(tmp_path / 'history.csv')
+    session = HistorySession(file_path=path, save_mode=save_mode)
+    assert session.enable_wal(sync_interval=10, compact_entries=0)
+    _add(session, 3)
+    session.sync_wal()
+    truncate, session.wal.truncate = session.wal.truncate, lambda: None  # Crash between the save and the truncate
+    session.save_history()
+    session.wal.truncate = truncate
+    session.disable_wal()
+    restarted = HistorySession(file_path=path, save_mode=save_mode)
+    assert restarted.enable_wal()
+    restarted.disable_wal()
+    assert [int(row[0]) for row in restarted.storage().load(1_000).rows()] == expected
+
+@pytest.mark.parametrize('save_mode, copies', [('rewrite', 1), ('append', 4)])
+def test_compaction_follows_save_mode(session, save_mode, copies):
+    """Test that compacting the log drops rows already saved in rewrite mode and keeps them in append mode."""
+    session.save_mode = save_mode
+    stored = HistorySession(file_path=session.file_path)
+    stored.add_calculation(Calculation(Decimal(1), Decimal(2), add))
+    stored.save_history()
+    for _ in range(3):
+        session.add_calculation(Calculation(Decimal(1), Decimal(2), add))
+    assert session.enable_wal(sync_interval=0.01, compact_entries=2)  # The first commit logs all three
+    deadline = time.monotonic() + 5
+    while session.saved_count < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert session.saved_count == 3
+    assert len(session.storage().load(1_000)) == copies
+
+def test_classmethod_enables_log_for_current_session(session):
+    """Test that Calculations.enable_wal applies to the current session."""
+    with Calculations.session(session):
+        assert Calculations.enable_wal(sync_interval=10)
+    assert session.wal is not None